@@ -1,10 +1,9 @@
+import hashlib
+import json
 import os
-import threading
-from datetime import datetime, timedelta
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for, flash
+from datetime import timedelta
+from flask import Flask, Response, render_template, request, jsonify, session, redirect, url_for, flash
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
-import pandas as pd
-import sqlite3
 import sys
 from flask_sqlalchemy import SQLAlchemy
 from werkzeug.security import generate_password_hash, check_password_hash
@@ -14,12 +13,20 @@ sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
 
 from config import Config
 from core.roman_converter import RomanConverter
-from core.data_processor import DataProcessor
+from core.data_processor import DataProcessor, NUMERIC_COLUMNS
 from services.scraper import Scraper
 from utils.file_manager import FileManager
 from utils.database_manager import DatabaseManager
-from utils.sql_queries import listings_table_sql, new_listings_table_sql
+from utils.facet_cache import FacetCache
+from utils.job_queue import JobQueue
+from utils.progress_broker import ProgressBroker
+from utils.response_cache import ResponseCache, choose_encoding, compress, compress_stream
+from utils.snapshot_store import SnapshotStore
+from utils.sql_queries import (listings_table_sql, new_listings_table_sql, listings_table_columns,
+                               listings_search_columns)
 from core.apartment_tracker import ApartmentTracker
+from core.job_runner import JobRunner
+from core.scheduler import Scheduler
 
 # Initialize Flask
 app = Flask(__name__)
@@ -54,9 +61,14 @@ login_manager.login_view = "login"
 config = Config()
 roman_converter = RomanConverter()
 data_processor = DataProcessor()
-scraper = Scraper(config, roman_converter)
+scraper = Scraper(config)
 file_manager = FileManager(config)
 database_manager = DatabaseManager(config)
+facet_cache = FacetCache(database_manager, config.FACET_COLUMNS)
+listings_cache = ResponseCache(config.RESPONSE_CACHE_ENTRIES, config.RESPONSE_CACHE_MAX_BYTES)
+progress_broker = ProgressBroker(config.PROGRESS_HISTORY, config.PROGRESS_HEARTBEAT_SECONDS)
+snapshot_store = SnapshotStore(database_manager, config.SNAPSHOT_DIR, config.SNAPSHOT_DAILY_DAYS,
+                               config.SNAPSHOT_WEEKLY_DAYS)
 
 apartment_tracker = ApartmentTracker(
     config=config,
@@ -65,12 +77,21 @@ apartment_tracker = ApartmentTracker(
     scraper=scraper,
     file_manager=file_manager,
     database_manager=database_manager,
-    ai_analyzer=None
+    ai_analyzer=None,
+    progress=progress_broker,
+    snapshot_store=snapshot_store if config.SNAPSHOTS else None
 )
 
-# Scraper tracking
-is_scraper_running = False
-last_run_time = None
+# Saved searches crawled by every run, seeded from config.SEARCHES by the tracker
+saved_searches = apartment_tracker.saved_searches
+
+# Columns offered as min/max range filters on the dashboard
+RANGE_FILTER_COLUMNS = ["Price", "Area", "Rooms"]
+
+# Scraper runs go through the shared job queue, other processes' runs are mirrored into the progress stream
+job_queue = JobQueue(database_manager, config.JOB_STALE_SECONDS)
+job_runner = JobRunner(job_queue, apartment_tracker, config.JOB_HEARTBEAT_SECONDS, progress_broker)
+job_runner.watch(config.JOB_WATCH_SECONDS)
 
 @login_manager.user_loader
 def load_user(user_id):
@@ -89,18 +110,16 @@ def list_users():
 def before_request():
     session.permanent = True
 
-def run_scraper_async():
-    global is_scraper_running, last_run_time
-    is_scraper_running = True
-    try:
-        apartment_tracker.run()
-        print("Scraper run completed successfully.")
-        last_run_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    except Exception as e:
-        print("Error during scraper run:", e)
-    finally:
-        is_scraper_running = False
-    print("Scraper run thread finished.")
+def start_scraper_run(search="default", trigger="manual"):
+    """
+    Queue a scraper run and start working through the queue in the background.
+    Returns False if the request was coalesced into a run that is already queued or running.
+    """
+    _, created = job_queue.enqueue(search, trigger)
+    job_runner.start()
+    return created
+
+scheduler = Scheduler(config.SCHEDULES, start_scraper_run, database_manager)
 
 @app.route('/')
 @login_required
@@ -109,33 +128,17 @@ def index():
     if not os.path.exists(config.DB_PATH):
         return "Database not found at path: {}".format(config.DB_PATH)
 
-    conn = sqlite3.connect(config.DB_PATH)
-    cursor = conn.cursor()
-
-    # Load column names excluding a few
-    cursor.execute("PRAGMA table_info(listings)")
-    columns = [col[1] for col in cursor.fetchall() if col[1] not in ('id', 'GoToLink', 'AdText')]
-
-    # Fetch filter options
-    filters = {}
-    for column in columns:
-        try:
-            quoted = f'"{column}"' if ' ' in column else column
-            cursor.execute(f"SELECT DISTINCT {quoted} FROM listings ORDER BY {quoted}")
-            values = [row[0] for row in cursor.fetchall() if row[0] is not None]
-            if values:
-                filters[column] = values
-        except sqlite3.OperationalError:
-            continue
-
-    conn.close()
+    # Filter options come from memory until a run commits new data
+    columns, filters = facet_cache.get()
+    status = job_queue.status()
 
     return render_template(
         'index.html',
         filters=filters,
         columns=columns,
-        is_scraper_running=is_scraper_running,
-        last_run_time=last_run_time
+        range_columns=RANGE_FILTER_COLUMNS,
+        is_scraper_running=status['is_running'],
+        last_run_time=status['last_run']
     )
 
 @app.route('/register', methods=['GET', 'POST'])
@@ -191,57 +194,271 @@ def logout():
     logout_user()
     return redirect(url_for('login'))
 
-@app.route('/listings')
-def get_listings():
-    filters = {
-        key.replace('filter_', ''): value
-        for key, value in request.args.items()
-        if key.startswith('filter_') and value
+def quote_column(column):
+    """Quote a column name for SQL."""
+    return '"{}"'.format(column.replace('"', '""'))
+
+def build_listings_filters(args, table_columns):
+    """
+    Build the WHERE conditions and params for the dashboard filters in the request args.
+    Raises ValueError for a malformed range value.
+    """
+    conditions = []
+    params = []
+
+    for key, value in args.items():
+        column = key[len('filter_'):]
+        if key.startswith('filter_') and value and column in table_columns:
+            conditions.append(f"{quote_column(column)} LIKE ?")
+            params.append(f"%{value}%")
+
+    # min_<Column>/max_<Column> ranges go to the typed, indexed numeric columns
+    for column, numeric_column in NUMERIC_COLUMNS.items():
+        for bound, operator in (("min", ">="), ("max", "<=")):
+            value = args.get(f"{bound}_{column}")
+            if not value:
+                continue
+            try:
+                params.append(float(value))
+            except ValueError:
+                raise ValueError(f"Invalid number for {bound}_{column}: {value}")
+            conditions.append(f"{numeric_column} {operator} ?")
+
+    # Listings matched by a saved search on its latest run
+    saved_search = args.get('saved_search')
+    if saved_search:
+        conditions.append("url IN (SELECT url FROM search_matches WHERE search = ?)")
+        params.append(saved_search)
+
+    # DataTables global search box
+    search = args.get('search[value]', '').strip()
+    if search:
+        conditions.append("(" + " OR ".join(f"{quote_column(column)} LIKE ?"
+                                            for column in listings_search_columns) + ")")
+        params.extend([f"%{search}%"] * len(listings_search_columns))
+
+    return conditions, params
+
+def build_listings_order(args):
+    """Build the ORDER BY clause from the DataTables order parameters."""
+    clauses = []
+    index = 0
+    while f'order[{index}][column]' in args:
+        column = args.get(f"columns[{args.get(f'order[{index}][column]')}][data]")
+        direction = 'DESC' if args.get(f'order[{index}][dir]') == 'desc' else 'ASC'
+        if column in listings_table_columns:
+            # Sort numbers numerically rather than as text
+            sort_column = NUMERIC_COLUMNS.get(column) or quote_column(column)
+            clauses.append(f"{sort_column} {direction}")
+        index += 1
+
+    # id keeps paging stable between requests
+    clauses.append("id ASC")
+    return " ORDER BY " + ", ".join(clauses)
+
+def stream_listings_rows(conn, query, params):
+    """Yield the rows as comma separated JSON objects while reading them from the cursor."""
+    cursor = conn.execute(query, params)
+    columns = [description[0] for description in cursor.description]
+    first = True
+    while True:
+        rows = cursor.fetchmany(500)
+        if not rows:
+            break
+        for row in rows:
+            record = dict(zip(columns, row))
+            record['url'] = f'<a href="{record["url"]}" target="_blank" class="btn btn-sm btn-primary">View</a>'
+            yield ('' if first else ',') + json.dumps(record)
+            first = False
+
+def listings_json_header(draw, records_total, records_filtered):
+    """JSON response up to the opening bracket of the data array."""
+    header = {
+        'draw': draw,
+        'recordsTotal': records_total,
+        'recordsFiltered': records_filtered,
+        'columns': listings_table_columns
     }
+    return json.dumps(header)[:-1] + ', "data": ['
 
-    table_type = request.args.get('table_type', 'all')
+def listings_cache_key(generation, args):
+    """Cache key of a listings query; draw and jQuery's cache buster don't change the result."""
+    return (generation,) + tuple(sorted((key, value) for key, value in args.items(multi=True)
+                                        if key not in ('draw', '_')))
 
-    conn = sqlite3.connect(config.DB_PATH)
-    query = new_listings_table_sql if table_type == 'new' else listings_table_sql
-    params = []
+def with_cache_headers(response, etag):
+    """Attach the ETag and make browsers revalidate instead of reusing stale data."""
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.vary.add('Accept-Encoding')
+    return response
 
-    for column, value in filters.items():
-        quoted = f'"{column}"' if ' ' in column else column
-        query += f" AND {quoted} LIKE ?"
-        params.append(f"%{value}%")
+@app.route('/listings')
+def get_listings():
+    """
+    Listings for the dashboard tables using the DataTables server-side protocol.
+    Paging (start/length), sorting and filtering run in SQLite. Without a length parameter
+    all matching rows are streamed.
+    Responses carry an ETag tied to the data version, so unchanged data answers 304, and
+    pages are kept in an LRU cache keyed on (data version, query parameters).
+    """
+    args = request.args
+    table_type = args.get('table_type', 'all')
+    table = 'new_listings' if table_type == 'new' else 'listings'
+    base_query = new_listings_table_sql if table_type == 'new' else listings_table_sql
 
     try:
-        df = pd.read_sql_query(query, conn, params=params)
-    except Exception as e:
-        conn.close()
-        return jsonify({"error": str(e)})
-    conn.close()
+        draw = int(args.get('draw', 0))
+        start = max(int(args.get('start', 0)), 0)
+        length = int(args.get('length', -1))
+    except ValueError:
+        return jsonify({"error": "draw, start and length must be integers"}), 400
+
+    cache_key = listings_cache_key(database_manager.get_data_version(), args)
+    # The ETag covers the data only: the dashboard keeps draw out of the request and patches it
+    # into the reply itself, so repeating a table request revalidates to a 304
+    etag = hashlib.sha1(repr(cache_key).encode('utf-8')).hexdigest()
+    if request.if_none_match.contains_weak(etag):
+        return with_cache_headers(Response(status=304), etag)
+
+    encoding = choose_encoding(request.headers.get('Accept-Encoding'))
+    cached = listings_cache.get(cache_key) if length >= 0 else None
+
+    if cached is None:
+        try:
+            with database_manager.connections.connection() as conn:
+                table_columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+                conditions, params = build_listings_filters(args, table_columns)
+                filtered_query = base_query + "".join(f" AND {condition}" for condition in conditions)
+
+                records_total = conn.execute(f"SELECT COUNT(*) FROM ({base_query})").fetchone()[0]
+                records_filtered = records_total
+                if conditions:
+                    records_filtered = conn.execute(f"SELECT COUNT(*) FROM ({filtered_query})",
+                                                    params).fetchone()[0]
+
+                page_query = filtered_query + build_listings_order(args)
+                if length >= 0:
+                    data_json = "".join(stream_listings_rows(conn, page_query + " LIMIT ? OFFSET ?",
+                                                             params + [length, start]))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+        if length < 0:
+            # Full result sets are streamed, compressed on the fly and never cached
+            def generate():
+                yield listings_json_header(draw, records_total, records_filtered)
+                # The connection stays checked out until the last row has been streamed
+                with database_manager.connections.connection() as conn:
+                    yield from stream_listings_rows(conn, page_query, params)
+                yield ']}'
+
+            if encoding:
+                response = Response(compress_stream(generate(), encoding), mimetype='application/json')
+                response.headers['Content-Encoding'] = encoding
+            else:
+                response = Response(generate(), mimetype='application/json')
+            return with_cache_headers(response, etag)
 
-    if 'url' in df.columns:
-        df['url'] = df['url'].apply(lambda x: f'<a href="{x}" target="_blank" class="btn btn-sm btn-primary">View</a>')
+        cached = (records_total, records_filtered, data_json)
+        listings_cache.put(cache_key, cached, len(data_json))
 
-    return jsonify({
-        'data': df.to_dict('records'),
-        'columns': df.columns.tolist()
-    })
+    records_total, records_filtered, data_json = cached
+    body = (listings_json_header(draw, records_total, records_filtered) + data_json + ']}').encode('utf-8')
+
+    response = Response(mimetype='application/json')
+    if encoding and len(body) >= config.COMPRESS_MIN_BYTES:
+        body = compress(body, encoding)
+        response.headers['Content-Encoding'] = encoding
+    response.set_data(body)
+    return with_cache_headers(response, etag)
 
 @app.route('/run-scraper', methods=['POST'])
 def run_scraper():
-    global is_scraper_running
-    if not is_scraper_running:
-        thread = threading.Thread(target=run_scraper_async)
-        thread.daemon = True
-        thread.start()
+    if start_scraper_run():
         return jsonify({"status": "started"})
     return jsonify({"status": "already_running"})
 
 @app.route('/scraper-status')
 def scraper_status():
-    return jsonify({
-        "is_running": is_scraper_running,
-        "last_run": last_run_time
-    })
+    return jsonify(job_queue.status())
+
+@app.route('/runs')
+@login_required
+def runs():
+    """Recent run history with per-stage durations, for spotting slow runs."""
+    limit = min(request.args.get('limit', 50, type=int), 1000)
+    return Response(database_manager.get_runs(limit).to_json(orient='records'), mimetype='application/json')
+
+@app.route('/listing-history')
+@login_required
+def listing_history():
+    """Timeline of added, removed and changed events for one listing."""
+    url = request.args.get('url', '')
+    return Response(database_manager.get_listing_timeline(url).to_json(orient='records'),
+                    mimetype='application/json')
+
+@app.route('/price-drops')
+@login_required
+def price_drops():
+    """Active listings whose price went down in the last days, biggest relative drop first."""
+    days = request.args.get('days', 7, type=int)
+    limit = min(request.args.get('limit', 100, type=int), 1000)
+    return Response(database_manager.get_recent_price_drops(days, limit).to_json(orient='records'),
+                    mimetype='application/json')
+
+@app.route('/snapshots/diff')
+@login_required
+def snapshot_diff():
+    """Listings added, removed and changed between the snapshots of two dates (YYYY-MM-DD)."""
+    try:
+        diff = snapshot_store.diff(request.args['from'], request.args['to'])
+    except KeyError:
+        return jsonify({"error": "from and to are required"}), 400
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 404
+    return Response(json.dumps({name: json.loads(df.to_json(orient='records')) for name, df in diff.items()}),
+                    mimetype='application/json')
+
+@app.route('/snapshots/trend')
+@login_required
+def snapshot_trend():
+    """Daily price statistics from the snapshots of the last days."""
+    days = request.args.get('days', 90, type=int)
+    return Response(snapshot_store.trend(days).to_json(orient='records'), mimetype='application/json')
+
+@app.route('/searches')
+@login_required
+def list_searches():
+    """Saved searches with the number of active listings each one matches."""
+    return Response(saved_searches.list().to_json(orient='records'), mimetype='application/json')
+
+@app.route('/searches', methods=['POST'])
+@login_required
+def save_search():
+    """Add or update a saved search from JSON {name, url, enabled}, it's crawled from the next run on."""
+    data = request.get_json(silent=True) or {}
+    name, url = data.get('name'), data.get('url')
+    if not name or not url:
+        return jsonify({"error": "name and url are required"}), 400
+    saved_searches.save(name, url, bool(data.get('enabled', True)))
+    return jsonify({"status": "saved", "name": name})
+
+@app.route('/scraper-events')
+def scraper_events():
+    """
+    Push scraper progress to the dashboard as Server-Sent Events.
+    Reconnecting browsers send Last-Event-ID and get the events they missed.
+    """
+    stream = progress_broker.stream(request.headers.get('Last-Event-ID'))
+    return Response(stream, mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 if __name__ == '__main__':
     print("Starting Flask app with DB:", config.DB_PATH)
+    # Only the reloader's child process serves requests, don't schedule runs from its parent too
+    if config.SCHEDULER_ENABLED and os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        scheduler.start()
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,64 @@
+"""
+Measure per-ad CPU time and peak memory of the browser-free description extractor.
+Run from the src directory: python -m benchmarks.bench_ad_text [recorded_pages_dir]
+
+Without a directory, synthetic fixture pages are used. Recorded pages are raw ad pages
+saved as *.html. The Chrome path is represented by the parse of the rendered page only,
+so the real gap is larger by the browser's own page load and rendering cost.
+"""
+import glob
+import os
+import sys
+import time
+import tracemalloc
+
+from config import Config
+from services.scraper import Scraper
+from benchmarks.fixtures import ad_page_html
+
+
+def load_pages():
+    """Load recorded pages from the given directory or build synthetic ones."""
+    if len(sys.argv) > 1:
+        pages = []
+        for path in sorted(glob.glob(os.path.join(sys.argv[1], "*.html"))):
+            with open(path, encoding="utf-8") as f:
+                pages.append(f.read())
+        return pages
+    return [ad_page_html(ad_id) for ad_id in range(200)]
+
+
+def measure(label, extract, pages):
+    """Print CPU time per page, peak traced memory and hit count for an extractor."""
+    tracemalloc.start()
+    start = time.process_time()
+    found = sum(1 for page in pages if extract(page))
+    cpu = time.process_time() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{label:>24}: {cpu / len(pages) * 1000:8.3f} ms CPU/ad, peak {peak / 1024:9.1f} KiB, "
+          f"found {found}/{len(pages)}")
+    return cpu
+
+
+def main():
+    pages = load_pages()
+    if not pages:
+        print("No pages to benchmark.")
+        return
+
+    config = Config()
+    config.HTTP_CACHE = False
+    scraper = Scraper(config)
+    source = scraper.sources["halooglasi"]
+
+    print(f"{len(pages)} ad pages, average {sum(map(len, pages)) / len(pages) / 1024:.0f} KiB, "
+          f"{scraper.parser.name} backend")
+    measure("embedded data (fast)", source.extract_description, pages)
+    measure("rendered page parse", source.parse_rendered_description, pages)
+    print("The Chrome path pays for a full browser page load and render on top of the rendered page parse")
+
+
+if __name__ == "__main__":
+    main()
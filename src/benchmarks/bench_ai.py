@@ -0,0 +1,96 @@
+"""
+AI analysis time against a local stub of the chat completions API with latency and 429 responses:
+one request at a time versus the concurrent worker pool, with and without multi-ad batching.
+Results of every mode are checked against the stub's expected analyses. The last section repeats
+a run with the AI cache to show that unchanged and reposted ads cost no further requests.
+Run from the src directory: python -m benchmarks.bench_ai [ads]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from benchmarks.fixtures import StubChatServer, stub_analysis
+from config import Config
+from services.ai_analyzer import AIAnalyzer
+from services.ai_cache import AICache
+from utils.database_manager import DatabaseManager
+
+PROMPT = "Summarize this apartment ad: "
+
+MODES = [
+    ("sequential", 1, 1),
+    ("concurrent x8", 8, 1),
+    ("concurrent x16", 16, 1),
+    ("concurrent x8, 5 ads/request", 8, 5),
+]
+
+
+def build_ads(count):
+    rng = random.Random(5)
+    words = ["stan", "terasa", "lift", "parking", "grejanje", "namesten", "blizu", "centra"]
+    return pd.DataFrame({
+        "url": [f"https://www.halooglasi.com/ad/{i}" for i in range(count)],
+        "AdText": [" ".join(rng.choice(words) for _ in range(60)) for _ in range(count)],
+    })
+
+
+def run_mode(base_url, ads, concurrency, batch_size, requests_per_minute=600, cache=None):
+    config = Config()
+    config.AI_BASE_URL = base_url
+    config.AI_CONCURRENCY = concurrency
+    config.AI_BATCH_SIZE = batch_size
+    config.AI_REQUESTS_PER_MINUTE = requests_per_minute
+    config.AI_BACKOFF_BASE = 0.2
+    analyzer = AIAnalyzer("stub-key", PROMPT, config, cache)
+
+    start = time.perf_counter()
+    df = analyzer.process_dataframe(ads.copy())
+    elapsed = time.perf_counter() - start
+
+    expected = ads["AdText"].map(stub_analysis)
+    assert (df["AISays"] == expected).all(), "analyses don't match the stub's replies"
+    return elapsed, analyzer.stats
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 120
+    ads = build_ads(count)
+
+    print(f"\n{count} ads, 300 ms latency, 10% random 429s")
+    with StubChatServer(PROMPT, latency=0.3, error_rate=0.1) as server:
+        baseline = None
+        for label, concurrency, batch_size in MODES:
+            elapsed, stats = run_mode(server.base_url, ads, concurrency, batch_size)
+            baseline = baseline or elapsed
+            print(f"  {label:<30} {elapsed:6.2f}s {baseline / elapsed:5.1f}x  {stats['requests']:4} requests, "
+                  f"{stats['retries']} retries")
+
+    print(f"\n{count} ads against a server allowing 120 requests/minute, limiter set to 100/minute")
+    with StubChatServer(PROMPT, latency=0.05, rpm_limit=120) as server:
+        elapsed, stats = run_mode(server.base_url, ads, 8, 1, requests_per_minute=100)
+        print(f"  concurrent x8 {elapsed:6.2f}s, {stats['requests']} requests, "
+              f"{stats['rate_limited']} rejected by the server")
+
+    print(f"\n{count} ads with the AI cache, then again with 10% new ads and 10% reposts")
+    with tempfile.TemporaryDirectory() as tmp, StubChatServer(PROMPT, latency=0.3) as server:
+        config = Config()
+        config.DB_PATH = os.path.join(tmp, "bench.db")
+        database_manager = DatabaseManager(config)
+        cache = AICache(database_manager, config.AI_CACHE_MAX_BYTES, config.AI_CACHE_MAX_AGE_DAYS)
+
+        fresh = build_ads(count + count // 10).iloc[count:]
+        fresh["AdText"] = "novo " + fresh["AdText"]
+        reposts = ads.iloc[:count // 10].assign(url=lambda df: df["url"] + "-repost")
+        for label, run_ads in [("first run", ads), ("next run", pd.concat([ads, fresh, reposts]))]:
+            elapsed, stats = run_mode(server.base_url, run_ads.reset_index(drop=True), 8, 1, cache=cache)
+            print(f"  {label:<10} {len(run_ads):4} ads {elapsed:6.2f}s, {stats['requests']} requests, "
+                  f"cache hits {cache.stats['hits']}/{cache.stats['hits'] + cache.stats['misses']}")
+        database_manager.connections.close()
+
+
+if __name__ == "__main__":
+    main()
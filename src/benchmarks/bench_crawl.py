@@ -0,0 +1,47 @@
+"""
+Compare the sequential and concurrent listing crawl against a local stand-in server.
+Run from the src directory: python -m benchmarks.bench_crawl [page_count] [latency_seconds]
+"""
+import sys
+import time
+
+from config import Config
+from services.scraper import Scraper
+from benchmarks.fixtures import StandInServer, crawl_ads
+
+
+def timed_crawl(server, concurrent, concurrency=8):
+    """Crawl the stand-in server and return (seconds, ads)."""
+    config = Config()
+    config.SRC = server.url
+    config.CONCURRENT_CRAWL = concurrent
+    config.CRAWL_CONCURRENCY = concurrency
+    config.HTTP_CACHE = False
+    # The stand-in server has no politeness limit, only the concurrency is measured
+    config.HOST_REQUESTS_PER_MINUTE = 0
+    scraper = Scraper(config)
+
+    start = time.perf_counter()
+    ads = crawl_ads(scraper, scraper.config.SRC)
+    return time.perf_counter() - start, ads
+
+
+def main():
+    page_count = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.2
+
+    with StandInServer(page_count=page_count, latency=latency) as server:
+        seq_time, seq_ads = timed_crawl(server, concurrent=False)
+        results = [("sequential", 1, seq_time)]
+        for concurrency in (4, 8, 16):
+            con_time, con_ads = timed_crawl(server, concurrent=True, concurrency=concurrency)
+            assert con_ads == seq_ads, "concurrent crawl returned different ads"
+            results.append(("concurrent", concurrency, con_time))
+
+    print(f"\n{page_count} pages, {latency * 1000:.0f} ms latency, {len(seq_ads)} ads")
+    for mode, concurrency, seconds in results:
+        print(f"{mode:>12} x{concurrency:<3} {seconds:7.2f}s  {seq_time / seconds:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Dashboard readers against a concurrent scrape write: fresh rollback-journal connections
+versus the pooled WAL ConnectionManager.
+Run from the src directory: python -m benchmarks.bench_db_concurrency [rows] [readers] [seconds]
+"""
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from utils.db_connection import ConnectionManager
+from utils.sql_queries import listings_table_sql
+
+
+class LegacyConnections:
+    """What the code did before: a new default-journal connection per operation."""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+
+    @contextmanager
+    def connection(self):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def transaction(self):
+        with self.connection() as conn:
+            yield conn
+            conn.commit()
+
+
+def create_database(db_path, rows, journal_mode):
+    conn = sqlite3.connect(db_path)
+    conn.execute(f"PRAGMA journal_mode = {journal_mode}")
+    conn.execute("""CREATE TABLE listings (id INTEGER PRIMARY KEY AUTOINCREMENT, url TEXT UNIQUE, Price TEXT,
+                    Area TEXT, Rooms TEXT, Floor TEXT, "Max Floor" TEXT, AdText TEXT, GoToLink TEXT,
+                    ReportDate TEXT, is_active INTEGER DEFAULT 1, removed_date TEXT, add_date TEXT)""")
+    conn.executemany(
+        "INSERT INTO listings (url, Price, Area, Rooms, Floor, \"Max Floor\", AdText, add_date) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, '2025-01-01')",
+        ((f"https://example.com/{i}", str(400 + i % 500), str(30 + i % 90), "2.0", "3", "5", "text " * 40)
+         for i in range(rows))
+    )
+    conn.commit()
+    conn.close()
+
+
+def run(connections, rows, readers, seconds):
+    """Return reader latencies, read errors and write transactions completed."""
+    stop = threading.Event()
+    latencies, errors, writes = [], [0], [0]
+    lock = threading.Lock()
+
+    def writer():
+        rng = random.Random(1)
+        while not stop.is_set():
+            try:
+                with connections.transaction() as conn:
+                    conn.executemany("UPDATE listings SET Price = ? WHERE url = ?",
+                                     ((str(rng.randint(300, 900)), f"https://example.com/{rng.randrange(rows)}")
+                                      for _ in range(2000)))
+                    # Hold the write transaction open like a slow scrape save
+                    time.sleep(0.05)
+                writes[0] += 1
+            except sqlite3.OperationalError:
+                pass
+
+    def reader():
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                with connections.connection() as conn:
+                    conn.execute(listings_table_sql + " LIMIT 100").fetchall()
+                with lock:
+                    latencies.append(time.perf_counter() - start)
+            except sqlite3.OperationalError:
+                with lock:
+                    errors[0] += 1
+
+    threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return latencies, errors[0], writes[0]
+
+
+def report(label, latencies, errors, writes, seconds):
+    ordered = sorted(latencies) or [0.0]
+    p50 = ordered[len(ordered) // 2] * 1000
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000
+    print(f"{label:>14}: {len(latencies) / seconds:8.0f} reads/s, p50 {p50:7.2f} ms, p99 {p99:7.2f} ms, "
+          f"{errors} read errors, {writes} write txns")
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    readers = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    seconds = float(sys.argv[3]) if len(sys.argv) > 3 else 5
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = os.path.join(tmp, "legacy.db")
+        create_database(legacy_path, rows, "DELETE")
+        report("rollback/fresh", *run(LegacyConnections(legacy_path), rows, readers, seconds), seconds)
+
+        pooled_path = os.path.join(tmp, "pooled.db")
+        create_database(pooled_path, rows, "WAL")
+        connections = ConnectionManager(pooled_path, pool_size=readers + 1)
+        report("WAL/pooled", *run(connections, rows, readers, seconds), seconds)
+        connections.close()
+
+
+if __name__ == "__main__":
+    main()
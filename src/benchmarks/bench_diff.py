@@ -0,0 +1,104 @@
+"""
+Diff of today's scrape against the stored listings: the previous row-by-row AdText merge and
+copy-back loops versus the vectorized DiffEngine, with an equivalence check on the outputs.
+Run from the src directory: python -m benchmarks.bench_diff [max legacy rows]
+"""
+import random
+import sys
+import time
+
+import pandas as pd
+
+from core.diff_engine import DiffEngine
+
+SIZES = [1000, 5000, 10000, 50000, 100000, 200000]
+
+
+def build_snapshots(rows):
+    """Stored listings and a scrape of the same size with 5% new, 5% removed and 2% repriced ads."""
+    rng = random.Random(rows)
+    churn = rows // 20
+
+    db = pd.DataFrame({
+        "url": [f"https://www.halooglasi.com/ad/{i}" for i in range(rows)],
+        "Price": [str(rng.randint(300, 1500)) for _ in range(rows)],
+        "Area": [str(rng.randint(20, 150)) for _ in range(rows)],
+        "Rooms": [rng.choice(["1.0", "1.5", "2.0", "2.5", "3.0", "4+"]) for _ in range(rows)],
+        "Floor": [rng.choice(["Ground Floor", "1", "2", "3"]) for _ in range(rows)],
+        "Max Floor": [rng.choice(["4", "6", "10"]) for _ in range(rows)],
+        "AdText": [f"opis stana {i}" if i % 7 else None for i in range(rows)],
+    })
+
+    today = db.drop(columns=["AdText"]).iloc[churn:].copy()
+    new = db.drop(columns=["AdText"]).iloc[:churn].copy()
+    new["url"] = [f"https://www.halooglasi.com/ad/{rows + i}" for i in range(churn)]
+    today = pd.concat([today, new]).sample(frac=1, random_state=1).reset_index(drop=True)
+    repriced = today.sample(frac=0.02, random_state=2).index
+    today.loc[repriced, "Price"] = "999"
+    return db, today
+
+
+def legacy_diff(db_listings, df_today):
+    """The diff and AdText handling from ApartmentTracker.run before the DiffEngine."""
+    new_rows = df_today[~df_today["url"].isin(db_listings["url"])]
+    new_rows = new_rows.dropna(axis=1, how="all")
+    removed_urls = db_listings.loc[~db_listings["url"].isin(df_today["url"]), "url"].tolist()
+
+    existing_rows = df_today[df_today["url"].isin(db_listings["url"])].copy()
+    if "AdText" not in existing_rows.columns:
+        existing_rows["AdText"] = ""
+
+    result = existing_rows.copy()
+    for index, row in result.iterrows():
+        db_row = db_listings[db_listings["url"] == row["url"]]
+        if not db_row.empty:
+            if "AdText" in db_row.columns and not pd.isna(db_row["AdText"].iloc[0]):
+                result.at[index, "AdText"] = db_row["AdText"].iloc[0]
+
+    new_rows = new_rows.copy()
+    new_rows["AdText"] = "scraped " + new_rows["url"]
+    df_today = pd.concat([result, new_rows])
+    for index, row in new_rows.iterrows():
+        mask = df_today["url"] == row["url"]
+        if any(mask):
+            df_today.loc[mask, "AdText"] = row["AdText"]
+    return df_today, new_rows, removed_urls
+
+
+def vectorized_diff(db_listings, df_today):
+    """The same steps through the DiffEngine."""
+    diff = DiffEngine.diff(db_listings, df_today)
+    new_rows = diff.new.dropna(axis=1, how="all").copy()
+    new_rows["AdText"] = "scraped " + new_rows["url"]
+    df_today = pd.concat([diff.existing, new_rows])
+    DiffEngine.fill_ad_text(df_today, new_rows)
+    return df_today, new_rows, diff.removed_urls, diff
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    max_legacy = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+
+    print(f"{'listings':>9} {'legacy':>10} {'vectorized':>11} {'us/listing':>11}  changes")
+    for rows in SIZES:
+        db, today = build_snapshots(rows)
+        (df_new, new_rows, removed, diff), seconds = timed(vectorized_diff, db, today.copy())
+
+        legacy = "-"
+        if rows <= max_legacy:
+            (df_old, old_new_rows, old_removed), legacy_seconds = timed(legacy_diff, db, today.copy())
+            pd.testing.assert_frame_equal(df_old, df_new)
+            pd.testing.assert_frame_equal(old_new_rows, new_rows)
+            assert old_removed == removed
+            legacy = f"{legacy_seconds:9.3f}s"
+
+        print(f"{rows:>9} {legacy:>10} {seconds:10.3f}s {seconds / rows * 1e6:10.2f}   {diff.summary()}")
+
+
+if __name__ == "__main__":
+    main()
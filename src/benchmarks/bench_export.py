@@ -0,0 +1,82 @@
+"""
+Export time and peak memory: the previous pandas/openpyxl ExcelWriter export versus the streaming
+xlsx writer, CSV and Parquet. Each mode runs in its own process so peak RSS isn't shared.
+Run from the src directory: python -m benchmarks.bench_export [rows]
+"""
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from benchmarks.bench_listing_queries import build_listings
+from config import Config
+from utils.file_manager import FileManager
+
+MODES = ["legacy xlsx", "xlsx", "csv", "parquet"]
+
+
+def current_rss_mib():
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def legacy_export(path, df_today, new_ads, removed_ads):
+    """The export before the streaming writer: every cell is built in memory by ExcelWriter."""
+    with pd.ExcelWriter(path, engine="openpyxl") as writer:
+        df_today.to_excel(writer, sheet_name="src", index=False)
+        new_ads.to_excel(writer, sheet_name="new_listings", index=False)
+        removed_ads.to_excel(writer, sheet_name="removed_listings", index=False)
+
+
+def run_mode(mode, rows):
+    """Export rows listings in one mode and print seconds, peak RSS growth and output size."""
+    df_today = build_listings(rows)
+    df_today["GoToLink"] = df_today["url"].map(lambda url: f'=HYPERLINK("{url}", "ClickToGo")')
+    new_ads = df_today.iloc[: rows // 20]
+    removed_ads = df_today.iloc[-rows // 20:]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config = Config()
+        config.TDY_PATH = os.path.join(tmp, "apts_tdy.xlsx")
+        config.EXPORT_FORMAT = mode.split()[-1]
+        file_manager = FileManager(config)
+
+        baseline = current_rss_mib()
+        start = time.perf_counter()
+        if mode == "legacy xlsx":
+            legacy_export(config.TDY_PATH, df_today, new_ads, removed_ads)
+        else:
+            file_manager.export_listings(df_today, new_ads, removed_ads)
+        elapsed = time.perf_counter() - start
+
+        # ru_maxrss is in KiB on Linux
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        size = sum(os.path.getsize(os.path.join(tmp, name)) for name in os.listdir(tmp))
+
+    print(f"RESULT {elapsed:.2f} {peak - baseline:.1f} {size / 1024 / 1024:.1f}")
+
+
+def main():
+    if len(sys.argv) > 2 and sys.argv[1] == "--mode":
+        run_mode(sys.argv[2], int(sys.argv[3]))
+        return
+
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    print(f"\n{rows} listings, plus {rows // 20} new and {rows // 20} removed")
+    print(f"{'mode':>12} {'seconds':>8} {'peak MiB':>9} {'file MiB':>9}")
+    for mode in MODES:
+        output = subprocess.run([sys.executable, "-m", "benchmarks.bench_export", "--mode", mode, str(rows)],
+                                capture_output=True, text=True, check=True).stdout
+        seconds, peak, size = output.split("RESULT ")[-1].split()
+        print(f"{mode:>12} {float(seconds):8.2f} {float(peak):9.1f} {float(size):9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Filter query cost on the listings table: the old LIKE filter on the text columns versus
+range filters on the typed, indexed numeric columns.
+Run from the src directory: python -m benchmarks.bench_listing_queries [rows]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from config import Config
+from core.normalizer import FieldNormalizer
+from utils.database_manager import DatabaseManager
+from utils.sql_queries import listings_table_sql
+
+QUERIES = [
+    ("LIKE Price text", ' AND Price LIKE ?', ["%45%"]),
+    ("LIKE Rooms text", ' AND Rooms LIKE ?', ["%2.5%"]),
+    ("Price range", " AND price_value >= ? AND price_value <= ?", [450, 460]),
+    ("Area range", " AND area_value >= ? AND area_value <= ?", [40, 42]),
+    ("Rooms range", " AND rooms_value >= ? AND rooms_value <= ?", [2.5, 2.5]),
+    ("Floor range", " AND floor_value >= ? AND floor_value <= ?", [0, 1]),
+]
+
+
+def build_listings(rows):
+    rng = random.Random(3)
+    df = pd.DataFrame({
+        "url": [f"https://www.halooglasi.com/ad/{i}" for i in range(rows)],
+        "Price": [str(rng.randint(300, 1500)) for _ in range(rows)],
+        "Area": [str(rng.randint(20, 150)) for _ in range(rows)],
+        "Rooms": [rng.choice(["1.0", "1.5", "2.0", "2.5", "3.0", "4+"]) for _ in range(rows)],
+        "Floor": [rng.choice(["Ground Floor", "1", "2", "3", "4", "7"]) for _ in range(rows)],
+        "Max Floor": [rng.choice(["4", "6", "10", "?"]) for _ in range(rows)],
+        "AdText": ["opis stana " * 30] * rows,
+    })
+    return FieldNormalizer.add_numeric_columns(df)
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config = Config()
+        config.DB_PATH = os.path.join(tmp, "bench.db")
+        database_manager = DatabaseManager(config)
+        database_manager.save_listings(build_listings(rows))
+
+        print(f"\n{rows} listings")
+        with database_manager.connections.connection() as conn:
+            conn.execute("ANALYZE")
+            for label, condition, params in QUERIES:
+                query = listings_table_sql + condition
+                plan = " | ".join(row[-1] for row in conn.execute("EXPLAIN QUERY PLAN " + query, params))
+
+                best = None
+                for _ in range(5):
+                    start = time.perf_counter()
+                    matched = len(conn.execute(query, params).fetchall())
+                    elapsed = time.perf_counter() - start
+                    best = elapsed if best is None else min(best, elapsed)
+
+                print(f"{label:>16}: {best * 1000:8.2f} ms, {matched:6} rows  [{plan}]")
+        database_manager.connections.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Revalidation of repeated dashboard table requests. DataTables sends a new draw counter and jQuery a
+new cache buster with every request, so requests carrying them never hit the browser's cache and always
+download the page again. The dashboard leaves both out, the repeated request sends If-None-Match
+and must be answered 304 until a run changes the data.
+Run from the src directory: python -m benchmarks.bench_listings_etag [rows] [page_length]
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+
+from benchmarks.bench_listing_queries import build_listings
+from config import Config
+
+
+def load_app(tmp):
+    """Import the web app with its data, scripts and database in a temporary directory."""
+    init = Config.__init__
+
+    def tmp_init(self):
+        init(self)
+        self.DATA_DIR = tmp
+        self.SCRIPTS_DIR = tmp
+        self.DB_PATH = os.path.join(tmp, "bench.db")
+        self.BAT_FILE_PATH = os.path.join(tmp, "runner.bat")
+        self.HTTP_CACHE_DIR = os.path.join(tmp, "http_cache")
+        self.SNAPSHOT_DIR = os.path.join(tmp, "snapshots")
+
+    Config.__init__ = tmp_init
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            import app
+    finally:
+        Config.__init__ = init
+    app.app.config['LOGIN_DISABLED'] = True
+    return app
+
+
+def table_params(length, draw=None, cache_buster=None):
+    """Query string of a DataTables page request, with or without draw and the cache buster."""
+    params = {"table_type": "all", "start": 0, "length": length, "order[0][column]": 0, "order[0][dir]": "asc"}
+    if draw is not None:
+        params["draw"] = draw
+    if cache_buster is not None:
+        params["_"] = cache_buster
+    return params
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    length = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = load_app(tmp)
+        app.database_manager.save_listings(build_listings(rows))
+        app.database_manager.bump_data_version()
+        client = app.app.test_client()
+
+        first = client.get("/listings", query_string=table_params(length, draw=1, cache_buster=1000))
+        second = client.get("/listings", query_string=table_params(length, draw=2, cache_buster=1001),
+                            headers={"If-None-Match": first.headers["ETag"]})
+        assert second.headers["ETag"] == first.headers["ETag"], "draw and the cache buster changed the ETag"
+
+        response = client.get("/listings", query_string=table_params(length))
+        etag = response.headers["ETag"]
+        repeated = client.get("/listings", query_string=table_params(length), headers={"If-None-Match": etag})
+        assert repeated.status_code == 304, repeated.status_code
+        assert repeated.headers["ETag"] == etag
+        assert not repeated.data
+
+        app.database_manager.bump_data_version()
+        changed = client.get("/listings", query_string=table_params(length), headers={"If-None-Match": etag})
+        assert changed.status_code == 200, "a new data version was answered 304"
+        app.database_manager.connections.close()
+
+    print("Repeated table request answered 304, new data answered 200: ok\n")
+    print(f"{rows} listings, pages of {length}")
+    print(f"{'request':>36} {'status':>6} {'bytes':>8}")
+    print(f"{'first':>36} {first.status_code:6} {len(first.data):8}")
+    print(f"{'repeat, new draw and cache buster':>36} {second.status_code:6} {len(second.data):8}")
+    print(f"{'repeat, same URL':>36} {repeated.status_code:6} {len(repeated.data):8}")
+    print(f"{'repeat after a run':>36} {changed.status_code:6} {len(changed.data):8}")
+
+
+if __name__ == "__main__":
+    main()
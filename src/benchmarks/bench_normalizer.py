@@ -0,0 +1,94 @@
+"""
+Field normalization throughput: the previous per-row conversion (RomanConverter in the scrape loop,
+a string split and a parse per cell) versus FieldNormalizer's column-at-a-time lookups.
+The equivalence and property tests of the normalizer are in tests/test_normalizer.py.
+Run from the src directory: python -m benchmarks.bench_normalizer [listings]
+"""
+import random
+import re
+import sys
+import time
+
+import pandas as pd
+
+from benchmarks.fixtures import FLOORS, ROOMS
+from core.data_processor import NUMERIC_COLUMNS
+from core.normalizer import FieldNormalizer
+from core.roman_converter import RomanConverter
+
+LEGACY_NUMBER_RE = re.compile(r"^\s*(\d+(?:[.,]\d+)?)")
+
+# Floors the old converter couldn't handle or got wrong
+NEW_FLOORS = ["SUT", "SUT/4", "PSUT/5", "VPR/4", "PR/4", "3/7"]
+
+
+def legacy_to_number(value):
+    if value is None or pd.isna(value):
+        return None
+    match = LEGACY_NUMBER_RE.match(str(value))
+    if not match:
+        return None
+    return float(match.group(1).replace(",", "."))
+
+
+def legacy_floor_to_number(value):
+    if value is not None and not pd.isna(value) and "Ground Floor" in str(value):
+        return 0.0
+    return legacy_to_number(value)
+
+
+def legacy_normalize(ads):
+    """The normalization before FieldNormalizer: per ad in the scrape loop, then per cell."""
+    for ad in ads:
+        if ad["floor"] is not None:
+            ad["floor"] = RomanConverter.convert_mixed_numerals(ad["floor"])
+
+    df = pd.DataFrame(ads)
+    df[["Floor", "Max Floor"]] = df["floor"].str.split("/", expand=True)
+    df = df.drop(columns=["floor"])
+    for column, numeric_column in NUMERIC_COLUMNS.items():
+        parse = legacy_floor_to_number if column == "Floor" else legacy_to_number
+        df[numeric_column] = df[column].map(parse).astype("float64")
+    return df
+
+
+def build_ads(count, floors, seed=11):
+    rng = random.Random(seed)
+    return [{
+        "url": f"https://www.halooglasi.com/ad/{i}",
+        "Price": str(rng.randint(300, 3000)),
+        "Area": rng.choice([str(rng.randint(20, 150)), f"{rng.randint(20, 150)},5"]),
+        "Rooms": rng.choice(ROOMS),
+        "floor": rng.choice(floors) if rng.random() > 0.02 else None,
+    } for i in range(count)]
+
+
+def best_time(setup, run, repeat=3):
+    """Best time of run(setup()), the setup isn't timed."""
+    best = None
+    for _ in range(repeat):
+        data = setup()
+        start = time.perf_counter()
+        run(data)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+    # The old conversion starts from the scraped dicts, the new one from their DataFrame
+    legacy = best_time(lambda: build_ads(count, FLOORS), legacy_normalize)
+    new = best_time(lambda: pd.DataFrame(build_ads(count, FLOORS)), FieldNormalizer.normalize)
+    print(f"\n{count} listings")
+    print(f"  per row:    {legacy:.3f}s ({count / legacy:,.0f} listings/s)")
+    print(f"  vectorized: {new:.3f}s ({count / new:,.0f} listings/s), {legacy / new:.1f}x")
+
+    df = FieldNormalizer.normalize(pd.DataFrame(build_ads(1000, NEW_FLOORS)))
+    print("\nFloors the old conversion failed on or got wrong:")
+    print(df[["Floor", "Max Floor", "floor_value", "max_floor_value"]].drop_duplicates().to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
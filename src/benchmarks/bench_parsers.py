@@ -0,0 +1,74 @@
+"""
+Compare parse time per page for each parser backend over a corpus of result pages.
+Run from the src directory: python -m benchmarks.bench_parsers [saved_pages_dir]
+
+Without a directory, synthetic fixture pages are used. Saved pages are raw result pages
+stored as *.html. Every backend must return the same dicts as html.parser.
+"""
+import glob
+import os
+import sys
+import time
+from functools import partial
+
+from services.parsers import PARSER_BACKENDS, create_parser
+from services.sources import HalooglasiSource
+from benchmarks.fixtures import ad_page_html, results_page_html
+
+
+def load_pages():
+    """Load saved result pages from the given directory or build synthetic ones."""
+    if len(sys.argv) > 1:
+        pages = []
+        for path in sorted(glob.glob(os.path.join(sys.argv[1], "*.html"))):
+            with open(path, "rb") as f:
+                pages.append(f.read())
+        return pages
+    return [results_page_html(page, page_count=50, seed=7).encode("utf-8") for page in range(1, 51)]
+
+
+def time_backend(parse, pages, repeat=3):
+    """Return the best per-page parse time in ms and the parse results."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        results = [parse(page) for page in pages]
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / len(pages) * 1000, results
+
+
+def main():
+    pages = load_pages()
+    if not pages:
+        print("No pages to benchmark.")
+        return
+
+    ad_pages = [ad_page_html(ad_id) for ad_id in range(50)]
+    print(f"{len(pages)} result pages, {len(ad_pages)} rendered ad pages\n")
+
+    reference = None
+    baseline = None
+    for name in PARSER_BACKENDS:
+        parser = create_parser(name)
+        if parser.name != name:
+            print(f"{name:>12}: not installed, skipped")
+            continue
+
+        markup = HalooglasiSource.markup
+        listing_ms, listing_results = time_backend(
+            partial(parser.parse_listings, markup=markup, page_url="https://www.halooglasi.com/nekretnine"), pages)
+        ad_ms, ad_results = time_backend(partial(parser.parse_description, markup=markup), ad_pages)
+
+        if reference is None:
+            reference = (listing_results, ad_results)
+            baseline = listing_ms
+        elif (listing_results, ad_results) != reference:
+            raise AssertionError(f"{name} backend output differs from {next(iter(PARSER_BACKENDS))}")
+
+        print(f"{name:>12}: {listing_ms:7.2f} ms/result page ({baseline / listing_ms:4.1f}x), "
+              f"{ad_ms:7.2f} ms/ad page")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Crash and resume of the checkpointed pipeline against the local stand-in server.
+Day 1 stores 30 pages of listings. On day 2 ten more pages appear and the run crashes while scraping
+description crash_at of 200, then the next attempt fails while writing the listings. The benchmark
+checks neither crash changed the listings tables or the listing history, that the failed commit kept
+the checkpoint and was recorded as an error, resumes the run and compares the result with an
+uninterrupted day 2, along with the pages and descriptions each run had to fetch.
+Run from the src directory: python -m benchmarks.bench_resume [crash_at] [latency_seconds]
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from benchmarks.fixtures import StandInServer
+from config import Config
+from core.apartment_tracker import ApartmentTracker
+from core.data_processor import DataProcessor
+from core.roman_converter import RomanConverter
+from services.scraper import Scraper
+from utils.database_manager import DatabaseManager
+from utils.file_manager import FileManager
+
+
+class CrashingScraper(Scraper):
+    """Scraper with stand-in descriptions that counts requests and can crash after some descriptions."""
+
+    def __init__(self, config, latency, crash_at=None):
+        super().__init__(config)
+        self.latency = latency
+        self.crash_at = crash_at
+        self.pages = self.descriptions = 0
+
+    def _scrape_page(self, search_url, page):
+        self.pages += 1
+        return super()._scrape_page(search_url, page)
+
+    def fetch_ad_text(self, url):
+        time.sleep(self.latency)
+        self.descriptions += 1
+        if self.crash_at is not None and self.descriptions >= self.crash_at:
+            raise RuntimeError(f"browser crashed at description {self.descriptions}")
+        return f"Opis oglasa {url.rsplit('/', 1)[-1]}"
+
+
+def build_tracker(data_dir, server, latency, crash_at=None):
+    config = Config()
+    config.DATA_DIR = data_dir
+    config.DB_PATH = os.path.join(data_dir, "bench.db")
+    config.TDY_PATH = os.path.join(data_dir, "apts_tdy.xlsx")
+    config.YTD_PATH = os.path.join(data_dir, "apts_ytd.xlsx")
+    config.SCRIPTS_DIR = config.DATA_DIR
+    config.BAT_FILE_PATH = os.path.join(data_dir, "runner.bat")
+    config.SNAPSHOTS = False
+    config.HTTP_CACHE = False
+    config.SRC = server.url
+    config.SEARCHES = {"default": server.url}
+    config.HOST_REQUESTS_PER_MINUTE = 0
+    # One description at a time, so the crash happens at a known point
+    config.CRAWL_CONCURRENCY = 1
+
+    scraper = CrashingScraper(config, latency, crash_at)
+    tracker = ApartmentTracker(config, RomanConverter(), DataProcessor(), scraper, FileManager(config),
+                               DatabaseManager(config))
+    return tracker, scraper
+
+
+def run_quietly(tracker, search="default"):
+    """Run the tracker without its per-ad output, returns the exception it raised if any."""
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            tracker.run(search)
+    except RuntimeError as e:
+        return e
+    return None
+
+
+def fail_write(df):
+    raise RuntimeError("disk I/O error")
+
+
+def table(tracker, query):
+    with tracker.database_manager.connections.connection() as conn:
+        return pd.read_sql_query(query, conn)
+
+
+def listing_state(tracker):
+    return table(tracker, "SELECT url, AdText, is_active FROM listings ORDER BY url").reset_index(drop=True)
+
+
+def main():
+    crash_at = int(sys.argv[1]) if len(sys.argv) > 1 else 180
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.01
+
+    with tempfile.TemporaryDirectory() as crash_dir, tempfile.TemporaryDirectory() as clean_dir:
+        with StandInServer(page_count=30, latency=latency) as server:
+            port = server.port
+            for data_dir in (crash_dir, clean_dir):
+                tracker, _ = build_tracker(data_dir, server, latency)
+                run_quietly(tracker)
+
+        with StandInServer(page_count=40, latency=latency, port=port) as server:
+            # Uninterrupted day 2
+            tracker, clean = build_tracker(clean_dir, server, latency)
+            start = time.perf_counter()
+            run_quietly(tracker)
+            clean_seconds = time.perf_counter() - start
+            expected = listing_state(tracker)
+
+            # Day 2 crashing part way through the descriptions
+            tracker, crashed = build_tracker(crash_dir, server, latency, crash_at)
+            before = listing_state(tracker), table(tracker, "SELECT url FROM new_listings ORDER BY url")
+            start = time.perf_counter()
+            error = run_quietly(tracker)
+            crash_seconds = time.perf_counter() - start
+            assert error is not None, "the run didn't crash"
+            assert listing_state(tracker).equals(before[0]), "the crashed run changed the listings table"
+            assert table(tracker, "SELECT url FROM new_listings ORDER BY url").equals(before[1]), \
+                "the crashed run changed the new_listings table"
+
+            # The next attempt fails halfway through the commit, after the events were recorded
+            tracker, failed = build_tracker(crash_dir, server, latency)
+            events = table(tracker, "SELECT COUNT(*) AS n FROM listing_events")["n"][0]
+            tracker.database_manager.save_listings = fail_write
+            start = time.perf_counter()
+            commit_error = run_quietly(tracker)
+            commit_seconds = time.perf_counter() - start
+            assert commit_error is not None, "the commit didn't fail"
+            assert listing_state(tracker).equals(before[0]), "the failed commit changed the listings table"
+            assert table(tracker, "SELECT url FROM new_listings ORDER BY url").equals(before[1]), \
+                "the failed commit changed the new_listings table"
+            assert table(tracker, "SELECT COUNT(*) AS n FROM listing_events")["n"][0] == events, \
+                "the failed commit recorded listing events"
+            assert table(tracker, "SELECT COUNT(*) AS n FROM crawl_listings")["n"][0] > 0, \
+                "the failed commit dropped the checkpoint"
+            assert table(tracker, "SELECT status FROM runs ORDER BY id DESC LIMIT 1")["status"][0] == "error"
+
+            # The next run resumes from the checkpoint
+            tracker, resumed = build_tracker(crash_dir, server, latency)
+            start = time.perf_counter()
+            assert run_quietly(tracker) is None
+            resume_seconds = time.perf_counter() - start
+            assert listing_state(tracker).equals(expected), "the resumed run differs from an uninterrupted one"
+            assert table(tracker, "SELECT COUNT(*) AS n FROM crawl_listings")["n"][0] == 0, "checkpoint not cleared"
+
+    print(f"\nDay 2: 40 pages, 200 new listings, crash at description {crash_at} ({error}), "
+          f"then a failed commit ({commit_error})")
+    print("Listings, new_listings and the history untouched by both, resumed result identical to an uninterrupted run")
+    print(f"{'run':>14} {'pages':>6} {'descriptions':>13} {'seconds':>8}")
+    for label, scraper, seconds in (("uninterrupted", clean, clean_seconds), ("crashed", crashed, crash_seconds),
+                                    ("failed commit", failed, commit_seconds), ("resumed", resumed, resume_seconds)):
+        print(f"{label:>14} {scraper.pages:6d} {scraper.descriptions:13d} {seconds:8.2f}")
+
+
+if __name__ == "__main__":
+    main()
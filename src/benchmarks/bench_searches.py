@@ -0,0 +1,68 @@
+"""
+Several saved searches crawled together versus one run per search, against the local stand-in server.
+Three overlapping searches of 20 pages each (the windows start at pages 1, 11 and 16) share most of
+their ads. Checks the shared run stores the same listings as the separate runs and tags each search
+with the ads it returned, and compares the pages and descriptions each approach fetches.
+Run from the src directory: python -m benchmarks.bench_searches [latency_seconds]
+"""
+import sys
+import tempfile
+import time
+
+from benchmarks.bench_resume import build_tracker, run_quietly, table
+from benchmarks.fixtures import StandInServer
+
+SHIFTS = {"centar": 0, "vracar": 10, "zvezdara": 15}
+
+
+def run_searches(data_dir, server, latency, searches):
+    """Run the tracker once over the given {name: url} searches, returns (tracker, scraper, seconds)."""
+    tracker, scraper = build_tracker(data_dir, server, latency)
+    tracker.config.SEARCHES = searches
+    with tracker.database_manager.connections.transaction() as conn:
+        conn.execute("UPDATE searches SET enabled = 0")
+    tracker.saved_searches.seed(searches)
+
+    start = time.perf_counter()
+    error = run_quietly(tracker)
+    assert error is None, error
+    return tracker, scraper, time.perf_counter() - start
+
+
+def main():
+    latency = float(sys.argv[1]) if len(sys.argv) > 1 else 0.01
+
+    with StandInServer(page_count=20, latency=latency) as server:
+        searches = {name: f"{server.url}&shift={shift}" for name, shift in SHIFTS.items()}
+
+        # One run, and one database, per search
+        separate = {}
+        pages = descriptions = seconds = 0
+        for name, url in searches.items():
+            with tempfile.TemporaryDirectory() as data_dir:
+                tracker, scraper, elapsed = run_searches(data_dir, server, latency, {name: url})
+                separate[name] = set(table(tracker, "SELECT url FROM listings")["url"])
+            pages, descriptions, seconds = pages + scraper.pages, descriptions + scraper.descriptions, seconds + elapsed
+
+        # All searches in one run
+        with tempfile.TemporaryDirectory() as data_dir:
+            tracker, shared, shared_seconds = run_searches(data_dir, server, latency, searches)
+            stored = set(table(tracker, "SELECT url FROM listings")["url"])
+            matches = table(tracker, "SELECT search, url FROM search_matches")
+            listed = tracker.saved_searches.list().set_index("name")["active_matches"]
+
+    assert stored == set().union(*separate.values()), "the shared run stored different listings"
+    for name, urls in separate.items():
+        assert set(matches.loc[matches["search"] == name, "url"]) == urls, f"wrong matches for {name}"
+        assert listed[name] == len(urls), f"wrong active match count for {name}"
+    print("Shared run stores the union of the separate runs and tags every search with its own ads: ok")
+
+    total = sum(len(urls) for urls in separate.values())
+    print(f"\n{len(searches)} searches, {total} matches, {len(stored)} distinct listings")
+    print(f"{'approach':>14} {'pages':>6} {'descriptions':>13} {'seconds':>8}")
+    print(f"{'separate runs':>14} {pages:6d} {descriptions:13d} {seconds:8.2f}")
+    print(f"{'shared run':>14} {shared.pages:6d} {shared.descriptions:13d} {shared_seconds:8.2f}")
+
+
+if __name__ == "__main__":
+    main()
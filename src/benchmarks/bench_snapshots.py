@@ -0,0 +1,143 @@
+"""
+History reads over the daily snapshots: loading whole snapshots with pandas versus the memory-mapped,
+column-projected reads of SnapshotStore, for a price trend and a diff between two days.
+Each mode runs in its own process so peak RSS isn't shared.
+Run from the src directory: python -m benchmarks.bench_snapshots [snapshots] [rows]
+"""
+import contextlib
+import datetime as dt
+import io
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from benchmarks.bench_listing_queries import build_listings
+from config import Config
+from core.diff_engine import DiffEngine
+from utils.database_manager import DatabaseManager
+from utils.snapshot_store import SnapshotStore
+
+MODES = ["trend full", "trend projected", "diff full", "diff projected"]
+
+
+def rss_mib(field):
+    """Current (VmRSS) or peak (VmHWM) resident memory of this process, VmHWM starts over on exec."""
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith(field + ":"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def open_store(data_dir):
+    config = Config()
+    config.DB_PATH = os.path.join(data_dir, "bench.db")
+    database_manager = DatabaseManager(config)
+    # Keep every snapshot, the benchmark backdates them
+    return SnapshotStore(database_manager, os.path.join(data_dir, "snapshots"), 10000, 10000)
+
+
+def build_history(data_dir, snapshots, rows):
+    """Write one snapshot per day, a few listings come, go and change price every day."""
+    rng = random.Random(5)
+    df = build_listings(rows)
+    df["AdText"] = [f"opis stana {i} " * 25 for i in range(rows)]
+    store = open_store(data_dir)
+    today = dt.date.today()
+
+    next_id = rows
+    for day in range(snapshots):
+        changed = rng.sample(range(len(df)), len(df) // 50)
+        df.loc[df.index[changed], "price_value"] *= 0.95
+        df.loc[df.index[changed], "Price"] = df.loc[df.index[changed], "price_value"].round().astype(int).astype(str)
+
+        fresh = build_listings(len(df) // 100)
+        fresh["url"] = [f"https://www.halooglasi.com/ad/{next_id + i}" for i in range(len(fresh))]
+        fresh["AdText"] = [f"novi stan {next_id + i} " * 25 for i in range(len(fresh))]
+        next_id += len(fresh)
+        df = pd.concat([df.drop(df.index[:len(fresh)]), fresh], ignore_index=True)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            store.write(df, day + 1)
+        taken_on = today - dt.timedelta(days=snapshots - 1 - day)
+        with store.connections.transaction() as conn:
+            conn.execute("UPDATE snapshots SET taken_on = ?, taken_at = ? WHERE run_id = ?",
+                         (taken_on.isoformat(), f"{taken_on} 08:00:00", day + 1))
+
+
+def full_trend(store, days):
+    """The naive trend: load every snapshot completely and take the column from the DataFrame."""
+    catalog = store.catalog()
+    since = (dt.date.today() - dt.timedelta(days=days)).isoformat()
+    rows = []
+    for taken_on, path in catalog.loc[catalog["taken_on"] >= since, ["taken_on", "path"]].itertuples(index=False):
+        values = pd.read_parquet(path)["price_value"]
+        rows.append({"date": taken_on, "median": values.median(), "mean": values.mean()})
+    return pd.DataFrame(rows)
+
+
+def full_diff(store, from_date, to_date):
+    """The naive diff: load both snapshots completely."""
+    old = pd.read_parquet(store.snapshot_on(from_date))
+    new = pd.read_parquet(store.snapshot_on(to_date))
+    in_old = DiffEngine.contains(old["url"], new["url"])
+    changed = new[in_old][DiffEngine.changed_mask(new[in_old], old)]
+    return {"added": new[~in_old], "removed": old[~DiffEngine.contains(new["url"], old["url"])], "changed": changed}
+
+
+def run_mode(mode, data_dir, days):
+    """Run one read mode and print seconds, peak RSS growth and a checksum of the result."""
+    store = open_store(data_dir)
+    from_date = (dt.date.today() - dt.timedelta(days=days - 1)).isoformat()
+    to_date = dt.date.today().isoformat()
+
+    baseline = rss_mib("VmRSS")
+    start = time.perf_counter()
+    if mode == "trend full":
+        result = full_trend(store, days)
+        checksum = f"{result['median'].sum():.1f}"
+    elif mode == "trend projected":
+        result = store.trend(days)
+        checksum = f"{result['median'].sum():.1f}"
+    else:
+        diff = full_diff(store, from_date, to_date) if mode == "diff full" else store.diff(from_date, to_date)
+        checksum = "/".join(str(len(diff[name])) for name in ("added", "removed", "changed"))
+    elapsed = time.perf_counter() - start
+
+    peak = rss_mib("VmHWM")
+    print(f"RESULT {elapsed:.3f} {peak - baseline:.1f} {checksum}")
+
+
+def main():
+    if len(sys.argv) > 2 and sys.argv[1] == "--mode":
+        run_mode(sys.argv[2], sys.argv[3], int(sys.argv[4]))
+        return
+
+    snapshots = int(sys.argv[1]) if len(sys.argv) > 1 else 90
+    rows = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        build_history(tmp, snapshots, rows)
+        size = sum(os.path.getsize(os.path.join(tmp, "snapshots", name))
+                   for name in os.listdir(os.path.join(tmp, "snapshots")))
+        print(f"\n{snapshots} daily snapshots of {rows} listings, {size / 1024 / 1024:.1f} MiB on disk "
+              f"(written in {time.perf_counter() - start:.1f}s)")
+
+        print(f"{'mode':>16} {'seconds':>8} {'peak MiB':>9}  result")
+        for mode in MODES:
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_snapshots", "--mode", mode, tmp, str(snapshots)],
+                capture_output=True, text=True, check=True
+            ).stdout
+            seconds, peak, checksum = output.split("RESULT ")[-1].split()
+            print(f"{mode:>16} {float(seconds):8.3f} {float(peak):9.1f}  {checksum}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Two portals crawled one after another versus in parallel through the shared host scheduler.
+Each portal is a local stand-in server on its own port with its own budget in HOST_LIMITS. Checks both
+ways return the same ads and that neither server saw more concurrent requests, or more requests over
+the run, than its budget allows.
+Run from the src directory: python -m benchmarks.bench_sources [page_count] [latency_seconds]
+"""
+import contextlib
+import io
+import sys
+import time
+
+from benchmarks.fixtures import StandInServer
+from config import Config
+from services.scraper import Scraper
+
+# Budgets of the two stand-in portals
+BUDGETS = [{"concurrency": 4, "requests_per_minute": 600}, {"concurrency": 2, "requests_per_minute": 300}]
+
+
+def build_scraper(servers):
+    config = Config()
+    config.HTTP_CACHE = False
+    config.HOST_LIMITS = {server.host: budget for server, budget in zip(servers, BUDGETS)}
+    return Scraper(config)
+
+
+def crawl_one_by_one(servers):
+    """Crawl each portal's search in turn, returns {search: ads}."""
+    scraper = build_scraper(servers)
+    results = {}
+    for num, server in enumerate(servers):
+        results[f"portal{num}"] = [ad for _, _, ads, _ in scraper.iter_pages(server.url) for ad in ads]
+    return results
+
+
+def crawl_in_parallel(servers):
+    """Crawl all portals' searches together through crawl_searches, returns {search: ads}."""
+    scraper = build_scraper(servers)
+    results = {f"portal{num}": [] for num in range(len(servers))}
+    searches = {f"portal{num}": server.url for num, server in enumerate(servers)}
+    scraper.crawl_searches(searches, lambda name: {},
+                           lambda name, page, listing_count, page_count, ads: results[name].append((page, ads)))
+    return {name: [ad for _, ads in sorted(pages, key=lambda item: item[0]) for ad in ads]
+            for name, pages in results.items()}
+
+
+def check_budgets(servers, start):
+    """Assert no server got more concurrent requests or more requests over time than its budget."""
+    for server, budget in zip(servers, BUDGETS):
+        httpd = server.httpd
+        assert httpd.max_in_flight <= budget["concurrency"], (server.host, httpd.max_in_flight)
+        times = [t for t in httpd.request_times if t >= start]
+        allowed = budget["concurrency"] + (times[-1] - start) * budget["requests_per_minute"] / 60
+        assert len(times) <= allowed + 1, (server.host, len(times), allowed)
+
+
+def timed(crawl, servers):
+    for server in servers:
+        server.httpd.max_in_flight = 0
+    start = time.monotonic()
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = crawl(servers)
+    seconds = time.monotonic() - start
+    check_budgets(servers, start)
+    return results, seconds, [server.httpd.max_in_flight for server in servers]
+
+
+def main():
+    page_count = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.1
+
+    with StandInServer(page_count, latency) as first, StandInServer(page_count, latency) as second:
+        servers = [first, second]
+        serial, serial_seconds, serial_peaks = timed(crawl_one_by_one, servers)
+        parallel, parallel_seconds, parallel_peaks = timed(crawl_in_parallel, servers)
+
+    assert serial == parallel, "the parallel crawl returned different ads"
+    print("Same ads both ways, no portal got more requests than its budget: ok")
+
+    print(f"\n2 portals, {page_count} pages each, {latency * 1000:.0f} ms latency")
+    for num, budget in enumerate(BUDGETS):
+        print(f"  portal{num}: {budget['concurrency']} concurrent, {budget['requests_per_minute']} requests/min")
+    print(f"{'crawl':>12} {'seconds':>8} {'peak in flight':>15}")
+    print(f"{'one by one':>12} {serial_seconds:8.2f} {str(serial_peaks):>15}")
+    print(f"{'parallel':>12} {parallel_seconds:8.2f} {str(parallel_peaks):>15}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+The listing crawl against a stand-in server that throttles, fails and stalls.
+- errors: 10% of the requests get a 503. The previous crawl, a plain GET parsed whatever came back,
+  read the error page as an empty results page and stopped there; the controller retries them.
+- throttling: the server answers 429 above 3 requests in flight, with and without Retry-After, while
+  the crawl may send 12. The concurrency limit falls to what the server tolerates.
+- stall: one page never answers in time, the read timeout and a retry recover it.
+- outage: every page after the first fails, the circuit breaker aborts the crawl after a bounded number
+  of requests instead of retrying each page.
+Every completed crawl must return exactly the ads of a crawl of a well-behaved server.
+Run from the src directory: python -m benchmarks.bench_throttle [page_count] [latency_seconds]
+"""
+import contextlib
+import io
+import sys
+import time
+
+from benchmarks.fixtures import StandInServer, crawl_ads
+from config import Config
+from services.host_scheduler import CrawlAborted
+from services.scraper import Scraper
+
+
+class LegacyScraper(Scraper):
+    """The fetch before the request controller: no timeout, no retry, no status check."""
+
+    def _fetch_parsed(self, url, parse):
+        return parse(self.session.get(url).content)
+
+
+def build_scraper(server, scraper_class=Scraper, concurrency=12):
+    config = Config()
+    config.SRC = server.url
+    config.HTTP_CACHE = False
+    config.CRAWL_CONCURRENCY = concurrency
+    config.HOST_REQUESTS_PER_MINUTE = 0
+    config.REQUEST_TIMEOUT = (1, 1)
+    config.REQUEST_BACKOFF_BASE = 0.05
+    config.REQUEST_BACKOFF_MAX = 2.0
+    return scraper_class(config)
+
+
+def crawl(server, scraper_class=Scraper, concurrent=True):
+    """Crawl the server, returns (ads or the error raised, seconds, scraper)."""
+    scraper = build_scraper(server, scraper_class)
+    scraper.config.CONCURRENT_CRAWL = concurrent
+    start = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = crawl_ads(scraper, scraper.config.SRC)
+    except CrawlAborted as e:
+        result = e
+    return result, time.perf_counter() - start, scraper
+
+
+def describe(label, result, seconds, scraper, server):
+    stats = scraper.host_scheduler.stats.get(server.host, {"requests": "-", "retries": "-"})
+    budget = scraper.host_scheduler._budgets.get(server.host)
+    outcome = f"{len(result)} ads" if isinstance(result, list) else "aborted"
+    limit = f"{int(budget.limit)}/{budget.max_concurrency}" if budget else "-"
+    print(f"{label:>28} {outcome:>10} {seconds:8.2f} {stats['requests']:>9} {stats['retries']:>8} "
+          f"{server.httpd.throttled + server.httpd.failed:7d} {limit:>6}")
+
+
+def main():
+    page_count = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.1
+    rows = []
+
+    # Every server listens on the first one's port, so all crawls return the same ad URLs
+    with StandInServer(page_count, latency) as server:
+        port = server.port
+        expected, seconds, scraper = crawl(server)
+        rows.append(("well-behaved", expected, seconds, scraper, server))
+
+    with StandInServer(page_count, latency, error_rate=0.1, seed=3, port=port) as server:
+        legacy, seconds, scraper = crawl(server, LegacyScraper, concurrent=False)
+        rows.append(("errors, previous fetch", legacy, seconds, scraper, server))
+    with StandInServer(page_count, latency, error_rate=0.1, seed=3, port=port) as server:
+        result, seconds, scraper = crawl(server, concurrent=False)
+        assert result == expected, "retried crawl differs"
+        rows.append(("errors", result, seconds, scraper, server))
+
+    for retry_after in (None, 0.5):
+        with StandInServer(page_count, latency, capacity=3, retry_after=retry_after, port=port) as server:
+            result, seconds, scraper = crawl(server)
+            assert result == expected, "throttled crawl differs"
+            label = "throttling" + (f", Retry-After {retry_after}" if retry_after else "")
+            rows.append((label, result, seconds, scraper, server))
+
+    with StandInServer(page_count, latency, stall_pages=[7], stall_seconds=30, port=port) as server:
+        result, seconds, scraper = crawl(server)
+        assert result == expected, "stalled crawl differs"
+        assert seconds < 10, "the stalled page wasn't timed out"
+        rows.append(("stalled page", result, seconds, scraper, server))
+
+    with StandInServer(page_count, latency, outage_from=2, port=port) as server:
+        result, seconds, scraper = crawl(server)
+        assert isinstance(result, CrawlAborted), "the outage didn't abort the crawl"
+        requests = scraper.host_scheduler.stats[server.host]["requests"]
+        # Page 1, the failures that open the breaker and the requests already in flight then
+        bound = 1 + scraper.config.CIRCUIT_BREAKER_FAILURES + scraper.config.CRAWL_CONCURRENCY
+        assert requests <= bound, (requests, bound)
+        rows.append(("outage", result, seconds, scraper, server))
+
+    print(f"\nPrevious fetch on 10% errors: {len(legacy)} of {len(expected)} ads, the first error ended the crawl")
+    print("Controlled crawls returned every ad despite errors, throttling and a stall; the outage aborted: ok\n")
+    print(f"{'server':>28} {'result':>10} {'seconds':>8} {'requests':>9} {'retries':>8} {'errors':>7} {'limit':>6}")
+    for row in rows:
+        describe(*row)
+
+
+if __name__ == "__main__":
+    main()
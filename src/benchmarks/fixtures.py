@@ -0,0 +1,279 @@
+"""Synthetic halooglasi-like pages and local stand-in servers (listings site, chat API) used by the benchmarks."""
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+FLOORS = ["PR", "VPR", "I/4", "II/5", "III/3", "IV/6", "VII/10", "XII/14"]
+ROOMS = ["1.0", "1.5", "2.0", "2.5", "3.0", "4+"]
+
+
+def listing_html(ad_id, rng):
+    """Render a single result listing block."""
+    kind = rng.choice(["Premium", "Standard", "Top"])
+    price = ""
+    if rng.random() > 0.05:
+        price = f'''<div class="central-feature-wrapper">
+    <span class="central-feature"><span data-value="{rng.randint(300, 1200)}">{ad_id} &euro;</span></span>
+  </div>'''
+    return f'''
+<div class="product-item product-list-item {kind} real-estates my-product-placeholder" data-id="{ad_id}">
+  {price}
+  <div class="col-md-6 col-sm-5 col-xs-6 col-lg-6 sm-margin">
+    <h3 class="product-title"><a href="/nekretnine/izdavanje-stanova/stan-{ad_id}/{ad_id}">Stan {ad_id}</a></h3>
+    <ul class="product-features">
+      <li class="col-p-1-3"><div class="value-wrapper">{rng.randint(25, 120)}&nbsp;m<sup>2</sup><span class="legend">Kvadratura</span></div></li>
+      <li class="col-p-1-3"><div class="value-wrapper">{rng.choice(ROOMS)}&nbsp;<span class="legend">Broj soba</span></div></li>
+      <li class="col-p-1-3"><div class="value-wrapper">{rng.choice(FLOORS)}&nbsp;<span class="legend">Spratnost</span></div></li>
+    </ul>
+  </div>
+</div>'''
+
+
+def results_page_html(page, page_count, per_page=20, seed=0, shift=0):
+    """
+    Render a results page; pages past page_count come back without listings.
+    shift moves the window of listings, so searches with close shifts share some of their ads.
+    """
+    rng = random.Random(seed * 100003 + page + shift)
+    listings = ""
+    if page <= page_count:
+        listings = "".join(listing_html((page + shift) * 1000 + i, rng) for i in range(per_page))
+    pagination = "".join(f'<li><a href="?page={num}">{num}</a></li>' for num in range(1, page_count + 1))
+    filler = '<div class="col-md-12"><p>' + 'lorem ipsum ' * 400 + '</p></div>'
+    return f'''<!DOCTYPE html><html><head><title>Izdavanje stanova</title>
+<script>QuidditaEnvironment.serverListData = {{"TotalCount":{page_count * per_page},"Page":{page}}};</script>
+</head><body>{filler}<div class="row">{listings}</div><ul class="pagination">{pagination}</ul></body></html>'''
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        query = parse_qs(urlparse(self.path).query)
+        page = int(query.get("page", ["1"])[0])
+        with server.lock:
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+            server.request_times.append(time.monotonic())
+            throttled = server.capacity is not None and server.in_flight > server.capacity
+            failed = server.rng.random() < server.error_rate or (server.outage_from or page + 1) <= page
+            stalled = page in server.stall_pages
+            server.stall_pages.discard(page)
+            server.throttled += throttled
+            server.failed += failed and not throttled
+        try:
+            if throttled:
+                self._send_error(429, server.retry_after)
+            elif failed:
+                self._send_error(503)
+            else:
+                if stalled:
+                    time.sleep(server.stall_seconds)
+                self._send_results_page(server, query, page)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def _send_error(self, status, retry_after=None):
+        time.sleep(self.server.latency / 4)
+        body = b"Too many requests" if status == 429 else b"Service unavailable"
+        self.send_response(status)
+        if retry_after is not None:
+            self.send_header("Retry-After", str(retry_after))
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_results_page(self, server, query, page):
+        time.sleep(server.latency)
+        shift = int(query.get("shift", ["0"])[0])
+        body = results_page_html(page, server.page_count, shift=shift).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StandInServer:
+    """
+    Local HTTP server serving synthetic result pages with added latency.
+    Records the start time of every request and the most requests it had in flight at once.
+    It can also misbehave: answer 429 (with an optional Retry-After) above capacity requests in flight,
+    503 for a share of the requests or every page from outage_from on, and stall the first request
+    of stall_pages for stall_seconds.
+    Ad URLs are relative to the server, pass the port of an earlier server to serve the same ads.
+    """
+
+    def __init__(self, page_count=40, latency=0.2, capacity=None, retry_after=None, error_rate=0.0,
+                 outage_from=None, stall_pages=(), stall_seconds=30.0, seed=0, port=0):
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), _StandInHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.page_count = page_count
+        self.httpd.latency = latency
+        self.httpd.lock = threading.Lock()
+        self.httpd.in_flight = self.httpd.max_in_flight = 0
+        self.httpd.request_times = []
+        self.httpd.capacity = capacity
+        self.httpd.retry_after = retry_after
+        self.httpd.error_rate = error_rate
+        self.httpd.outage_from = outage_from
+        self.httpd.rng = random.Random(seed)
+        self.httpd.stall_pages = set(stall_pages)
+        self.httpd.stall_seconds = stall_seconds
+        self.httpd.throttled = self.httpd.failed = 0
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def host(self):
+        host, port = self.httpd.server_address
+        return f"{host}:{port}"
+
+    @property
+    def port(self):
+        return self.httpd.server_address[1]
+
+    @property
+    def url(self):
+        return f"http://{self.host}/nekretnine/izdavanje-stanova?cena_d_from=450"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def ad_page_html(ad_id, embedded=True, seed=0):
+    """
+    Render an ad page the way the server ships it: the description lives in the embedded
+    listing data and span#plh51 is only filled in by JavaScript.
+    """
+    rng = random.Random(seed * 100003 + ad_id)
+    words = ["stan", "terasa", "lift", "parking", "grejanje", "namesten", "blizu", "centra", "mirna", "ulica"]
+    text_html = "<br />".join(" ".join(rng.choice(words) for _ in range(12)) for _ in range(6))
+    classified = json.dumps({"Id": ad_id, "Title": f"Stan {ad_id}", "TextHtml": text_html if embedded else ""})
+    scripts = "".join(f"<script src=\"/static/bundle{num}.js\"></script>" for num in range(20))
+    filler = "<div class=\"col-md-12\"><p>" + "lorem ipsum " * 2000 + "</p></div>"
+    return f'''<!DOCTYPE html><html><head><title>Stan {ad_id}</title>{scripts}
+<script>QuidditaEnvironment.CurrentClassified = {classified}; QuidditaEnvironment.Other = {{}};</script>
+</head><body>{filler}
+<div class="col-md-12"><div class="product-page view-mode theme-blue"><div class="tab-top-group">
+<div id="tabTopHeader3"><span id="plh51">{text_html}</span></div></div></div></div>
+</body></html>'''
+
+
+AD_HEADER_RE = re.compile(r"^Ad \d+:\n", re.MULTILINE)
+
+
+def stub_analysis(ad_text):
+    """Deterministic stand-in for the model's analysis of one ad."""
+    return f"analysis {hashlib.sha1(ad_text.encode()).hexdigest()[:10]}"
+
+
+class _StubChatHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, status, body, headers=None):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        server = self.server
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        content = request["messages"][-1]["content"]
+
+        with server.lock:
+            server.requests += 1
+            now = time.monotonic()
+            server.window = [sent for sent in server.window if now - sent < 60] + [now]
+            over_limit = server.rpm_limit and len(server.window) > server.rpm_limit
+            rejected = over_limit or server.rng.random() < server.error_rate
+            if rejected:
+                server.rejected += 1
+
+        time.sleep(server.latency)
+        if rejected:
+            self._send_json(429, {"error": {"message": "Rate limit reached", "type": "requests"}},
+                            {"retry-after-ms": str(int(server.retry_after * 1000))})
+            return
+
+        # Batched prompts list the ads under "Ad N:" headers and expect a JSON array back
+        if AD_HEADER_RE.search(content):
+            ads = AD_HEADER_RE.split(content)[1:]
+            reply = json.dumps([stub_analysis(ad.strip()) for ad in ads])
+        else:
+            reply = stub_analysis(content[len(server.prompt):])
+
+        self._send_json(200, {
+            "id": f"chatcmpl-{server.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request["model"],
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": reply}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": len(content) // 4, "completion_tokens": len(reply) // 4,
+                      "total_tokens": (len(content) + len(reply)) // 4},
+        })
+
+
+class StubChatServer:
+    """
+    Local server imitating the OpenAI chat completions API with added latency and 429 responses,
+    either at random (error_rate) or above a requests-per-minute limit.
+    """
+
+    def __init__(self, prompt, latency=0.3, error_rate=0.0, rpm_limit=None, retry_after=0.2, seed=0):
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), _StubChatHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.prompt = prompt
+        self.httpd.latency = latency
+        self.httpd.error_rate = error_rate
+        self.httpd.rpm_limit = rpm_limit
+        self.httpd.retry_after = retry_after
+        self.httpd.rng = random.Random(seed)
+        self.httpd.lock = threading.Lock()
+        self.httpd.window = []
+        self.httpd.requests = 0
+        self.httpd.rejected = 0
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address
+        return f"http://{host}:{port}/v1"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def crawl_ads(scraper, search_url):
+    """Crawl one search through Scraper.crawl_searches like a run does, returns its ads in page order."""
+    pages = {}
+    scraper.crawl_searches({"search": search_url}, lambda name: {},
+                           lambda name, page, listing_count, page_count, ads: pages.__setitem__(page, ads))
+    return [ad for page in sorted(pages) for ad in pages[page]]
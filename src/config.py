@@ -15,6 +15,44 @@ class Config:
         self.YTD_PATH = os.path.join(self.DATA_DIR, "apts_ytd.xlsx")
         self.DB_PATH = os.path.join(self.DATA_DIR, "apartment_tracker.db")
 
+        # Format of the daily export: "xlsx", or "csv" and "parquet" with one file per sheet next to TDY_PATH
+        self.EXPORT_FORMAT = "xlsx"
+
+        # SQLite connection pool shared by the scraper and the web app (WAL journal mode)
+        self.DB_POOL_SIZE = 8
+        self.DB_BUSY_TIMEOUT = 10.0
+        self.DB_CACHE_SIZE_KIB = 20000
+        self.DB_MMAP_SIZE = 256 * 1024 * 1024
+
+        # Low-cardinality columns offered as dashboard filter dropdowns
+        self.FACET_COLUMNS = ["Rooms", "Floor", "Max Floor", "add_date"]
+
+        # Server-side LRU cache of /listings pages (0 entries disables it) and response compression
+        # Brotli is used when the optional brotli package is installed, gzip otherwise
+        self.RESPONSE_CACHE_ENTRIES = 256
+        self.RESPONSE_CACHE_MAX_BYTES = 32 * 1024 * 1024
+        self.COMPRESS_MIN_BYTES = 1024
+
+        # Scraper progress pushed to the dashboard over Server-Sent Events
+        self.PROGRESS_HISTORY = 200
+        self.PROGRESS_HEARTBEAT_SECONDS = 15.0
+
+        # Runs are queued in the jobs table so web workers, the scheduler and main.py never scrape at once
+        # A running job whose heartbeat is older than JOB_STALE_SECONDS is treated as lost
+        self.JOB_HEARTBEAT_SECONDS = 5
+        self.JOB_STALE_SECONDS = 120
+        self.JOB_WATCH_SECONDS = 2.0
+
+        # Built-in scheduler, each entry starts a run on a cron schedule (minute hour day month weekday),
+        # up to jitter_seconds late. Every run refreshes all enabled saved searches, search only labels
+        # the run, so one entry is enough: entries coming due while another run is queued or running are
+        # skipped. Run it with `python main.py --schedule`, or set SCHEDULER_ENABLED to also run it inside
+        # the development web server.
+        self.SCHEDULER_ENABLED = False
+        self.SCHEDULES = [
+            {"search": "default", "cron": "0 8,20 * * *", "jitter_seconds": 600},
+        ]
+
         # .bat File Location
         self.BAT_FILE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
                                           "scripts\\Hot Lux Near You Runner.bat")
@@ -25,8 +63,81 @@ class Config:
         # Shorter list of apts in case of testing
         # self.SRC = "https://www.halooglasi.com/nekretnine/izdavanje-stanova?grad_id_l-lokacija_id_l-mikrolokacija_id_l=40761%2C40784%2C40788%2C59345&cena_d_from=450&cena_d_to=450&cena_d_unit=4&kvadratura_d_from=40&kvadratura_d_unit=1&ostalo_id_ls=12100016"
         self.PGR = "&page="
+        # Saved searches as {name: url}, added to the searches table on startup. More can be saved
+        # through /searches, every run crawls all enabled ones and tags each listing with its searches
+        self.SEARCHES = {"default": self.SRC}
         self.HEADERS = {"User-Agent": "Mozilla/5.0"}
 
+        # Listing crawl settings
+        # With CONCURRENT_CRAWL the page count is read from page 1 and the rest is fetched in parallel
+        self.CONCURRENT_CRAWL = True
+        self.CRAWL_CONCURRENCY = 8
+        # Politeness budget per host shared by all crawls and description fetches: concurrent requests
+        # and requests per minute. Hosts not in HOST_LIMITS get CRAWL_CONCURRENCY and HOST_REQUESTS_PER_MINUTE
+        # The concurrency is a ceiling, it's halved when the host throttles or fails and grows back on success
+        self.HOST_REQUESTS_PER_MINUTE = 120
+        self.HOST_LIMITS = {
+            "www.halooglasi.com": {"concurrency": 8, "requests_per_minute": 600},
+        }
+        # (connect, read) timeouts of listing site requests in seconds, and retries of timeouts, dropped
+        # connections, 429 and 5xx responses after the server's Retry-After or a jittered exponential backoff
+        self.REQUEST_TIMEOUT = (5, 30)
+        self.REQUEST_MAX_RETRIES = 4
+        self.REQUEST_BACKOFF_BASE = 0.5
+        self.REQUEST_BACKOFF_MAX = 60.0
+        # After this many failed requests in a row a host is given up on and the run aborts, its checkpoint
+        # is kept for the next run, and requests to the host are only tried again after the cooldown
+        self.CIRCUIT_BREAKER_FAILURES = 10
+        self.CIRCUIT_BREAKER_COOLDOWN_SECONDS = 300
+        # Source adapter (services/sources.py) for search URLs on hosts no adapter claims
+        self.DEFAULT_SOURCE = "halooglasi"
+        # Pages and descriptions are staged as they arrive, a failed run resumes from them when the
+        # next run of its search starts within CHECKPOINT_MAX_AGE_HOURS, older checkpoints are discarded
+        self.CHECKPOINT_MAX_AGE_HOURS = 6
+
+        # HTML parser backend for listing and ad pages: "lxml" (C-backed, faster) or "html.parser"
+        self.PARSER_BACKEND = "lxml"
+
+        # On-disk HTTP cache, unchanged pages reuse the rows extracted on the previous run
+        self.HTTP_CACHE = True
+        self.HTTP_CACHE_DIR = os.path.join(self.DATA_DIR, "http_cache")
+        self.HTTP_CACHE_MAX_BYTES = 200 * 1024 * 1024
+        self.HTTP_CACHE_MAX_AGE_DAYS = 14
+
+        # Description scraping settings
+        # The fast path reads the description from the raw ad page and only falls back to Chrome when it can't
+        self.FAST_DESCRIPTION_PATH = True
+        # Number of long-lived headless Chrome drivers, size it from the reported per-ad latency
+        self.DRIVER_POOL_SIZE = 4
+        self.DRIVER_PAGE_LOAD_TIMEOUT = 30
+        self.DESCRIPTION_WAIT_TIMEOUT = 10
+
+        # AI analysis (OpenAI chat completions), AI_BASE_URL points the client at another server, e.g. a stub
+        self.AI_MODEL = "gpt-4o-mini"
+        self.AI_BASE_URL = None
+        self.AI_TIMEOUT = 60
+        # Concurrent requests, ads per request (1 disables batching) and the account's rate limits
+        self.AI_CONCURRENCY = 8
+        self.AI_BATCH_SIZE = 1
+        self.AI_REQUESTS_PER_MINUTE = 500
+        self.AI_TOKENS_PER_MINUTE = 200000
+        # Retries of rate-limited, timed out and failed requests with exponential backoff (seconds)
+        self.AI_MAX_RETRIES = 5
+        self.AI_BACKOFF_BASE = 1.0
+        self.AI_BACKOFF_MAX = 30.0
+        # Analyses cached in SQLite by hash of (prompt, model, ad text), evicted when unused for AI_CACHE_MAX_AGE_DAYS,
+        # then least recently used
+        self.AI_CACHE = True
+        self.AI_CACHE_MAX_BYTES = 50 * 1024 * 1024
+        self.AI_CACHE_MAX_AGE_DAYS = 180
+
+        # Parquet snapshot of the listings after every run: all kept for SNAPSHOT_DAILY_DAYS,
+        # then one per week until SNAPSHOT_WEEKLY_DAYS, then one per month
+        self.SNAPSHOTS = True
+        self.SNAPSHOT_DIR = os.path.join(self.DATA_DIR, "snapshots")
+        self.SNAPSHOT_DAILY_DAYS = 30
+        self.SNAPSHOT_WEEKLY_DAYS = 365
+
     def print_paths(self):
         """Print configured paths for debugging purposes."""
         print(f"Data directory: {self.DATA_DIR}")
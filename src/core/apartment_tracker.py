@@ -1,13 +1,25 @@
 import pandas as pd
 import datetime as dt
+import time
+from core.diff_engine import DiffEngine
+from core.normalizer import FieldNormalizer
+from utils.saved_searches import SavedSearches
+from utils.scrape_checkpoint import ScrapeCheckpoint
+
+
+class RunStopped(Exception):
+    """Raised inside a run that was asked to stop, e.g. because its job was taken over."""
 
 
 class ApartmentTracker:
     """Main application class for tracking apartment listings."""
 
     def __init__(self, config, roman_converter, data_processor, scraper, file_manager, database_manager,
-                 ai_analyzer=None):
-        """Initialize with all component objects."""
+                 ai_analyzer=None, progress=None, snapshot_store=None):
+        """
+        Initialize with all component objects, an optional ProgressBroker for live progress
+        and an optional SnapshotStore keeping a snapshot of every run.
+        """
         self.config = config
         self.roman_converter = roman_converter
         self.data_processor = data_processor
@@ -16,21 +28,155 @@ class ApartmentTracker:
         self.database_manager = database_manager
         self.ai_analyzer = ai_analyzer
         self.do_ai_stuff = ai_analyzer is not None
-
-    def run(self):
-        """Run the apartment tracking process."""
+        self.progress = progress
+        self.snapshot_store = snapshot_store
+        self.checkpoint = ScrapeCheckpoint(database_manager, config.CHECKPOINT_MAX_AGE_HOURS)
+        self.saved_searches = SavedSearches(database_manager)
+        self.saved_searches.seed(config.SEARCHES)
+        self.run_id = None
+        self._stop_reason = None
+        self._holds_job = None
+
+    def stop(self, reason):
+        """Ask the current run to stop, it raises RunStopped at its next fetch or before committing."""
+        print(f"Stopping the run: {reason}")
+        self._stop_reason = reason
+
+    def _check_stopped(self):
+        if self._stop_reason is not None:
+            raise RunStopped(self._stop_reason)
+
+    def _emit(self, event, **data):
+        """Publish a progress event if a broker is attached."""
+        if self.progress is not None:
+            self.progress.publish(event, **data)
+
+    def _on_fetch_progress(self, event, **data):
+        """Progress of the crawl and description fetches, where a run asked to stop stops."""
+        self._check_stopped()
+        self._emit(event, **data)
+
+    def _end_stage(self, name):
+        """Record the time spent since the previous stage ended."""
+        now = time.perf_counter()
+        self.stage_durations[name] = round(now - self._stage_start, 3)
+        self._stage_start = now
+
+    def run(self, search="default", trigger="manual", holds_job=None):
+        """
+        Run the apartment tracking process, report its progress and record it in the runs table.
+        search labels the run in the history and the job queue, every run refreshes all enabled saved
+        searches. trigger is what started the run (manual or schedule). holds_job() returns whether the
+        run's queued job is still its own, it's checked under the write lock before the run commits.
+        """
+        start = self._stage_start = time.perf_counter()
+        self.stage_durations = {}
+        self._stop_reason = None
+        self._holds_job = holds_job
+        run_id = self.run_id = self.database_manager.start_run(search, trigger)
+        self._emit("run_started", started_at=dt.datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+
+        try:
+            counts = self._track()
+        except Exception as e:
+            duration = time.perf_counter() - start
+            self.database_manager.finish_run(run_id, "error", duration, self.stage_durations, error=str(e))
+            self._emit("run_finished", status="error", error=str(e), duration=round(duration, 1),
+                       finished_at=dt.datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+            raise
+
+        duration = time.perf_counter() - start
+        self.database_manager.finish_run(run_id, "ok", duration, self.stage_durations, **counts)
+        stages = ", ".join(f"{name} {seconds:.1f}s" for name, seconds in self.stage_durations.items())
+        print(f"Run finished in {duration:.1f}s ({stages})")
+        self._emit("run_finished", status="ok", duration=round(duration, 1),
+                   finished_at=dt.datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+
+    def _group_searches(self):
+        """Return {url: [names]} of the enabled saved searches, searches with the same URL are crawled once."""
+        groups = {}
+        for name, url in self.saved_searches.enabled().items():
+            groups.setdefault(url, []).append(name)
+        if not groups:
+            raise ValueError("No saved search is enabled")
+        return groups
+
+    def _crawl(self, groups):
+        """
+        Fetch the results pages of every search the checkpoint doesn't have yet and stage each one
+        as it arrives, under the first name of its group. Searches on different portals are crawled
+        in parallel within each host's budget.
+        """
+        self.checkpoint.set_stage("pages")
+        for names in groups.values():
+            print(f"Crawling search {', '.join(names)}")
+        searches = {names[0]: url for url, names in groups.items()}
+        self.scraper.crawl_searches(searches, self.checkpoint.pages, self.checkpoint.save_page,
+                                    on_progress=self._on_fetch_progress)
+
+    def _merge_searches(self, groups):
+        """
+        Combine the staged results of all searches into one set of listings.
+        Returns the listings, each ad once, and {search name: matched urls} for search_matches.
+        """
+        staged = self.checkpoint.listings()
+        urls = staged.groupby("search", sort=False)["url"].unique()
+
+        matches = {}
+        for names in groups.values():
+            found = urls.get(names[0], [])
+            for name in names:
+                matches[name] = list(found)
+
+        listings = staged.drop_duplicates("url").drop(columns="search").reset_index(drop=True)
+        shared = staged["url"].duplicated().sum()
+        print(f"{len(listings)} listings from {len(matches)} searches, {shared} found by more than one")
+        return listings, matches
+
+    def _describe(self, new_rows):
+        """
+        Fill AdText of the new listings, descriptions staged by an interrupted run are reused and
+        every newly scraped description is staged as it arrives.
+        """
+        self.checkpoint.set_stage("descriptions")
+        texts = self.checkpoint.descriptions()
+        todo = new_rows.loc[~DiffEngine.contains(list(texts), new_rows["url"]), "url"]
+        print(f"Scraping descriptions for {len(todo)} new listings ({len(new_rows) - len(todo)} already staged)...")
+
+        for url, description_text, scraped in self.scraper.iter_ad_descriptions(todo, on_progress=self._on_fetch_progress):
+            # Failed scrapes aren't staged, a resumed run tries them again
+            if scraped:
+                self.checkpoint.save_description(url, description_text)
+            texts[url] = description_text
+
+        new_rows["AdText"] = new_rows["url"].map(texts)
+        return new_rows
+
+    def _track(self):
+        """
+        Scrape the saved searches, diff and store the listings.
+        Pages and descriptions are staged in the crawl checkpoint as they arrive and the listings
+        tables are only written once everything is fetched, so an interrupted run leaves the
+        previous data untouched and the next run resumes where it stopped.
+        Returns the listing, new and removed counts for the run history.
+        """
         # Create necessary directories
         self.file_manager.create_directories()
 
-        # Clear the new_listings table at the start of each run
-        self.database_manager.clear_new_listings_table()
+        # Every run refreshes all enabled saved searches, an ad found by several is only fetched once
+        groups = self._group_searches()
+        pages, descriptions = self.checkpoint.open([names[0] for names in groups.values()], self.run_id)
+        if pages or descriptions:
+            self._emit("run_resumed", pages=pages, descriptions=descriptions)
 
-        # Scrape basic listing data
-        ads = self.scraper.scrape_listings()
+        # Scrape basic listing data into the checkpoint
+        self._crawl(groups)
+        df_today, matches = self._merge_searches(groups)
 
-        # Convert to DataFrame and process floor data
-        df_today = pd.DataFrame(ads)
-        df_today = self.data_processor.process_floor_data(df_today)
+        # Normalize the floor and numeric fields column by column
+        df_today = FieldNormalizer.normalize(df_today)
+        self._emit("listings_parsed", listings=len(df_today))
+        self._end_stage("scrape")
 
         # Try to load active listings from database
         db_listings = self.database_manager.get_all_active_listings()
@@ -43,31 +189,18 @@ class ApartmentTracker:
             print(f"TDY: {df_today.columns}")
             print(f"DB: {db_listings.columns}")
 
-            # Find new rows
-            new_rows = self.data_processor.append_new_rows(db_listings, df_today)
-            new_rows = new_rows.dropna(axis=1, how="all")
+            # Split the scrape into new, removed, changed and unchanged listings in one pass
+            diff = DiffEngine.diff(db_listings, df_today)
+            print(f"Diff against the database: {diff.summary()}")
 
+            new_rows = diff.new.dropna(axis=1, how="all")
             print(f"Found {len(new_rows)} new listings to process")
 
-            # Find removed listings (in database but not in today's scrape)
-            removed_urls = db_listings.loc[~db_listings["url"].isin(df_today["url"]), "url"].tolist()
-
-            # Mark removed listings in database
-            self.database_manager.mark_listings_as_removed(removed_urls)
+            # Listings in the database but not in today's scrape are marked removed when the run commits
+            removed_urls = diff.removed_urls
 
-            # Update existing listings with new scraped data
-            # First, get matching rows
-            existing_rows = df_today[df_today["url"].isin(db_listings["url"])]
-
-            # Ensure we have AdText column in both dataframes for merging
-            if "AdText" not in existing_rows.columns:
-                existing_rows["AdText"] = ""
-
-            if "AdText" not in db_listings.columns:
-                db_listings["AdText"] = ""
-
-            # Merge with database listings to preserve existing AdText values
-            existing_rows = self.data_processor.merge_with_db_listings(existing_rows, db_listings)
+            # Existing listings keep the AdText stored in the database
+            existing_rows = diff.existing
 
             # If new_rows don't have AdText column, add it
             if len(new_rows) > 0 and "AdText" not in new_rows.columns:
@@ -81,26 +214,21 @@ class ApartmentTracker:
             new_rows = df_today.copy()  # All listings are new
             removed_urls = []
 
+        self._end_stage("diff")
+
         # Only scrape ad descriptions for new listings
         if new_rows is not None and not new_rows.empty:
-            print(f"Scraping descriptions for {len(new_rows)} new listings...")
-            new_rows = self.scraper.scrape_ad_descriptions(new_rows)
+            new_rows = self._describe(new_rows)
 
             # Update the new rows in df_today
-            if "AdText" in new_rows.columns:
-                for index, row in new_rows.iterrows():
-                    mask = df_today["url"] == row["url"]
-                    if any(mask):
-                        df_today.loc[mask, "AdText"] = row["AdText"]
+            DiffEngine.fill_ad_text(df_today, new_rows)
 
             # Add hyperlinks and date to new rows before saving to new_listings table
             new_rows = self.data_processor.add_hyperlinks_and_date(new_rows)
+            self._end_stage("descriptions")
 
-            # Save new listings to the new_listings table
-            self.database_manager.save_new_listings(new_rows)
-
-            # Copy new listings to the main listings table
-            self.database_manager.copy_new_listings_to_main()
+        # Report HTTP cache hits and evict stale entries
+        self.scraper.finish_run()
 
         # Add hyperlinks and date to all listings
         df_today = self.data_processor.add_hyperlinks_and_date(df_today)
@@ -108,30 +236,61 @@ class ApartmentTracker:
         # Perform AI analysis if enabled
         if self.do_ai_stuff:
             df_today = self.ai_analyzer.process_dataframe(df_today)
+            self._end_stage("ai")
 
-        # Save to database
-        self.database_manager.save_listings(df_today)
+        # Commit the run: everything is fetched, only now are the listings tables written, all in one
+        # transaction so a failure leaves the previous data and the checkpoint for the next run
+        self.checkpoint.set_stage("commit")
+        with self.database_manager.connections.transaction():
+            # Holding the write lock, a run that lost its job must not overwrite the listings
+            if self._holds_job is not None and not self._holds_job():
+                self.stop(f"run {self.run_id} lost its job before committing")
+            self._check_stopped()
 
-        # For Excel output, let's still maintain the traditional flow
-        # Handle existing files (delete YTD, rename TDY to YTD)
-        ytd_exists = self.file_manager.handle_excel_files()
+            # Append added, removed and changed events before this run updates the listings table
+            self.database_manager.record_listing_events(df_today, self.run_id)
 
-        # Load previous Excel listings if available (for backward compatibility)
-        if ytd_exists:
-            df_ytd = self.file_manager.load_ytd_data()
+            # Mark removed listings (in database but not in today's scrape) in database
+            self.database_manager.mark_listings_as_removed(removed_urls)
 
-            # Identify new and removed listings
-            new_ads, removed_ads = self.data_processor.identify_new_and_removed_listings(df_today, df_ytd)
+            # The new_listings table holds this run's new listings
+            self.database_manager.clear_new_listings_table()
+            if new_rows is not None and not new_rows.empty:
+                self.database_manager.save_new_listings(new_rows)
+                self.database_manager.copy_new_listings_to_main()
 
-            print(f"{len(new_ads)} new listings found.")
-            print(f"{len(removed_ads)} removed listings found.")
-        else:
-            print("apts_ytd.xlsx not found. Treating all current listings as new.")
-            new_ads = df_today.copy()
-            removed_ads = pd.DataFrame(columns=df_today.columns)
+            # Save to database
+            self.database_manager.save_listings(df_today)
+            self.saved_searches.record_matches(matches, self.run_id)
+            self.checkpoint.clear()
+
+            # Let caches built on the listings tables know there is new data
+            self.database_manager.bump_data_version()
+        new_count = len(new_rows) if new_rows is not None else 0
+        self._emit("db_saved", saved=len(df_today), new=new_count, removed=len(removed_urls))
+        self._end_stage("save")
+
+        if self.snapshot_store is not None:
+            self.snapshot_store.write(df_today, self.run_id)
+            self.snapshot_store.compact()
+            self._end_stage("snapshot")
 
-        # Save data to Excel (for backward compatibility)
-        self.file_manager.save_data_to_excel(df_today, new_ads, removed_ads)
+        # Keep the previous run's export as ytd
+        self.file_manager.handle_excel_files()
+
+        # New and removed listings of this run come from the listing history
+        added_urls, removed_ads = self.database_manager.get_run_changes(self.run_id)
+        new_ads = df_today[df_today["url"].isin(added_urls)]
+        removed_ads = removed_ads.reindex(columns=df_today.columns)
+
+        print(f"{len(new_ads)} new listings found.")
+        print(f"{len(removed_ads)} removed listings found.")
+
+        # Export the listings in the configured format
+        self.file_manager.export_listings(df_today, new_ads, removed_ads)
 
         # Create or update .bat file
-        self.file_manager.create_or_update_bat_file()
\ No newline at end of file
+        self.file_manager.create_or_update_bat_file()
+        self._end_stage("export")
+
+        return {"listing_count": len(df_today), "new_count": new_count, "removed_count": len(removed_urls)}
\ No newline at end of file
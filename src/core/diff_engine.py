@@ -0,0 +1,104 @@
+import pandas as pd
+
+# Scraped fields compared to tell changed listings from unchanged ones
+TRACKED_COLUMNS = ["Price", "Area", "Rooms", "Floor", "Max Floor"]
+
+
+class ListingDiff:
+    """Today's scrape split against the active listings in the database."""
+
+    def __init__(self, new, removed, existing, changed_mask):
+        self.new = new
+        self.removed = removed
+        # Scraped listings already in the database, in scrape order, with their stored AdText
+        self.existing = existing
+        self.changed = existing[changed_mask]
+        self.unchanged = existing[~changed_mask]
+
+    @property
+    def removed_urls(self):
+        return self.removed["url"].tolist()
+
+    def summary(self):
+        return (f"{len(self.new)} new, {len(self.removed)} removed, "
+                f"{len(self.changed)} changed, {len(self.unchanged)} unchanged")
+
+
+class DiffEngine:
+    """Vectorized comparison of scraped and stored listings, joined on url with hash lookups."""
+
+    @staticmethod
+    def contains(keys, values):
+        """
+        Boolean array telling which values appear in keys, through a hash index of the keys.
+        Faster than Series.isin on Arrow-backed string columns.
+        """
+        return pd.Index(keys).unique().get_indexer(values) >= 0
+
+    @staticmethod
+    def carry_over_ad_text(df_scraped, df_db, key_col="url"):
+        """
+        Copy stored AdText onto scraped rows with the same key, keeping the scraped value
+        where the database has none. The first database row wins for duplicate keys.
+        """
+        result = df_scraped.copy()
+        if "AdText" not in df_db.columns:
+            return result
+
+        stored = df_db.drop_duplicates(key_col).set_index(key_col)["AdText"]
+        carried = result[key_col].map(stored)
+
+        if "AdText" in result.columns:
+            result["AdText"] = carried.where(carried.notna(), result["AdText"])
+        else:
+            result["AdText"] = carried
+        return result
+
+    @staticmethod
+    def fill_ad_text(df_target, df_source, key_col="url"):
+        """
+        Copy AdText from df_source onto every df_target row with the same key, in place.
+        The last source row wins for duplicate keys.
+        """
+        source = df_source.drop_duplicates(key_col, keep="last").set_index(key_col)["AdText"]
+        mask = DiffEngine.contains(source.index, df_target[key_col])
+        df_target.loc[mask, "AdText"] = df_target.loc[mask, key_col].map(source)
+        return df_target
+
+    @staticmethod
+    def changed_mask(existing, df_db, key_col="url", columns=None):
+        """Flag existing rows whose tracked fields differ from the stored listing."""
+        columns = [column for column in (columns or TRACKED_COLUMNS)
+                   if column in existing.columns and column in df_db.columns]
+        mask = pd.Series(False, index=existing.index)
+        if existing.empty or not columns:
+            return mask
+
+        stored = df_db.drop_duplicates(key_col).set_index(key_col)[columns].reindex(existing[key_col])
+        stored.index = existing.index
+
+        for column in columns:
+            scraped_values = existing[column].astype("string")
+            stored_values = stored[column].astype("string")
+            # Missing on both sides counts as equal, missing on one side as a change
+            differs = (scraped_values != stored_values).fillna(scraped_values.isna() != stored_values.isna())
+            mask |= differs.astype(bool)
+        return mask
+
+    @staticmethod
+    def diff(df_db, df_today, key_col="url"):
+        """
+        Split today's scrape into new, removed, changed and unchanged listings.
+        Existing listings keep the AdText stored in the database.
+        Returns a ListingDiff.
+        """
+        in_db = DiffEngine.contains(df_db[key_col], df_today[key_col])
+        new = df_today[~in_db]
+        removed = df_db[~DiffEngine.contains(df_today[key_col], df_db[key_col])]
+
+        existing = df_today[in_db].copy()
+        if "AdText" not in existing.columns:
+            existing["AdText"] = ""
+        existing = DiffEngine.carry_over_ad_text(existing, df_db, key_col)
+
+        return ListingDiff(new, removed, existing, DiffEngine.changed_mask(existing, df_db, key_col))
@@ -0,0 +1,109 @@
+import os
+import socket
+import sqlite3
+import threading
+import time
+
+
+class JobRunner:
+    """
+    Runs the jobs this process manages to claim from the JobQueue.
+    While a job runs, a heartbeat thread keeps it alive in the queue and stores its progress,
+    so other processes can report it. A job the queue no longer holds for this worker, e.g. failed
+    as stale while the process was suspended, is stopped so two runs never scrape at once.
+    """
+
+    def __init__(self, job_queue, tracker, heartbeat_seconds=5, progress=None):
+        """Initialize with the queue, the ApartmentTracker and the optional ProgressBroker the tracker reports to."""
+        self.job_queue = job_queue
+        self.tracker = tracker
+        self.heartbeat_seconds = heartbeat_seconds
+        self.progress = progress
+        self.worker = f"{socket.gethostname()}:{os.getpid()}"
+        self._busy = threading.Lock()
+
+    def run_pending(self):
+        """
+        Claim and run queued jobs until none can be claimed.
+        Returns the number of jobs run, 0 if this process is already running jobs.
+        """
+        if not self._busy.acquire(blocking=False):
+            return 0
+
+        count = 0
+        try:
+            while True:
+                job = self.job_queue.claim(self.worker)
+                if job is None:
+                    return count
+                self._run(job)
+                count += 1
+        finally:
+            self._busy.release()
+
+    def start(self):
+        """Run the pending jobs in a background thread."""
+        thread = threading.Thread(target=self.run_pending)
+        thread.daemon = True
+        thread.start()
+
+    def _heartbeat(self, job_id, stopped):
+        while not stopped.wait(self.heartbeat_seconds):
+            progress = dict(self.progress.state) if self.progress is not None else None
+            try:
+                alive = self.job_queue.heartbeat(job_id, self.worker, progress)
+            except sqlite3.Error as e:
+                # e.g. the database is locked by another writer, the next tick tries again
+                print(f"Heartbeat of job {job_id} failed: {e}")
+                continue
+            if not alive:
+                self.tracker.stop(f"job {job_id} is no longer running on {self.worker}")
+                return
+
+    def _run(self, job):
+        """Run a claimed job and record its outcome in the queue."""
+        print(f"Running job {job['id']}: {job['search']} ({job['trigger']}) on {self.worker}")
+        stopped = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(job["id"], stopped), daemon=True)
+        heartbeat.start()
+
+        try:
+            self.tracker.run(job["search"], job["trigger"],
+                             holds_job=lambda: self.job_queue.holds(job["id"], self.worker))
+        except Exception as e:
+            print("Error during scraper run:", e)
+            finished = self.job_queue.finish(job["id"], self.worker, "failed", str(e))
+        else:
+            print("Scraper run completed successfully.")
+            finished = self.job_queue.finish(job["id"], self.worker, "done")
+        finally:
+            stopped.set()
+            heartbeat.join()
+        if not finished:
+            print(f"Job {job['id']} was taken from {self.worker} while it ran, its outcome wasn't recorded")
+
+    def watch(self, interval=2.0):
+        """
+        Mirror jobs run by other processes into the local ProgressBroker, so every process
+        streams the same status to its dashboard clients.
+        """
+        def loop():
+            last_seen = None
+            while True:
+                status = self.job_queue.status()
+                remote = status["is_running"] and status["worker"] != self.worker
+                if remote:
+                    seen = (status["job_id"], status["heartbeat_at"])
+                    state = {**status["progress"], "is_running": True, "last_run": status["last_run"]}
+                else:
+                    seen = None
+                    state = {"is_running": False, "last_run": status["last_run"]}
+
+                # Publish when a remote job progresses and once more when it ends
+                if seen != last_seen and (remote or last_seen is not None):
+                    self.progress.publish("status", **state)
+                last_seen = seen
+                time.sleep(interval)
+
+        if self.progress is not None:
+            threading.Thread(target=loop, daemon=True).start()
@@ -0,0 +1,123 @@
+import re
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+from core.data_processor import NUMERIC_COLUMNS
+from core.roman_converter import RomanConverter
+
+# Leading number of a field such as "45", "45,5 m2", "2.5" or "4+"
+NUMBER_RE = re.compile(r"^\s*(\d+(?:[.,]\d+)?)")
+
+ROMAN_DIGITS = frozenset("IVXLCDM")
+
+# Named floors: ground floor (prizemlje), raised ground floor, basement (suteren) and semi-basement
+FLOOR_LABELS = {
+    "PR": ("Ground Floor", 0.0),
+    "VPR": ("Ground Floor", 0.0),
+    "SUT": ("Basement", -1.0),
+    "PSUT": ("Semi-basement", -0.5),
+}
+# Already normalized labels map to themselves, so normalizing twice changes nothing
+LABEL_VALUES = {text: value for text, value in FLOOR_LABELS.values()}
+
+# Distinct raw values are few compared to the listings, the caches keep their parse across runs
+CACHE_SIZE = 65536
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def parse_number(text):
+    """Parse the leading number of a text field, NaN if there isn't one."""
+    match = NUMBER_RE.match(text)
+    if not match:
+        return np.nan
+    return float(match.group(1).replace(",", "."))
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def parse_floor(text):
+    """
+    Parse a floor as written in an ad or as already normalized.
+    Returns (floor text, floor number): "IV" -> ("4", 4.0), "PR" -> ("Ground Floor", 0.0).
+    """
+    token = text.strip()
+    if token.upper() in FLOOR_LABELS:
+        return FLOOR_LABELS[token.upper()]
+    if token in LABEL_VALUES:
+        return token, LABEL_VALUES[token]
+    if token and set(token.upper()) <= ROMAN_DIGITS:
+        number = RomanConverter.roman_to_arabic(token.upper())
+        return str(number), float(number)
+    # Ground floor text stored by older versions, such as "VGround Floor"
+    if "Ground Floor" in token:
+        return token, 0.0
+    return token, parse_number(token)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def split_floor(text):
+    """
+    Split the raw "floor/max floor" field into (Floor, Max Floor) texts.
+    A floor without a maximum gets "?", except named floors which get none.
+    """
+    if "/" in text:
+        floor, max_floor = text.split("/", 1)
+        return parse_floor(floor)[0], max_floor
+    floor = parse_floor(text)[0]
+    return floor, None if floor in LABEL_VALUES else "?"
+
+
+class FieldNormalizer:
+    """
+    Converts the scraped text fields into normalized text and typed values a whole column at a time.
+    Every distinct value of a column is parsed once through the memoized parsers above and the results
+    are spread back over the rows, so the cost follows the number of distinct values, not listings.
+    """
+
+    @staticmethod
+    def _lookup(series, parse):
+        """
+        Parse the distinct values of a column.
+        Returns (codes, results): the results of each distinct value and, per row, the position of its
+        result, -1 for missing values.
+        """
+        codes, uniques = pd.factorize(series)
+        return codes, [parse(str(value)) for value in uniques]
+
+    @staticmethod
+    def _take(codes, results, missing, dtype):
+        """Spread per-value results over the rows, rows with code -1 get missing."""
+        table = np.array(list(results) + [missing], dtype=dtype)
+        return table[codes]
+
+    @classmethod
+    def split_floor_column(cls, df):
+        """Replace the raw floor column with normalized Floor and Max Floor columns."""
+        codes, results = cls._lookup(df["floor"], split_floor)
+        floors, max_floors = zip(*results) if results else ((), ())
+        df["Floor"] = cls._take(codes, floors, None, object)
+        df["Max Floor"] = cls._take(codes, max_floors, None, object)
+        return df.drop(columns=["floor"])
+
+    @classmethod
+    def add_numeric_columns(cls, df):
+        """Add typed numeric columns parsed from the Price, Area, Rooms, Floor and Max Floor text."""
+        for column, numeric_column in NUMERIC_COLUMNS.items():
+            if column not in df.columns:
+                continue
+            if column == "Floor":
+                codes, results = cls._lookup(df[column], parse_floor)
+                results = [value for _, value in results]
+            else:
+                codes, results = cls._lookup(df[column], parse_number)
+            df[numeric_column] = cls._take(codes, results, np.nan, "float64")
+        return df
+
+    @classmethod
+    def normalize(cls, df):
+        """
+        Normalize scraped listings: split the raw floor field and add the typed numeric columns.
+        Normalizing already normalized listings leaves them unchanged.
+        """
+        if "floor" in df.columns:
+            df = cls.split_floor_column(df)
+        return cls.add_numeric_columns(df)
@@ -0,0 +1,169 @@
+import datetime as dt
+import random
+import threading
+
+# Cron fields in order with their allowed ranges, weekday 0 and 7 are both Sunday
+CRON_FIELDS = [("minute", 0, 59), ("hour", 0, 23), ("day", 1, 31), ("month", 1, 12), ("weekday", 0, 7)]
+
+
+class CronSchedule:
+    """Five-field cron expression: minute hour day month weekday, with *, lists, ranges and steps."""
+
+    def __init__(self, expression):
+        """Parse the expression, raising ValueError if it is malformed."""
+        fields = expression.split()
+        if len(fields) != len(CRON_FIELDS):
+            raise ValueError(f"Cron expression needs {len(CRON_FIELDS)} fields: {expression!r}")
+
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, weekdays = (
+            self._parse_field(field, name, low, high) for field, (name, low, high) in zip(fields, CRON_FIELDS)
+        )
+        self.weekdays = {weekday % 7 for weekday in weekdays}
+        # As in cron, a restricted day and weekday match when either of them does
+        self.any_day = fields[2] == "*"
+        self.any_weekday = fields[4] == "*"
+
+    @staticmethod
+    def _parse_field(field, name, low, high):
+        """Expand one cron field into the set of values it matches."""
+        values = set()
+        for part in field.split(","):
+            part, _, step = part.partition("/")
+            try:
+                step = int(step) if step else 1
+                if part == "*":
+                    start, end = low, high
+                elif "-" in part:
+                    start, end = (int(value) for value in part.split("-", 1))
+                else:
+                    start = int(part)
+                    end = high if step > 1 else start
+            except ValueError:
+                raise ValueError(f"Invalid cron {name} field: {field!r}") from None
+
+            if step < 1 or start < low or end > high or start > end:
+                raise ValueError(f"Invalid cron {name} field: {field!r}")
+            values.update(range(start, end + 1, step))
+        return values
+
+    def _day_matches(self, moment):
+        """Check the day of month and weekday fields for a date."""
+        day_ok = moment.day in self.days
+        weekday_ok = (moment.weekday() + 1) % 7 in self.weekdays
+        if self.any_day or self.any_weekday:
+            return day_ok and weekday_ok
+        return day_ok or weekday_ok
+
+    def next_after(self, moment):
+        """Return the first matching minute strictly after moment."""
+        candidate = moment.replace(second=0, microsecond=0) + dt.timedelta(minutes=1)
+        limit = candidate + dt.timedelta(days=5 * 366)
+
+        while candidate < limit:
+            if candidate.month not in self.months or not self._day_matches(candidate):
+                candidate = (candidate + dt.timedelta(days=1)).replace(hour=0, minute=0)
+            elif candidate.hour not in self.hours:
+                candidate = (candidate + dt.timedelta(hours=1)).replace(minute=0)
+            elif candidate.minute not in self.minutes:
+                candidate += dt.timedelta(minutes=1)
+            else:
+                return candidate
+
+        raise ValueError(f"Cron expression never matches: {self.expression!r}")
+
+
+class ScheduledJob:
+    """A run labelled with a search on a cron schedule, started up to jitter_seconds after each due time."""
+
+    def __init__(self, search, cron, jitter_seconds=0):
+        self.search = search
+        self.cron = CronSchedule(cron)
+        self.jitter_seconds = jitter_seconds
+        self.next_due = None
+        self.next_run = None
+
+    def plan(self, after):
+        """Pick the next due time after the given moment and a jittered start time for it."""
+        self.next_due = self.cron.next_after(after)
+        self.next_run = self.next_due + dt.timedelta(seconds=random.uniform(0, self.jitter_seconds))
+
+    def missed_between(self, start, end, limit=1000):
+        """Count the due times in (start, end], up to limit."""
+        missed = 0
+        due = self.cron.next_after(start)
+        while due <= end and missed < limit:
+            missed += 1
+            due = self.cron.next_after(due)
+        return missed
+
+
+class Scheduler:
+    """
+    Starts scraper runs on cron-like schedules.
+    A due run is skipped, and recorded as skipped, when the previous run is still going. Every run
+    refreshes all saved searches, so runs of other schedules that came due by the time a run ends are
+    skipped too instead of starting another run right after it.
+    """
+
+    def __init__(self, schedules, start_run, database_manager, poll_seconds=60):
+        """
+        Initialize with schedule dictionaries ({"search", "cron", "jitter_seconds"}),
+        a start_run(search, trigger) callable returning False if a run is already in progress,
+        and the database manager used to record skipped runs.
+        """
+        self.jobs = [ScheduledJob(schedule["search"], schedule["cron"], schedule.get("jitter_seconds", 0))
+                     for schedule in schedules]
+        self.start_run = start_run
+        self.database_manager = database_manager
+        self.poll_seconds = poll_seconds
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Run the scheduler loop in a daemon thread."""
+        if self._thread is None and self.jobs:
+            self._thread = threading.Thread(target=self.run_forever, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the scheduler loop after the current wait."""
+        self._stop.set()
+
+    def _skip(self, job, reason):
+        print(f"Skipping scheduled run of {job.search}: {reason}")
+        self.database_manager.record_skipped_run(job.search, "schedule", reason)
+
+    def _fire(self, job):
+        """Start the job's run and plan its next one, recording runs missed while it was busy."""
+        print(f"Starting scheduled run of {job.search} ({job.cron.expression})")
+        if not self.start_run(job.search, "schedule"):
+            self._skip(job, "previous run still in progress")
+
+        # start_run may block until the run is done, due times passed since then are skipped
+        now = dt.datetime.now()
+        missed = job.missed_between(job.next_due, now)
+        if missed:
+            self._skip(job, f"previous run overran, skipped {missed} scheduled run(s)")
+        job.plan(max(job.next_due, now))
+
+        for other in self.jobs:
+            if other is not job and other.next_due <= now:
+                self._skip(other, f"refreshed by the run of {job.search}")
+                other.plan(now)
+
+    def run_forever(self):
+        """Wait for the earliest due job and start it until stopped."""
+        now = dt.datetime.now()
+        for job in self.jobs:
+            job.plan(now)
+            print(f"Scheduled {job.search} ({job.cron.expression}), next run at {job.next_run:%Y-%m-%d %H:%M:%S}")
+
+        while not self._stop.is_set():
+            job = min(self.jobs, key=lambda job: job.next_run)
+            wait = (job.next_run - dt.datetime.now()).total_seconds()
+            if wait > 0:
+                # Wake up regularly so clock changes and suspends don't delay runs
+                self._stop.wait(min(wait, self.poll_seconds))
+                continue
+            self._fire(job)
@@ -1,21 +1,30 @@
+import sys
 from config import Config
 from core.roman_converter import RomanConverter
 from core.data_processor import DataProcessor
 from services.scraper import Scraper
 from utils.file_manager import FileManager
 from utils.database_manager import DatabaseManager
+from utils.job_queue import JobQueue
+from utils.snapshot_store import SnapshotStore
 from core.apartment_tracker import ApartmentTracker
+from core.job_runner import JobRunner
+from core.scheduler import Scheduler
 from services.ai_analyzer import AIAnalyzer
+from services.ai_cache import AICache
 from secretconfig import APIKEY, PROMPTTXT
 
 
 def main():
-    """Main function to run the apartment tracking application."""
+    """
+    Main function to run the apartment tracking application.
+    Runs once, or keeps running on the configured schedules with --schedule.
+    """
     # Initialize components
     config = Config()
     roman_converter = RomanConverter()
     data_processor = DataProcessor()
-    scraper = Scraper(config, roman_converter)
+    scraper = Scraper(config)
     file_manager = FileManager(config)
     database_manager = DatabaseManager(config)
 
@@ -25,7 +34,15 @@ def main():
     # Initialize AI analyzer if enabled
     ai_analyzer = None
     if DO_AI_STUFF:
-        ai_analyzer = AIAnalyzer(APIKEY, PROMPTTXT)
+        ai_cache = None
+        if config.AI_CACHE:
+            ai_cache = AICache(database_manager, config.AI_CACHE_MAX_BYTES, config.AI_CACHE_MAX_AGE_DAYS)
+        ai_analyzer = AIAnalyzer(APIKEY, PROMPTTXT, config, ai_cache)
+
+    snapshot_store = None
+    if config.SNAPSHOTS:
+        snapshot_store = SnapshotStore(database_manager, config.SNAPSHOT_DIR, config.SNAPSHOT_DAILY_DAYS,
+                                       config.SNAPSHOT_WEEKLY_DAYS)
 
     # Initialize and run the apartment tracker
     tracker = ApartmentTracker(
@@ -35,10 +52,32 @@ def main():
         scraper=scraper,
         file_manager=file_manager,
         database_manager=database_manager,
-        ai_analyzer=ai_analyzer
+        ai_analyzer=ai_analyzer,
+        snapshot_store=snapshot_store
     )
 
-    tracker.run()
+    # Runs go through the job queue shared with the web app, so only one process scrapes at a time
+    job_queue = JobQueue(database_manager, config.JOB_STALE_SECONDS)
+    job_runner = JobRunner(job_queue, tracker, config.JOB_HEARTBEAT_SECONDS)
+
+    if "--schedule" not in sys.argv[1:]:
+        _, created = job_queue.enqueue("default", "manual")
+        if not job_runner.run_pending():
+            print("A run is already in progress in another process, " +
+                  ("queued this one after it." if created else "this request was merged into it."))
+        return
+
+    def run_scheduled(search, trigger):
+        # Runs happen in the scheduler thread, due times passed during a run are skipped
+        _, created = job_queue.enqueue(search, trigger)
+        job_runner.run_pending()
+        return created
+
+    scheduler = Scheduler(config.SCHEDULES, run_scheduled, database_manager)
+    try:
+        scheduler.run_forever()
+    except KeyboardInterrupt:
+        print("Scheduler stopped.")
 
 
 if __name__ == "__main__":
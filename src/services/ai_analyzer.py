@@ -1,52 +1,185 @@
+import json
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import openai
 from openai import OpenAI
 import pandas as pd
+from services.ai_cache import AICache
+from services.rate_limiter import RateLimiter
+
+# Errors worth retrying: rate limits, timeouts, dropped connections and server errors
+RETRYABLE_ERRORS = (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError,
+                    openai.InternalServerError)
+
+# Rough token estimate used to reserve the tokens-per-minute budget before a request
+CHARS_PER_TOKEN = 4
+EXPECTED_OUTPUT_TOKENS = 300
+
+# Appended to the prompt when several ads are analyzed with one request
+BATCH_INSTRUCTIONS = ("\n\nAnalyze each of the following {count} ads separately. Reply only with a JSON array "
+                      "of {count} strings, one analysis per ad, in the same order.")
+CODE_FENCE_RE = re.compile(r"^```(?:json)?\s*|\s*```$")
 
 
 class AIAnalyzer:
     """Handles OpenAI API integration for ad text analysis."""
 
-    def __init__(self, api_key, prompt_text):
-        """Initialize with API key and prompt text."""
+    def __init__(self, api_key, prompt_text, config, cache=None):
+        """
+        Initialize with API key, prompt text, the configuration holding the AI settings
+        and an optional AICache consulted before calling the API.
+        """
         self.api_key = api_key
         self.prompt_text = prompt_text
+        self.config = config
+        self.cache = cache
         self.client = self._create_client()
+        self.limiter = RateLimiter(config.AI_REQUESTS_PER_MINUTE, config.AI_TOKENS_PER_MINUTE)
+        self.stats = {"requests": 0, "retries": 0, "rate_limited": 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, stat):
+        with self._stats_lock:
+            self.stats[stat] += 1
 
     def _create_client(self):
-        """Create and return an OpenAI client."""
-        return OpenAI(api_key=self.api_key)
+        """Create and return an OpenAI client, retries are handled here so they respect the rate limiter."""
+        return OpenAI(api_key=self.api_key, base_url=self.config.AI_BASE_URL, timeout=self.config.AI_TIMEOUT,
+                      max_retries=0)
+
+    def _retry_delay(self, error, attempt):
+        """Use the server's retry-after hint when there is one, otherwise exponential backoff with jitter."""
+        response = getattr(error, "response", None)
+        if response is not None:
+            try:
+                if "retry-after-ms" in response.headers:
+                    return float(response.headers["retry-after-ms"]) / 1000
+                if "retry-after" in response.headers:
+                    return float(response.headers["retry-after"])
+            except ValueError:
+                pass
+
+        return random.uniform(0, min(self.config.AI_BACKOFF_MAX, self.config.AI_BACKOFF_BASE * 2 ** attempt))
+
+    def _complete(self, content):
+        """Send one chat completion within the rate limits, retrying transient errors. Returns the reply."""
+        estimated = len(content) // CHARS_PER_TOKEN + EXPECTED_OUTPUT_TOKENS
+
+        for attempt in range(self.config.AI_MAX_RETRIES + 1):
+            self.limiter.acquire(estimated)
+            self._count("requests")
+            try:
+                completion = self.client.chat.completions.create(
+                    model=self.config.AI_MODEL,
+                    store=True,
+                    messages=[
+                        {"role": "user", "content": content}
+                    ]
+                )
+            except RETRYABLE_ERRORS as e:
+                # A rejected request didn't use its tokens
+                self.limiter.settle(estimated, 0)
+                if isinstance(e, openai.RateLimitError):
+                    self._count("rate_limited")
+                if attempt == self.config.AI_MAX_RETRIES:
+                    raise
+                self._count("retries")
+                time.sleep(self._retry_delay(e, attempt))
+                continue
+
+            self.limiter.settle(estimated, completion.usage.total_tokens if completion.usage else None)
+            return completion.choices[0].message.content
 
     def analyze_text(self, ad_text):
         """
         Analyze ad text using OpenAI API.
         Returns the analysis as a string.
         """
-        completion = self.client.chat.completions.create(
-            model="gpt-4o-mini",
-            store=True,
-            messages=[
-                {"role": "user", "content": f"{self.prompt_text + ad_text}"}
-            ]
-        )
+        return self._complete(f"{self.prompt_text + ad_text}")
 
-        return completion.choices[0].message.content
+    def analyze_batch(self, ad_texts):
+        """
+        Analyze several ads with one request.
+        Falls back to one request per ad if the reply isn't a JSON array with one entry per ad.
+        Returns the analyses in the order of ad_texts.
+        """
+        if len(ad_texts) == 1:
+            return [self.analyze_text(ad_texts[0])]
+
+        ads = "\n\n".join(f"Ad {num}:\n{text}" for num, text in enumerate(ad_texts, start=1))
+        reply = self._complete(self.prompt_text + BATCH_INSTRUCTIONS.format(count=len(ad_texts)) + "\n\n" + ads)
+
+        try:
+            analyses = json.loads(CODE_FENCE_RE.sub("", reply.strip()))
+        except ValueError:
+            analyses = None
+
+        if isinstance(analyses, list) and len(analyses) == len(ad_texts):
+            return [str(analysis) for analysis in analyses]
+
+        print(f"Batched reply didn't match {len(ad_texts)} ads, analyzing them one by one")
+        return [self.analyze_text(text) for text in ad_texts]
 
     def process_dataframe(self, df):
         """
         Process a DataFrame to analyze ad texts.
+        Cached analyses are reused and identical texts are analyzed once. The rest is analyzed
+        concurrently, AI_BATCH_SIZE ads per request. Ads whose analysis fails after all retries
+        keep an empty AISays and are tried again on the next run.
         Returns the DataFrame with AI analysis.
         """
+        if "AISays" not in df.columns:
+            df["AISays"] = None
+
         # Add AI analysis for ads without existing analysis
-        df["AISays2"] = df.apply(
-            lambda row: self.analyze_text(row["AdText"])
-            if pd.isna(row.get("AISays")) or not row.get("AISays")
-            else row.get("AISays"),
-            axis=1
-        )
+        pending = df.index[df["AISays"].isna() | (df["AISays"] == "")]
+        if pending.empty:
+            return df
+
+        texts = df.loc[pending, "AdText"].fillna("").astype(str)
+        keys = pd.Series([AICache.key(self.prompt_text, self.config.AI_MODEL, text) for text in texts],
+                         index=pending)
+
+        if self.cache is not None:
+            self.cache.reset_stats()
+            analyses = self.cache.get_many(keys)
+        else:
+            analyses = {}
+
+        todo = keys[[key not in analyses for key in keys]].drop_duplicates().index
+        size = max(1, self.config.AI_BATCH_SIZE)
+        batches = [todo[start:start + size] for start in range(0, len(todo), size)]
+
+        self.stats = {"requests": 0, "retries": 0, "rate_limited": 0}
+        new_analyses = {}
+        start = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=self.config.AI_CONCURRENCY) as executor:
+            futures = {executor.submit(self.analyze_batch, texts.loc[batch].tolist()): batch for batch in batches}
+            for future in as_completed(futures):
+                batch = futures[future]
+                try:
+                    new_analyses.update(zip(keys.loc[batch], future.result()))
+                except Exception as e:
+                    print(f"AI analysis failed for {len(batch)} ads: {e}")
+
+        if self.cache is not None and new_analyses:
+            self.cache.put_many(self.config.AI_MODEL, new_analyses.items())
+
+        analyses.update(new_analyses)
+        df.loc[pending, "AISays"] = keys.map(analyses)
 
-        df["AISays"] = df["AISays"].fillna(df["AISays2"])
-        df = df.drop(columns=["AISays2"])
+        print(f"Analyzed {len(new_analyses)}/{len(todo)} ads in {time.perf_counter() - start:.1f}s "
+              f"with {self.stats['requests']} requests ({self.stats['retries']} retries, "
+              f"{self.stats['rate_limited']} rate limited)")
+        if self.cache is not None:
+            self.cache.report()
+            self.cache.evict()
 
         # Uncomment if you want to split the AI analysis into columns
         # df[["AIGarage", "AIAlert"]] = df["AISays"].str.split(" > ", expand=True)
 
-        return df
\ No newline at end of file
+        return df
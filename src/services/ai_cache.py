@@ -0,0 +1,90 @@
+import hashlib
+import threading
+import time
+
+
+class AICache:
+    """
+    Persistent cache of AI analyses in the ai_cache table.
+    Entries are keyed by a hash of (prompt, model, ad text), so an unchanged or reposted ad is
+    never analyzed twice, while a new prompt or model gets fresh analyses.
+    """
+
+    def __init__(self, database_manager, max_bytes, max_age_days):
+        """Initialize with the database manager and eviction limits."""
+        self.connections = database_manager.connections
+        self.max_bytes = max_bytes
+        self.max_age = max_age_days * 24 * 3600
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        """Reset the per-run hit/miss counters."""
+        self.stats = {"hits": 0, "misses": 0}
+
+    @staticmethod
+    def key(prompt, model, ad_text):
+        """Content address of an analysis."""
+        return hashlib.sha256("\0".join((prompt, model, ad_text)).encode("utf-8")).hexdigest()
+
+    def get_many(self, keys):
+        """Return {key: analysis} for the cached keys and mark them as used."""
+        keys = list(dict.fromkeys(keys))
+        found = {}
+
+        with self.connections.connection() as conn:
+            # Stay well below SQLite's bound parameter limit
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                rows = conn.execute(
+                    f"SELECT key, analysis FROM ai_cache WHERE key IN ({', '.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                found.update(rows)
+
+        if found:
+            now = time.time()
+            with self.connections.transaction() as conn:
+                conn.executemany("UPDATE ai_cache SET used_at = ?, hits = hits + 1 WHERE key = ?",
+                                 ((now, key) for key in found))
+
+        with self._lock:
+            self.stats["hits"] += len(found)
+            self.stats["misses"] += len(keys) - len(found)
+        return found
+
+    def put_many(self, model, entries):
+        """Store (key, analysis) pairs."""
+        now = time.time()
+        with self.connections.transaction() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO ai_cache (key, model, analysis, size, created_at, used_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                ((key, model, analysis, len(analysis.encode("utf-8")), now, now) for key, analysis in entries)
+            )
+
+    def evict(self):
+        """
+        Drop entries not used for max_age, then the least recently used entries until the cache
+        fits in max_bytes. An unchanged ad analysed on every run is never aged out.
+        """
+        with self.connections.transaction() as conn:
+            removed = conn.execute("DELETE FROM ai_cache WHERE used_at < ?",
+                                   (time.time() - self.max_age,)).rowcount
+            removed += conn.execute(
+                "DELETE FROM ai_cache WHERE key IN ("
+                "SELECT key FROM (SELECT key, SUM(size) OVER (ORDER BY used_at DESC, key) AS kept FROM ai_cache) "
+                "WHERE kept > ?)",
+                (self.max_bytes,)
+            ).rowcount
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM ai_cache").fetchone()[0]
+
+        if removed:
+            print(f"Evicted {removed} AI cache entries, {total / 1024 / 1024:.1f} MiB left")
+
+    def report(self):
+        """Print the hit/miss ratio for the current run."""
+        total = self.stats["hits"] + self.stats["misses"]
+        if not total:
+            return
+        print(f"AI cache: {self.stats['hits']}/{total} hits ({self.stats['hits'] / total:.0%}), "
+              f"{self.stats['misses']} analyses requested")
@@ -0,0 +1,103 @@
+import queue
+import threading
+from contextlib import contextmanager
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.chrome.options import Options
+
+
+class DriverPool:
+    """Pool of long-lived headless Chrome drivers shared by description scraping jobs."""
+
+    def __init__(self, size, page_load_timeout=30):
+        """Initialize the pool; drivers are started lazily on first use."""
+        self.size = size
+        self.page_load_timeout = page_load_timeout
+        self._idle = queue.Queue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self.recycled = 0
+
+    def _create_driver(self):
+        """Start a new headless Chrome driver."""
+        chrome_options = Options()
+        chrome_options.add_argument("--headless")
+        driver = webdriver.Chrome(options=chrome_options)
+        driver.set_page_load_timeout(self.page_load_timeout)
+        return driver
+
+    @staticmethod
+    def _quit_driver(driver):
+        """Quit a driver, ignoring errors from an already dead browser."""
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def _checkout(self):
+        """Take an idle driver, or start a new one while the pool isn't full yet."""
+        while True:
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                pass
+
+            with self._lock:
+                can_create = self._created < self.size
+                if can_create:
+                    self._created += 1
+
+            if can_create:
+                try:
+                    return self._create_driver()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+
+            # Re-check periodically in case a driver was dropped instead of returned
+            try:
+                return self._idle.get(timeout=1)
+            except queue.Empty:
+                continue
+
+    @contextmanager
+    def driver(self):
+        """
+        Lend a driver for the duration of the block.
+        A driver that raises a WebDriverException (crash or timeout) is replaced.
+        """
+        driver = self._checkout()
+        try:
+            yield driver
+        except WebDriverException:
+            self._quit_driver(driver)
+            with self._lock:
+                self.recycled += 1
+            try:
+                driver = self._create_driver()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                driver = None
+            raise
+        finally:
+            if driver is not None:
+                self._idle.put(driver)
+
+    def close(self):
+        """Quit all idle drivers."""
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._quit_driver(driver)
+            with self._lock:
+                self._created -= 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
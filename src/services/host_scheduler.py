@@ -0,0 +1,194 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.parse import urlparse
+from services.rate_limiter import RateLimiter
+
+
+class CrawlAborted(Exception):
+    """Raised for requests to a host whose circuit breaker is open, ends the run instead of retrying."""
+
+
+class HostBudget:
+    """
+    Request budget of one host. The concurrency limit moves between 1 and the configured concurrency:
+    it grows by one per limit's worth of successful requests and halves when a request fails (AIMD).
+    After breaker_failures failed requests in a row the host is given up on for breaker_cooldown seconds.
+    """
+
+    def __init__(self, host, concurrency, requests_per_minute, breaker_failures, breaker_cooldown):
+        """Initialize with the host's ceiling budget and circuit breaker settings."""
+        self.host = host
+        self.max_concurrency = concurrency
+        self.limit = float(concurrency)
+        self.limiter = RateLimiter(requests_per_minute, request_burst=concurrency)
+        self.breaker_failures = breaker_failures
+        self.breaker_cooldown = breaker_cooldown
+        self.in_flight = 0
+        self.started = 0
+        self.decreased_at = 0
+        self.failures = 0
+        self.open_until = None
+        self.paused_until = 0.0
+        self._condition = threading.Condition()
+
+    def _check_breaker(self):
+        """Raise CrawlAborted while the breaker is open, after the cooldown a single failure reopens it."""
+        if self.open_until is None:
+            return
+        if time.monotonic() < self.open_until:
+            raise CrawlAborted(f"{self.host} failed {self.breaker_failures} requests in a row, "
+                               f"not retrying for {self.breaker_cooldown}s")
+        self.open_until = None
+        self.failures = self.breaker_failures - 1
+
+    def acquire(self):
+        """Wait for a request slot and the rate budget. Returns the request's ticket for release."""
+        with self._condition:
+            while True:
+                self._check_breaker()
+                wait = self.paused_until - time.monotonic()
+                if wait <= 0 and self.in_flight < int(self.limit):
+                    break
+                self._condition.wait(wait if wait > 0 else None)
+            self.in_flight += 1
+            self.started += 1
+            ticket = self.started
+
+        try:
+            self.limiter.acquire()
+        except BaseException:
+            self.release(ticket, True)
+            raise
+        return ticket
+
+    def release(self, ticket, ok):
+        """
+        Free a request slot and adjust the concurrency limit. Requests started before the last
+        decrease don't decrease it again, so one burst of errors only halves the limit once.
+        """
+        with self._condition:
+            self.in_flight -= 1
+            if ok:
+                self.failures = 0
+                self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+            else:
+                self.failures += 1
+                if ticket > self.decreased_at:
+                    self.limit = max(1.0, self.limit / 2)
+                    self.decreased_at = self.started
+                if self.failures >= self.breaker_failures and self.open_until is None:
+                    self.open_until = time.monotonic() + self.breaker_cooldown
+            self._condition.notify_all()
+
+    def pause(self, seconds):
+        """Hold back new requests to the host, e.g. for the server's Retry-After."""
+        with self._condition:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+class HostScheduler:
+    """
+    Politeness budget per host shared by every request the scraper sends: at most `concurrency`
+    requests in flight and `requests_per_minute` started per host, whichever crawl or thread sends them.
+    The concurrency actually used adapts to the errors the host returns, see HostBudget.
+    Hosts without an entry in limits get the default budget.
+    """
+
+    def __init__(self, concurrency, requests_per_minute, limits=None, breaker_failures=10, breaker_cooldown=300):
+        """
+        Initialize with the default budget, {host: {"concurrency": n, "requests_per_minute": n}} overrides
+        and the circuit breaker settings.
+        """
+        self.concurrency = concurrency
+        self.requests_per_minute = requests_per_minute
+        self.limits = limits or {}
+        self.breaker_failures = breaker_failures
+        self.breaker_cooldown = breaker_cooldown
+        self._budgets = {}
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    @staticmethod
+    def host(url):
+        """Return the host (with port) a URL is sent to."""
+        return urlparse(url).netloc.lower()
+
+    def budget(self, url):
+        """Return the HostBudget of a URL's host, created on its first request."""
+        host = self.host(url)
+        with self._lock:
+            if host not in self._budgets:
+                limits = self.limits.get(host, {})
+                self._budgets[host] = HostBudget(host, limits.get("concurrency", self.concurrency),
+                                                 limits.get("requests_per_minute", self.requests_per_minute),
+                                                 self.breaker_failures, self.breaker_cooldown)
+            return self._budgets[host]
+
+    def reset_stats(self):
+        """Reset the per-run {host: {requests, failures, retries, waited}} counters."""
+        with self._lock:
+            self.stats = {}
+
+    def count(self, url, stat, amount=1):
+        """Add to a per-run counter of a URL's host."""
+        with self._lock:
+            stats = self.stats.setdefault(self.host(url),
+                                          {"requests": 0, "failures": 0, "retries": 0, "waited": 0.0})
+            stats[stat] += amount
+
+    @contextmanager
+    def slot(self, url):
+        """
+        Hold one of the request slots of the URL's host, waiting until its budget allows a request.
+        A request that raises counts as failed, raises CrawlAborted when the host's breaker is open.
+        """
+        budget = self.budget(url)
+        start = time.perf_counter()
+        ticket = budget.acquire()
+        self.count(url, "requests")
+        self.count(url, "waited", time.perf_counter() - start)
+        try:
+            yield
+        except BaseException:
+            budget.release(ticket, False)
+            self.count(url, "failures")
+            raise
+        budget.release(ticket, True)
+
+    def pause(self, url, seconds):
+        """Hold back new requests to a URL's host for the given seconds."""
+        self.budget(url).pause(seconds)
+
+    def run_per_host(self, function, items, host_of):
+        """
+        Call function on every item, items of different hosts in parallel and items of the same host
+        one after another, in their order. host_of(item) returns the URL or host an item belongs to.
+        Waits for all hosts and re-raises the first error.
+        """
+        by_host = {}
+        for item in items:
+            by_host.setdefault(self.host(host_of(item)), []).append(item)
+
+        def run_host(host_items):
+            for item in host_items:
+                function(item)
+
+        if len(by_host) <= 1:
+            for host_items in by_host.values():
+                run_host(host_items)
+            return
+
+        with ThreadPoolExecutor(max_workers=len(by_host)) as executor:
+            futures = [executor.submit(run_host, host_items) for host_items in by_host.values()]
+            for future in futures:
+                future.result()
+
+    def report(self):
+        """Print the requests sent to each host, its failures and retries and the concurrency it ended at."""
+        for host, stats in sorted(self.stats.items()):
+            budget = self._budgets.get(host)
+            limit = f", concurrency {int(budget.limit)}/{budget.max_concurrency}" if budget else ""
+            print(f"{host}: {stats['requests']} requests, {stats['failures']} failed, {stats['retries']} retried, "
+                  f"{stats['waited']:.1f}s waiting for the host budget{limit}")
@@ -0,0 +1,172 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+
+class HttpCache:
+    """
+    On-disk HTTP cache for scraped pages.
+    Revalidates with ETag/Last-Modified and falls back to a content hash, so an unchanged page
+    can reuse the rows extracted from it on a previous run instead of being parsed again.
+    Rows are stored with the version of the extraction that produced them and only reused by the same one.
+    """
+
+    def __init__(self, cache_dir, max_bytes, max_age_days, rows_version=None):
+        """Initialize with the cache directory, eviction limits and the version of the extraction storing rows."""
+        self.cache_dir = cache_dir
+        self.rows_version = rows_version
+        self.max_bytes = max_bytes
+        self.max_age = max_age_days * 24 * 3600
+        self._lock = threading.Lock()
+        self.reset_stats()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def reset_stats(self):
+        """Reset the per-run hit/miss counters."""
+        self.stats = {"not_modified": 0, "same_content": 0, "changed": 0, "new": 0}
+
+    def _count(self, outcome):
+        with self._lock:
+            self.stats[outcome] += 1
+
+    def _paths(self, url):
+        """Return the (meta, body) file paths for a URL."""
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        base = os.path.join(self.cache_dir, key)
+        return base + ".json", base + ".body"
+
+    @staticmethod
+    def _write_atomic(path, data, mode="wb"):
+        """Write a file through a temporary file so readers never see a partial entry."""
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, mode) as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _load_meta(self, meta_path):
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _save_meta(self, meta_path, meta):
+        self._write_atomic(meta_path, json.dumps(meta), mode="w")
+
+    def fetch(self, client, url):
+        """
+        GET a URL through the cache, client.get(url, headers=...) sends the request.
+        Returns (content, rows) where rows are the previously stored extraction results
+        if the page is unchanged since they were stored by the same rows_version, None otherwise.
+        """
+        meta_path, body_path = self._paths(url)
+        meta = self._load_meta(meta_path)
+        if meta is not None and not os.path.exists(body_path):
+            meta = None
+
+        headers = {}
+        if meta is not None:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+        r = client.get(url, headers=headers)
+        now = time.time()
+
+        if meta is not None and r.status_code == 304:
+            with open(body_path, "rb") as f:
+                content = f.read()
+            outcome = "not_modified"
+        else:
+            content = r.content
+            if r.status_code != 200:
+                return content, None
+
+            content_hash = hashlib.sha256(content).hexdigest()
+            if meta is not None and meta.get("content_hash") == content_hash:
+                outcome = "same_content"
+            else:
+                outcome = "changed" if meta is not None else "new"
+                self._write_atomic(body_path, content)
+                meta = {"url": url, "content_hash": content_hash, "stored_at": now, "rows": None}
+
+            meta["etag"] = r.headers.get("ETag")
+            meta["last_modified"] = r.headers.get("Last-Modified")
+
+        meta["size"] = len(content)
+        meta["accessed_at"] = now
+        self._save_meta(meta_path, meta)
+        self._count(outcome)
+
+        rows = None
+        if outcome in ("not_modified", "same_content") and meta.get("rows_version") == self.rows_version:
+            rows = meta.get("rows")
+        return content, rows
+
+    def store_rows(self, url, rows):
+        """Store the rows extracted from the cached version of a URL."""
+        meta_path, _ = self._paths(url)
+        meta = self._load_meta(meta_path)
+        if meta is None:
+            return
+        meta["rows"] = rows
+        meta["rows_version"] = self.rows_version
+        self._save_meta(meta_path, meta)
+
+    def evict(self):
+        """
+        Drop entries not fetched for max_age, then the least recently used entries until the cache
+        fits in max_bytes. Revalidating an unchanged page counts as a fetch, so it's never aged out.
+        """
+        now = time.time()
+        entries = []
+        removed = 0
+
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json"):
+                continue
+            meta_path = os.path.join(self.cache_dir, name)
+            body_path = meta_path[:-len(".json")] + ".body"
+            meta = self._load_meta(meta_path) or {}
+
+            if now - meta.get("accessed_at", meta.get("stored_at", 0)) > self.max_age:
+                self._remove(meta_path, body_path)
+                removed += 1
+                continue
+
+            size = os.path.getsize(meta_path)
+            if os.path.exists(body_path):
+                size += os.path.getsize(body_path)
+            entries.append((meta.get("accessed_at", 0), size, meta_path, body_path))
+
+        total = sum(entry[1] for entry in entries)
+        for _, size, meta_path, body_path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self._remove(meta_path, body_path)
+            total -= size
+            removed += 1
+
+        if removed:
+            print(f"Evicted {removed} HTTP cache entries, {total / 1024 / 1024:.1f} MiB left")
+
+    @staticmethod
+    def _remove(*paths):
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def report(self):
+        """Print the hit/miss ratio for the current run."""
+        hits = self.stats["not_modified"] + self.stats["same_content"]
+        total = hits + self.stats["changed"] + self.stats["new"]
+        if not total:
+            return
+        print(f"HTTP cache: {hits}/{total} hits ({hits / total:.0%}) - "
+              f"{self.stats['not_modified']} not modified, {self.stats['same_content']} same content, "
+              f"{self.stats['changed']} changed, {self.stats['new']} new")
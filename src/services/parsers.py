@@ -0,0 +1,265 @@
+from urllib.parse import urljoin
+from bs4 import BeautifulSoup
+
+try:
+    from lxml import etree
+    from lxml import html as lxml_html
+except ImportError:
+    etree = None
+
+# Fields of the ad dictionaries returned by parse_listings
+AD_FIELDS = ["url", "Price", "Area", "Rooms", "floor"]
+
+
+class ListingMarkup:
+    """
+    Portal markup the parser backends read, supplied by the source adapter. Results pages list ads
+    as blocks holding an info div with a title link, a price value and labelled feature items, rendered
+    ad pages hold the description in an element nested in a product page container.
+    """
+
+    def __init__(self, listing_class_re, listing_class_token, info_div_class, title_class, price_class,
+                 feature_class, legend_class, feature_labels, content_class, product_page_class,
+                 description_group_class, description_tab_id, description_id):
+        """
+        Initialize with the classes and ids of those elements. listing_class_re matches the whole class
+        string of an ad block and listing_class_token is one class every ad block carries. feature_labels
+        maps the feature legends to the Area, Rooms and floor fields.
+        """
+        self.listing_class_re = listing_class_re
+        self.listing_class_token = listing_class_token
+        self.info_div_class = info_div_class
+        self.title_class = title_class
+        self.price_class = price_class
+        self.feature_class = feature_class
+        self.legend_class = legend_class
+        self.feature_labels = feature_labels
+        self.content_class = content_class
+        self.product_page_class = product_page_class
+        self.description_group_class = description_group_class
+        self.description_tab_id = description_tab_id
+        self.description_id = description_id
+
+
+class SoupParser:
+    """Parser backend on BeautifulSoup's pure-Python html.parser."""
+
+    name = "html.parser"
+
+    def parse_listings(self, content, markup, page_url):
+        """
+        Parse a results page fetched from page_url.
+        Returns a tuple of (listing count, list of ad dictionaries with the raw floor text).
+        """
+        ads = []
+        soup = BeautifulSoup(content, "html.parser")
+        listings = soup.find_all("div", class_=markup.listing_class_re)
+
+        for listing in listings:
+            info_div = listing.find("div", class_=markup.info_div_class)
+            if not info_div:
+                continue
+            title = info_div.find("h3", class_=markup.title_class)
+            a_tag = title.a if title else None
+            if not a_tag or not a_tag.has_attr("href"):
+                continue
+
+            # Extract price
+            price = None
+            price_div = listing.find("div", class_=markup.price_class)
+            if price_div:
+                value_span = price_div.find("span", attrs={"data-value": True})
+                if value_span:
+                    price = value_span["data-value"]
+
+            # Extract features: area, rooms, floor
+            features = {"Area": None, "Rooms": None, "floor": None}
+            for li in info_div.find_all("li", class_=markup.feature_class):
+                legend = li.find("span", class_=markup.legend_class)
+                if not legend:
+                    continue
+                label = legend.get_text(strip=True)
+                value = li.get_text(strip=True).replace(label, "").strip()
+                _set_feature(features, markup.feature_labels, label, value)
+
+            ads.append(_ad_dict(page_url, a_tag["href"], price, features))
+
+        return len(listings), ads
+
+    def parse_description(self, page_source, markup):
+        """Extract the description text from a rendered ad page, or None if it's missing."""
+        soup = BeautifulSoup(page_source, "html.parser")
+        info = soup.find_all("div", class_=markup.content_class)
+
+        for i in range(len(info)):
+            if info[i].find_all("div", class_=markup.product_page_class):
+                info = info[i].find_all("div", class_=markup.product_page_class)
+                break
+
+        # Check if info is not empty before accessing its first element
+        if info:
+            tab_groups = info[0].find_all("div", class_=markup.description_group_class)
+            if tab_groups:
+                tab_header = tab_groups[0].find_all("div", id=markup.description_tab_id)
+                if tab_header:
+                    description_span = tab_header[0].find("span", id=markup.description_id)
+                    if description_span and description_span.text.strip():
+                        return description_span.text.strip()
+
+        return None
+
+    def fragment_text(self, fragment):
+        """Return the text content of an HTML fragment."""
+        return BeautifulSoup(fragment, "html.parser").get_text()
+
+
+def _has_class(name):
+    """XPath predicate matching elements that carry the given class token."""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+class _LxmlSelectors:
+    """XPath selectors of one portal's markup, compiled once."""
+
+    def __init__(self, markup):
+        self.listing_candidates = etree.XPath(f"//div[{_has_class(markup.listing_class_token)}]")
+        self.info_div = etree.XPath(f"descendant::div[normalize-space(@class) = '{markup.info_div_class}'][1]")
+        self.title_link = etree.XPath(f"descendant::h3[{_has_class(markup.title_class)}][1]/descendant::a[1]")
+        self.price = etree.XPath(f"descendant::div[{_has_class(markup.price_class)}][1]"
+                                 f"/descendant::span[@data-value][1]/@data-value")
+        self.features = etree.XPath(f"descendant::li[{_has_class(markup.feature_class)}]")
+        self.legend = etree.XPath(f"descendant::span[{_has_class(markup.legend_class)}][1]")
+        self.content_divs = etree.XPath(f"//div[{_has_class(markup.content_class)}]")
+        self.product_page = etree.XPath(
+            f"descendant::div[normalize-space(@class) = '{markup.product_page_class}']")
+        self.description = etree.XPath(f"descendant::div[{_has_class(markup.description_group_class)}][1]"
+                                       f"/descendant::div[@id = '{markup.description_tab_id}'][1]"
+                                       f"/descendant::span[@id = '{markup.description_id}'][1]")
+
+
+class LxmlParser:
+    """Parser backend on lxml's C parser with XPath selectors compiled once per process and portal."""
+
+    name = "lxml"
+
+    def __init__(self):
+        self._selectors = {}
+        self._text_nodes = etree.XPath("descendant::text()[not(parent::script or parent::style)]")
+        self._utf8_parser = lxml_html.HTMLParser(encoding="utf-8")
+
+    def _compiled(self, markup):
+        """Return the selectors of a markup, compiled on its first page."""
+        selectors = self._selectors.get(markup)
+        if selectors is None:
+            selectors = self._selectors[markup] = _LxmlSelectors(markup)
+        return selectors
+
+    def _document(self, content):
+        if isinstance(content, bytes):
+            return lxml_html.document_fromstring(content, parser=self._utf8_parser)
+        return lxml_html.document_fromstring(content)
+
+    def _stripped_text(self, element):
+        """Equivalent of BeautifulSoup's get_text(strip=True), which leaves out script and style text."""
+        return "".join(text.strip() for text in self._text_nodes(element) if text.strip())
+
+    def parse_listings(self, content, markup, page_url):
+        """
+        Parse a results page fetched from page_url.
+        Returns a tuple of (listing count, list of ad dictionaries with the raw floor text).
+        """
+        ads = []
+        selectors = self._compiled(markup)
+        document = self._document(content)
+        listings = [div for div in selectors.listing_candidates(document)
+                    if markup.listing_class_re.search(" ".join(div.get("class", "").split()))]
+
+        for listing in listings:
+            info_div = selectors.info_div(listing)
+            if not info_div:
+                continue
+            info_div = info_div[0]
+            a_tag = selectors.title_link(info_div)
+            if not a_tag or a_tag[0].get("href") is None:
+                continue
+
+            # Extract price
+            price = selectors.price(listing)
+            price = str(price[0]) if price else None
+
+            # Extract features: area, rooms, floor
+            features = {"Area": None, "Rooms": None, "floor": None}
+            for li in selectors.features(info_div):
+                legend = selectors.legend(li)
+                if not legend:
+                    continue
+                label = self._stripped_text(legend[0])
+                value = self._stripped_text(li).replace(label, "").strip()
+                _set_feature(features, markup.feature_labels, label, value)
+
+            ads.append(_ad_dict(page_url, a_tag[0].get("href"), price, features))
+
+        return len(listings), ads
+
+    def parse_description(self, page_source, markup):
+        """Extract the description text from a rendered ad page, or None if it's missing."""
+        selectors = self._compiled(markup)
+        document = self._document(page_source)
+        content_divs = selectors.content_divs(document)
+
+        container = content_divs[0] if content_divs else None
+        for div in content_divs:
+            product_page = selectors.product_page(div)
+            if product_page:
+                container = product_page[0]
+                break
+
+        if container is not None:
+            description_span = selectors.description(container)
+            if description_span:
+                description_text = description_span[0].text_content().strip()
+                if description_text:
+                    return description_text
+
+        return None
+
+    def fragment_text(self, fragment):
+        """Return the text content of an HTML fragment."""
+        return lxml_html.fragment_fromstring(fragment, create_parent="div").text_content()
+
+
+def _set_feature(features, feature_labels, label, value):
+    """Store a labelled feature value under its field, feature_labels maps the portal's labels to fields."""
+    field = feature_labels.get(label)
+    if field == "Area":
+        features["Area"] = value.replace("m²", "").replace("m2", "").strip()
+    elif field is not None:
+        features[field] = value
+
+
+def _ad_dict(page_url, href, price, features):
+    return {
+        "url": urljoin(page_url, href),
+        "Price": price,
+        "Area": features["Area"],
+        "Rooms": features["Rooms"],
+        "floor": features["floor"]
+    }
+
+
+PARSER_BACKENDS = {
+    SoupParser.name: SoupParser,
+    LxmlParser.name: LxmlParser,
+}
+
+
+def create_parser(name):
+    """Create the named parser backend, falling back to html.parser if lxml isn't installed."""
+    if name not in PARSER_BACKENDS:
+        raise ValueError(f"Unknown parser backend '{name}', choose from {sorted(PARSER_BACKENDS)}")
+
+    if name == LxmlParser.name and etree is None:
+        print("lxml is not installed, falling back to the html.parser backend")
+        name = SoupParser.name
+
+    return PARSER_BACKENDS[name]()
@@ -0,0 +1,66 @@
+import threading
+import time
+
+
+class RateLimiter:
+    """
+    Thread-safe requests-per-minute and tokens-per-minute limiter.
+    Both budgets are token buckets that refill continuously, so bursts up to a minute's budget are allowed
+    unless request_burst caps how many requests may go out at once.
+    """
+
+    def __init__(self, requests_per_minute, tokens_per_minute=None, request_burst=None):
+        """Initialize with the per-minute budgets, None or 0 disables a budget."""
+        self.requests_per_minute = requests_per_minute or None
+        self.tokens_per_minute = tokens_per_minute or None
+        self.request_capacity = 0
+        if self.requests_per_minute:
+            self.request_capacity = max(1, min(request_burst or self.requests_per_minute, self.requests_per_minute))
+        self._requests = float(self.request_capacity)
+        self._tokens = float(self.tokens_per_minute or 0)
+        self._updated = time.monotonic()
+        self._condition = threading.Condition()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        if self.requests_per_minute:
+            self._requests = min(self.request_capacity, self._requests + elapsed * self.requests_per_minute / 60)
+        if self.tokens_per_minute:
+            self._tokens = min(self.tokens_per_minute, self._tokens + elapsed * self.tokens_per_minute / 60)
+
+    def _wait_time(self, tokens):
+        """Seconds until one request and the given tokens fit the budgets, 0 if they fit now."""
+        wait = 0.0
+        if self.requests_per_minute and self._requests < 1:
+            wait = (1 - self._requests) * 60 / self.requests_per_minute
+        if self.tokens_per_minute:
+            # A request bigger than the whole budget waits for a full bucket
+            needed = min(tokens, self.tokens_per_minute)
+            if self._tokens < needed:
+                wait = max(wait, (needed - self._tokens) * 60 / self.tokens_per_minute)
+        return wait
+
+    def acquire(self, tokens=0):
+        """Block until a request using about the given number of tokens may be sent."""
+        with self._condition:
+            while True:
+                self._refill()
+                wait = self._wait_time(tokens)
+                if wait <= 0:
+                    break
+                self._condition.wait(wait)
+
+            if self.requests_per_minute:
+                self._requests -= 1
+            if self.tokens_per_minute:
+                self._tokens -= tokens
+
+    def settle(self, estimated, actual):
+        """Correct the token budget once the real usage of a request is known."""
+        if not self.tokens_per_minute or actual is None:
+            return
+        with self._condition:
+            self._tokens = min(self.tokens_per_minute, self._tokens + estimated - actual)
+            self._condition.notify_all()
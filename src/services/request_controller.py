@@ -0,0 +1,88 @@
+import datetime as dt
+import random
+import time
+from email.utils import parsedate_to_datetime
+import requests
+
+# Responses worth retrying: throttling and server errors
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Transport errors worth retrying: timeouts and dropped connections
+RETRYABLE_ERRORS = (requests.Timeout, requests.ConnectionError, requests.exceptions.ChunkedEncodingError)
+
+
+class RetryableResponse(requests.HTTPError):
+    """A throttled or server error response, raised inside the host slot so it counts as a failed request."""
+
+
+class RequestController:
+    """
+    Sends the scraper's GET requests within the per-host budgets of a HostScheduler, with a timeout
+    on every request and retries of timeouts, dropped connections, 429 and 5xx responses.
+    Retries wait for the server's Retry-After, otherwise a jittered exponential backoff.
+    A request that still fails raises instead of returning the error page, so an error is never
+    parsed as an empty results page.
+    """
+
+    def __init__(self, session, host_scheduler, config):
+        """Initialize with the HTTP session, the host scheduler and configuration."""
+        self.session = session
+        self.host_scheduler = host_scheduler
+        self.timeout = config.REQUEST_TIMEOUT
+        self.max_retries = config.REQUEST_MAX_RETRIES
+        self.backoff_base = config.REQUEST_BACKOFF_BASE
+        self.backoff_max = config.REQUEST_BACKOFF_MAX
+
+    @staticmethod
+    def _retry_after(response):
+        """Seconds the server asked to wait in its Retry-After header, None without a usable one."""
+        value = response.headers.get("Retry-After") if response is not None else None
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        return max(0.0, (retry_at - dt.datetime.now(dt.timezone.utc)).total_seconds())
+
+    def _retry_delay(self, error, attempt):
+        """Use the server's Retry-After when there is one, otherwise exponential backoff with full jitter."""
+        retry_after = self._retry_after(getattr(error, "response", None))
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _attempt(self, url, headers):
+        """Send one request in a slot of the host, throttling and server errors count as failures."""
+        with self.host_scheduler.slot(url):
+            response = self.session.get(url, headers=headers, timeout=self.timeout)
+            if response.status_code in RETRY_STATUSES:
+                raise RetryableResponse(f"{response.status_code} response for {url}", response=response)
+            return response
+
+    def get(self, url, headers=None):
+        """
+        GET a URL, retrying transient errors. Returns the response, a successful or 304 one.
+        Raises the last error once the retries are used up, requests.HTTPError for other error
+        responses and CrawlAborted when the host's circuit breaker is open.
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self._attempt(url, headers)
+            except (RetryableResponse, *RETRYABLE_ERRORS) as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = self._retry_delay(e, attempt)
+                if isinstance(e, RetryableResponse) and self._retry_after(e.response) is not None:
+                    # The whole host is asked to slow down, not just this request
+                    self.host_scheduler.pause(url, delay)
+                self.host_scheduler.count(url, "retries")
+                print(f"Retrying {url} in {delay:.1f}s after: {e}")
+                time.sleep(delay)
+                continue
+
+            response.raise_for_status()
+            return response
@@ -1,146 +1,348 @@
-import re
 import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import partial
 import requests
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-import pandas as pd
+from requests.adapters import HTTPAdapter
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+from services.driver_pool import DriverPool
+from services.host_scheduler import CrawlAborted, HostScheduler
+from services.http_cache import HttpCache
+from services.parsers import create_parser
+from services.request_controller import RequestController
+from services.sources import create_sources
+# Start of the description stored for an ad Chrome failed to scrape
+SCRAPE_ERROR_PREFIX = "Error scraping ad: "
+# Version of the rows the parsers and source adapters extract, bump it when they change so rows
+# cached by the previous extraction are parsed again
+ROWS_FORMAT_VERSION = 2
 
 
 class Scraper:
-    """Handles web scraping operations for apartment listings."""
+    """
+    Handles web scraping operations for apartment listings.
+    Portal specifics live in the source adapters, every request goes through the per-host budget.
+    """
 
-    def __init__(self, config, roman_converter):
-        """Initialize with configuration and converter objects."""
+    def __init__(self, config):
+        """Initialize with configuration, floors and numbers are normalized later by FieldNormalizer."""
         self.config = config
-        self.roman_converter = roman_converter
+        self.session = self._create_session()
+        self.parser = create_parser(config.PARSER_BACKEND)
+        self.sources = create_sources(config, self.parser)
+        self.host_scheduler = HostScheduler(config.CRAWL_CONCURRENCY, config.HOST_REQUESTS_PER_MINUTE,
+                                            config.HOST_LIMITS, config.CIRCUIT_BREAKER_FAILURES,
+                                            config.CIRCUIT_BREAKER_COOLDOWN_SECONDS)
+        self.request_controller = RequestController(self.session, self.host_scheduler, config)
+        self.http_cache = None
+        if config.HTTP_CACHE:
+            self.http_cache = HttpCache(config.HTTP_CACHE_DIR, config.HTTP_CACHE_MAX_BYTES,
+                                        config.HTTP_CACHE_MAX_AGE_DAYS,
+                                        f"{self.parser.name}:{ROWS_FORMAT_VERSION}")
 
-    def scrape_listings(self):
+    def _create_session(self):
+        """Create a pooled keep-alive HTTP session sized for the crawl concurrency."""
+        session = requests.Session()
+        session.headers.update(self.config.HEADERS)
+        adapter = HTTPAdapter(pool_connections=self.config.CRAWL_CONCURRENCY,
+                              pool_maxsize=self.config.CRAWL_CONCURRENCY)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def source_for(self, url):
+        """Return the adapter handling a URL's host, DEFAULT_SOURCE for hosts no adapter claims."""
+        host = self.host_scheduler.host(url)
+        for source in self.sources.values():
+            if host in source.hosts:
+                return source
+        return self.sources[self.config.DEFAULT_SOURCE]
+
+    def _page_url(self, search_url, page):
+        """Build the results URL of a search for a page number."""
+        return self.source_for(search_url).page_url(search_url, page)
+
+    def _fetch_parsed(self, url, parse):
         """
-        Scrape apartment listings from the configured URL.
-        Returns a list of dictionaries with listing details.
+        Download a URL through the request controller and run parse on its content.
+        With the HTTP cache enabled, an unchanged page returns the rows parsed on a previous run.
         """
-        ads = []
-        page = 1
+        if self.http_cache is None:
+            return parse(self.request_controller.get(url).content)
 
-        while True:
-            url = self.config.SRC + self.config.PGR + str(page)
-            print(f"Scraping page {page}: {url}")
+        content, rows = self.http_cache.fetch(self.request_controller, url)
+        if rows is not None:
+            return rows
 
-            r = requests.get(url, headers=self.config.HEADERS)
-            soup = BeautifulSoup(r.content, "html.parser")
+        rows = parse(content)
+        self.http_cache.store_rows(url, rows)
+        return rows
+
+    def _scrape_page(self, search_url, page):
+        """
+        Download and parse a single results page of a search.
+        Returns (listing count, list of ad dictionaries, total page count or None).
+        """
+        url = self._page_url(search_url, page)
+        print(f"Scraping page {page}: {url}")
+        return self._fetch_parsed(url, partial(self.source_for(search_url).parse_page, page_url=url))
 
-            listings = soup.find_all("div", class_=re.compile(r"product-item product-list-item (Premium|Standard|Top) "
-                                                              r"real-estates my-product-placeholder"))
+    @staticmethod
+    def _ignore_progress(event, **data):
+        """Default progress callback."""
 
-            if not listings:
+    def _scrape_sequential(self, search_url, start_page, done, on_progress, listings=0):
+        """Yield pages fetched one at a time from start_page until an empty page is found."""
+        page = start_page
+
+        while True:
+            if page in done:
+                listing_count, page_ads = done[page][0], None
+            else:
+                listing_count, page_ads, _ = self._scrape_page(search_url, page)
+
+            if not listing_count:
                 print("\nNo more listings found. Stopping.\n")
-                break
-
-            for listing in listings:
-                info_div = listing.find("div", class_="col-md-6 col-sm-5 col-xs-6 col-lg-6 sm-margin")
-                if info_div:
-                    a_tag = info_div.find("h3", class_="product-title").a
-                    if a_tag and a_tag.has_attr("href"):
-                        href = "https://www.halooglasi.com" + a_tag["href"]
-
-                        # Extract price
-                        price_div = listing.find("div", class_="central-feature-wrapper")
-                        price = None
-                        if price_div:
-                            value_span = price_div.find("span", attrs={"data-value": True})
-                            if value_span:
-                                price = value_span["data-value"]
-
-                        # Extract features: area, rooms, floor
-                        features = {"Area": None, "Rooms": None, "floor": None}
-                        feature_list = info_div.find_all("li", class_="col-p-1-3")
-                        for li in feature_list:
-                            legend = li.find("span", class_="legend")
-                            if not legend:
-                                continue
-                            label = legend.get_text(strip=True)
-                            value = li.get_text(strip=True).replace(label, "").strip()
-
-                            if label == "Kvadratura":
-                                features["Area"] = value.replace("m²", "").replace("m2", "").strip()
-                            elif label == "Broj soba":
-                                features["Rooms"] = value
-                            elif label == "Spratnost":
-                                features["floor"] = self.roman_converter.convert_mixed_numerals(value)
-
-                        ads.append({
-                            "url": href,
-                            "Price": price,
-                            "Area": features["Area"],
-                            "Rooms": features["Rooms"],
-                            "floor": features["floor"]
-                        })
+                return
 
+            if page_ads is not None:
+                yield page, listing_count, page_ads, None
+            listings += listing_count
+            on_progress("pages_fetched", pages=page, listings=listings)
             page += 1
 
-        for num, ad in enumerate(ads):
-            print(f"Ad No. {num}: {ad}")
+    def _map_bounded(self, function, items):
+        """
+        Call function on the items in parallel and yield (item, result) in item order.
+        Only a few calls are in flight at a time, so finished results don't pile up in memory and
+        nothing more is fetched once the consumer stops or fails.
+        """
+        window = self.config.CRAWL_CONCURRENCY * 2
+        in_flight = deque()
+
+        with ThreadPoolExecutor(max_workers=self.config.CRAWL_CONCURRENCY) as executor:
+            for item in items:
+                in_flight.append((item, executor.submit(function, item)))
+                if len(in_flight) >= window:
+                    item, future = in_flight.popleft()
+                    yield item, future.result()
+
+            while in_flight:
+                item, future = in_flight.popleft()
+                yield item, future.result()
+
+    def _scrape_concurrent(self, search_url, done, on_progress):
+        """
+        Fetch page 1, read the total page count from it and fetch the remaining pages in parallel.
+        Pages are yielded in page order, so the result matches the sequential crawl.
+        """
+        if 1 in done:
+            listing_count, page_count = done[1]
+        else:
+            listing_count, ads, page_count = self._scrape_page(search_url, 1)
+
+        if not listing_count:
+            print("\nNo more listings found. Stopping.\n")
+            return
+
+        if 1 not in done:
+            yield 1, listing_count, ads, page_count
+        listings = listing_count
+        on_progress("pages_fetched", pages=1, listings=listings)
+
+        if page_count is None:
+            print("Could not read the page count, falling back to sequential crawl.")
+            yield from self._scrape_sequential(search_url, 2, done, on_progress, listings)
+            return
+
+        print(f"Found {page_count} result pages, fetching with {self.config.CRAWL_CONCURRENCY} workers")
+
+        per_page = last_count = listing_count
+        pages = [page for page in range(2, page_count + 1) if page not in done]
+        for page, (listing_count, page_ads, _) in self._map_bounded(partial(self._scrape_page, search_url), pages):
+            yield page, listing_count, page_ads, None
+            listings += listing_count
+            on_progress("pages_fetched", pages=page, page_count=page_count, listings=listings)
+
+        if page_count > 1:
+            last_count = done[page_count][0] if page_count in done else listing_count
+
+        # The count embedded in page 1 can be stale, keep going while the last page is full
+        if last_count >= per_page:
+            yield from self._scrape_sequential(search_url, page_count + 1, done, on_progress, listings)
+
+    def iter_pages(self, search_url=None, done=None, on_progress=None):
+        """
+        Crawl the results of a search URL, the configured SRC by default, and yield
+        (page, listing count, ads, page count) for every page as soon as it's fetched.
+        The page count is only known for page 1.
+        done maps pages fetched by an interrupted run to (listing count, page count): they aren't
+        fetched again, but still tell where the results end.
+        on_progress(event, **data) is called after every page.
+        """
+        search_url = search_url or self.config.SRC
+        done = done or {}
+        on_progress = on_progress or self._ignore_progress
 
-        return ads
+        if self.config.CONCURRENT_CRAWL:
+            yield from self._scrape_concurrent(search_url, done, on_progress)
+        else:
+            yield from self._scrape_sequential(search_url, 1, done, on_progress)
 
-    def scrape_single_ad(self, url):
+    def crawl_searches(self, searches, done, on_page, on_progress=None):
+        """
+        Crawl {name: search URL} searches through iter_pages. Searches on different hosts are crawled
+        in parallel and searches on the same host one after another, each host within its budget.
+        done(name) returns the pages already fetched for a search and on_page(name, page, listing count,
+        page count, ads) is called, from the crawling thread, for every page as soon as it arrives.
+        """
+        def crawl(search):
+            name, url = search
+            for page, listing_count, ads, page_count in self.iter_pages(url, done(name), on_progress):
+                on_page(name, page, listing_count, page_count, ads)
+
+        self.host_scheduler.run_per_host(crawl, searches.items(), lambda search: search[1])
+
+    def fetch_ad_text(self, url):
+        """
+        Fetch an ad page over plain HTTP and extract its description without a browser.
+        Returns None if the description can't be found that way.
         """
-        Scrape detailed description text from a single ad URL.
+        try:
+            return self._fetch_parsed(url, self.source_for(url).extract_description)
+        except requests.RequestException as e:
+            print(f"Fast description fetch failed for {url}: {e}")
+            return None
+
+    def scrape_single_ad(self, url, driver_pool):
+        """
+        Scrape detailed description text from a single ad URL using a driver from the pool.
         Returns the description text.
         """
         description_text = "Description not available"
-
-        chrome_options = Options()
-        chrome_options.add_argument("--headless")
-        driver = webdriver.Chrome(options=chrome_options)
+        source = self.source_for(url)
 
         try:
-            driver.get(url)
-            time.sleep(1)  # Wait for JavaScript to execute
-
-            soup = BeautifulSoup(driver.page_source, "html.parser")
-            info = soup.find_all("div", class_="col-md-12")
-
-            for i in range(len(info)):
-                if info[i].find_all("div", class_="product-page view-mode theme-blue"):
-                    info = info[i].find_all("div", class_="product-page view-mode theme-blue")
-                    break
-
-            # Check if info is not empty before accessing its first element
-            if info:
-                tab_groups = info[0].find_all("div", class_="tab-top-group")
-                if tab_groups:
-                    tab_header3 = tab_groups[0].find_all("div", id="tabTopHeader3")
-                    if tab_header3:
-                        description_span = tab_header3[0].find('span', id='plh51')
-                        if description_span and description_span.text.strip():
-                            description_text = description_span.text.strip()
+            with driver_pool.driver() as driver:
+                with self.host_scheduler.slot(url):
+                    driver.get(url)
+
+                # Wait for JavaScript to render the description instead of sleeping a fixed time
+                try:
+                    WebDriverWait(driver, self.config.DESCRIPTION_WAIT_TIMEOUT).until(
+                        EC.presence_of_element_located(source.description_locator)
+                    )
+                except TimeoutException:
+                    pass
+
+                page_source = driver.page_source
+
+            description_text = source.parse_rendered_description(page_source) or description_text
+        except CrawlAborted:
+            raise
         except Exception as e:
-            description_text = f"Error scraping ad: {str(e)}"
-        finally:
-            driver.quit()
+            description_text = f"{SCRAPE_ERROR_PREFIX}{str(e)}"
 
         print(f"Done scraping description for URL: {url}")
         return description_text
 
-    def scrape_ad_descriptions(self, df):
+    def _timed_scrape_single_ad(self, url, driver_pool):
+        """Scrape a single ad and return (description, seconds taken)."""
+        start = time.perf_counter()
+        description_text = self.scrape_single_ad(url, driver_pool)
+        return description_text, time.perf_counter() - start
+
+    @staticmethod
+    def _report_latencies(latencies, elapsed, pool_size):
+        """Print per-ad latency statistics for sizing the driver pool."""
+        if not latencies:
+            return
+
+        ordered = sorted(latencies)
+        p50 = ordered[len(ordered) // 2]
+        p90 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.9))]
+        print(f"Scraped {len(latencies)} descriptions in {elapsed:.1f}s with {pool_size} drivers "
+              f"({len(latencies) / elapsed:.2f} ads/s)")
+        print(f"Per-ad latency: mean {sum(latencies) / len(latencies):.2f}s, p50 {p50:.2f}s, "
+              f"p90 {p90:.2f}s, max {ordered[-1]:.2f}s")
+
+    def iter_ad_descriptions(self, urls, on_progress=None):
         """
-        Process a DataFrame to scrape missing ad descriptions.
-        Only scrapes descriptions for new listings based on URL.
-        Returns the DataFrame with updated ad descriptions.
+        Fetch the descriptions of the given ad URLs, through the browser-free path first and with
+        Chrome for the ads it can't handle.
+        Yields (url, description, scraped) as soon as each description is fetched, scraped is False
+        when the description is an error message.
+        on_progress(event, **data) is called after every description.
         """
-        # Ensure AdText column exists
-        if "AdText" not in df.columns:
-            df["AdText"] = ""
+        on_progress = on_progress or self._ignore_progress
+        urls = list(dict.fromkeys(urls))
+        total = len(urls)
+        done = 0
+
+        if self.config.FAST_DESCRIPTION_PATH:
+            start = time.perf_counter()
+            missing = []
+            for url, description_text in self._map_bounded(self.fetch_ad_text, urls):
+                if description_text:
+                    done += 1
+                    yield url, description_text, True
+                else:
+                    missing.append(url)
+                on_progress("descriptions", done=done, total=total)
+
+            print(f"Fetched {done}/{total} descriptions without a browser in {time.perf_counter() - start:.1f}s")
+            urls = missing
+            if not urls:
+                return
+            print(f"Falling back to Chrome for {len(urls)} listings")
+
+        pool_size = min(self.config.DRIVER_POOL_SIZE, len(urls))
+        latencies = []
+        start = time.perf_counter()
+
+        with DriverPool(pool_size, self.config.DRIVER_PAGE_LOAD_TIMEOUT) as driver_pool:
+            with ThreadPoolExecutor(max_workers=pool_size) as executor:
+                # One ad per driver in flight, the next is only submitted when one finishes, so nothing
+                # more is scraped once the consumer stops or fails
+                pending = iter(urls)
+                futures = {}
+
+                def submit_next():
+                    url = next(pending, None)
+                    if url is not None:
+                        futures[executor.submit(self._timed_scrape_single_ad, url, driver_pool)] = url
+
+                for _ in range(pool_size):
+                    submit_next()
+
+                num = 0
+                while futures:
+                    finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        url = futures.pop(future)
+                        description_text, seconds = future.result()
+                        submit_next()
+                        num += 1
+                        latencies.append(seconds)
+                        print(f"Scraped description {num}/{len(urls)} in {seconds:.2f}s: {url}")
+                        done += 1
+                        yield url, description_text, not description_text.startswith(SCRAPE_ERROR_PREFIX)
+                        on_progress("descriptions", done=done, total=total)
+
+            if driver_pool.recycled:
+                print(f"Recycled {driver_pool.recycled} crashed or hung drivers")
 
-        # Count new listings before starting
-        new_listings = df[df["AdText"].isna() | (df["AdText"] == "")]
-        print(f"Found {len(new_listings)} listings that need description scraping")
+        self._report_latencies(latencies, time.perf_counter() - start, pool_size)
 
-        # Only scrape descriptions for rows where AdText is empty or null
-        for index, row in new_listings.iterrows():
-            print(f"Scraping description for listing {index + 1}/{len(new_listings)}: {row['url']}")
-            df.at[index, "AdText"] = self.scrape_single_ad(row["url"])
+    def finish_run(self):
+        """Report the run's requests per host and HTTP cache statistics and apply the cache eviction policy."""
+        self.host_scheduler.report()
+        self.host_scheduler.reset_stats()
+        if self.http_cache is None:
+            return
 
-        return df
+        self.http_cache.report()
+        self.http_cache.reset_stats()
+        self.http_cache.evict()
@@ -0,0 +1,133 @@
+import json
+import math
+import re
+from abc import ABC, abstractmethod
+from selenium.webdriver.common.by import By
+from services.parsers import ListingMarkup
+
+# Result count embedded in the results page data and page numbers in the pagination links
+TOTAL_COUNT_RE = re.compile(r'"TotalCount"\s*:\s*(\d+)')
+PAGE_LINK_RE = re.compile(r'[?&]page=(\d+)')
+# Listing data embedded in ad pages, its TextHtml field holds the description rendered into span#plh51
+CLASSIFIED_RE = re.compile(r'QuidditaEnvironment\.CurrentClassified\s*=\s*')
+
+
+class ListingSource(ABC):
+    """
+    Adapter for one listings portal: how its result pages are addressed and parsed and how the
+    description of an ad is read. The Scraper handles fetching, caching and the per-host budget.
+    """
+
+    # Name used in the configuration and the hosts whose URLs the adapter handles
+    name = None
+    hosts = ()
+    # Element holding the description once an ad page has rendered in Chrome
+    description_locator = None
+
+    @abstractmethod
+    def page_url(self, search_url, page):
+        """Build the URL of a results page of a search."""
+
+    @abstractmethod
+    def parse_page(self, content, page_url):
+        """Parse a results page fetched from page_url into [listing count, ads, total page count or None]."""
+
+    @abstractmethod
+    def extract_description(self, content):
+        """Read the description from a raw ad page without a browser, None when it isn't in the page."""
+
+    @abstractmethod
+    def parse_rendered_description(self, page_source):
+        """Read the description from an ad page rendered in Chrome, None when it's missing."""
+
+
+class HalooglasiSource(ListingSource):
+    """halooglasi.com listings, parsed with the configured parser backend."""
+
+    name = "halooglasi"
+    hosts = ("www.halooglasi.com", "halooglasi.com")
+    markup = ListingMarkup(
+        listing_class_re=re.compile(r"product-item product-list-item (Premium|Standard|Top) "
+                                    r"real-estates my-product-placeholder"),
+        listing_class_token="product-list-item",
+        info_div_class="col-md-6 col-sm-5 col-xs-6 col-lg-6 sm-margin",
+        title_class="product-title",
+        price_class="central-feature-wrapper",
+        feature_class="col-p-1-3",
+        legend_class="legend",
+        feature_labels={"Kvadratura": "Area", "Broj soba": "Rooms", "Spratnost": "floor"},
+        content_class="col-md-12",
+        product_page_class="product-page view-mode theme-blue",
+        description_group_class="tab-top-group",
+        description_tab_id="tabTopHeader3",
+        description_id="plh51",
+    )
+    description_locator = (By.ID, markup.description_id)
+
+    def __init__(self, config, parser):
+        """Initialize with configuration and the parser backend."""
+        self.config = config
+        self.parser = parser
+
+    def page_url(self, search_url, page):
+        """Build the URL of a results page of a search."""
+        return search_url + self.config.PGR + str(page)
+
+    def parse_page(self, content, page_url):
+        """Parse a results page fetched from page_url into [listing count, ads, total page count or None]."""
+        listing_count, ads = self.parser.parse_listings(content, self.markup, page_url)
+        return [listing_count, ads, self.read_page_count(content, listing_count)]
+
+    @staticmethod
+    def read_page_count(content, listings_on_page):
+        """
+        Read the total number of result pages from the first results page.
+        Uses the embedded result count when present, otherwise the pagination links.
+        Returns None if the page count can't be determined.
+        """
+        html = content.decode("utf-8", errors="ignore") if isinstance(content, bytes) else content
+
+        total_match = TOTAL_COUNT_RE.search(html)
+        if total_match and listings_on_page:
+            return math.ceil(int(total_match.group(1)) / listings_on_page)
+
+        page_numbers = [int(num) for num in PAGE_LINK_RE.findall(html)]
+        if page_numbers:
+            return max(page_numbers)
+
+        return None
+
+    def extract_description(self, content):
+        """
+        Extract the description from the listing data embedded in a raw ad page.
+        Returns None if the page has no embedded data or no text in it.
+        """
+        html = content.decode("utf-8", errors="replace") if isinstance(content, bytes) else content
+        match = CLASSIFIED_RE.search(html)
+        if not match:
+            return None
+
+        try:
+            classified, _ = json.JSONDecoder().raw_decode(html, match.end())
+        except ValueError:
+            return None
+
+        text_html = classified.get("TextHtml") if isinstance(classified, dict) else None
+        if not text_html:
+            return None
+
+        description_text = self.parser.fragment_text(text_html).strip()
+        return description_text or None
+
+    def parse_rendered_description(self, page_source):
+        """Read the description from an ad page rendered in Chrome, None when it's missing."""
+        return self.parser.parse_description(page_source, self.markup)
+
+
+# Available adapters by name, add new portals here
+SOURCES = {source.name: source for source in (HalooglasiSource,)}
+
+
+def create_sources(config, parser):
+    """Instantiate every adapter, returns {name: source}."""
+    return {name: source(config, parser) for name, source in SOURCES.items()}
@@ -2,32 +2,51 @@
 let allListingsTable;
 let newListingsTable;
 let wasScraperRunning = false;
+const listingCounts = {};
 
-// Function to load data into tables
-function loadTableData(tableId, tableType) {
-    // Get filter values
-    const filters = {};
+// Build the filter query parameters for a table
+function buildFilterParams(tableType) {
+    const queryParams = new URLSearchParams();
     const prefix = tableType === 'new' ? 'new_filter_' : 'filter_';
+    queryParams.append('table_type', tableType);
 
     $('.filter-dropdown').each(function() {
         const id = $(this).attr('id');
         if (id && id.startsWith(prefix)) {
             const value = $(this).val();
             if (value) {
-                filters[id] = value;
+                queryParams.append(id, value);
             }
         }
     });
 
-    // Build query string
-    let queryParams = new URLSearchParams();
-    queryParams.append('table_type', tableType);
+    // Numeric min/max ranges only apply to the all listings table
+    if (tableType === 'all') {
+        $('.range-filter').each(function() {
+            const value = $(this).val();
+            if (value !== '') {
+                queryParams.append($(this).attr('id'), value);
+            }
+        });
+    }
 
-    for (const [key, value] of Object.entries(filters)) {
-        queryParams.append(key, value);
+    return queryParams;
+}
+
+// Function to load data into tables
+function loadTableData(tableId, tableType) {
+    const table = tableId === 'allListingsTable' ? allListingsTable : newListingsTable;
+
+    // Paging, sorting and filtering run on the server, an existing table only needs to reload
+    if (table) {
+        table.ajax.reload();
+        return;
     }
 
-    // Fetch data
+    // Ask for zero rows to learn the columns before setting up the table
+    const queryParams = buildFilterParams(tableType);
+    queryParams.append('length', 0);
+
     $.ajax({
         url: `/listings?${queryParams.toString()}`,
         method: 'GET',
@@ -35,11 +54,6 @@ function loadTableData(tableId, tableType) {
         success: function(response) {
             const tableElement = $(`#${tableId}`);
 
-            // Clear existing table
-            if ($.fn.DataTable.isDataTable(`#${tableId}`)) {
-                $(`#${tableId}`).DataTable().destroy();
-            }
-
             // Set headers
             const headerRow = $(`#${tableId === 'allListingsTable' ? 'allListingsHeaders' : 'newListingsHeaders'}`);
             headerRow.empty();
@@ -58,10 +72,38 @@ function loadTableData(tableId, tableType) {
 
             // Initialize DataTable
             const dataTableConfig = {
-                data: response.data,
+                serverSide: true,
+                processing: true,
+                // draw is kept out of the URL and patched into the reply, so a repeated request has the
+                // same URL and the browser revalidates it with the ETag instead of downloading it again
+                ajax: function(params, callback) {
+                    const draw = params.draw;
+                    delete params.draw;
+                    buildFilterParams(tableType).forEach((value, key) => {
+                        params[key] = value;
+                    });
+
+                    $.ajax({
+                        url: '/listings',
+                        data: params,
+                        dataType: 'json',
+                        cache: true,
+                        success: function(json) {
+                            json.draw = draw;
+                            // Every page load reports the unfiltered total, which keeps the counts current
+                            updateListingsCounts(tableType, json.recordsTotal);
+                            callback(json);
+                        },
+                        error: function(error) {
+                            console.error("Error loading listings:", error);
+                            callback({draw: draw, recordsTotal: 0, recordsFiltered: 0, data: []});
+                        }
+                    });
+                },
                 columns: columnsToShow.map(column => ({
                     data: column,
                     title: column,
+                    orderable: column !== 'url',
                     render: function(data, type, row) {
                         if (column === 'url') {
                             return data;
@@ -74,7 +116,7 @@ function loadTableData(tableId, tableType) {
                         }
                     }
                 })),
-                order: [[0, 'asc']],
+                order: [[1, 'asc']],
                 pageLength: 25,
                 lengthMenu: [10, 25, 50, 100],
                 responsive: true,
@@ -100,7 +142,7 @@ function loadTableData(tableId, tableType) {
                 newListingsTable = tableElement.DataTable(dataTableConfig);
             }
 
-            updateListingsCounts();
+            updateListingsCounts(tableType, response.recordsTotal);
         },
         error: function(error) {
             console.error("Error loading data:", error);
@@ -109,26 +151,66 @@ function loadTableData(tableId, tableType) {
     });
 }
 
-// Function to update the listings counts
-function updateListingsCounts() {
-    $.ajax({
-        url: '/listings?table_type=new',
-        method: 'GET',
-        dataType: 'json',
-        success: function(newResponse) {
-            $.ajax({
-                url: '/listings?table_type=all',
-                method: 'GET',
-                dataType: 'json',
-                success: function(allResponse) {
-                    $('#newListingsCount').html(`
-                        <strong>${newResponse.data.length}</strong> new listings | 
-                        <strong>${allResponse.data.length}</strong> total active listings
-                    `);
-                }
-            });
+// Function to update the listings counts from the totals the tables already received
+function updateListingsCounts(tableType, total) {
+    listingCounts[tableType] = total;
+    if (listingCounts.new === undefined || listingCounts.all === undefined) {
+        return;
+    }
+
+    $('#newListingsCount').html(`
+        <strong>${listingCounts.new}</strong> new listings | 
+        <strong>${listingCounts.all}</strong> total active listings
+    `);
+}
+
+// Describe the current stage of a scraper run from its progress state
+function describeProgress(state) {
+    if (state.stage === 'descriptions' && state.total) {
+        return `Fetching descriptions ${state.done}/${state.total}`;
+    }
+    if (state.stage === 'db_saved') {
+        return 'Saving listings...';
+    }
+    if (state.stage === 'listings_parsed') {
+        return `Parsed ${state.listings} listings`;
+    }
+    if (state.stage === 'pages_fetched') {
+        const pages = state.page_count ? `${state.pages}/${state.page_count}` : state.pages;
+        return `Fetched page ${pages} (${state.listings} listings)`;
+    }
+    return 'Mining in progress...';
+}
+
+// Render the scraper status panel and reload the tables once a run has finished
+function renderScraperStatus(state) {
+    const statusContainer = $('#scraperStatus');
+    const runButton = $('#runScraperBtn');
+
+    if (state.is_running) {
+        statusContainer.removeClass('status-idle').addClass('status-running');
+        statusContainer.html(`<div class="spinner"></div> ${describeProgress(state)}`);
+        runButton.prop('disabled', true);
+        runButton.html('<div class="spinner"></div> Mining...');
+        wasScraperRunning = true;
+    } else {
+        statusContainer.removeClass('status-running').addClass('status-idle');
+        statusContainer.html(`<span id="statusIcon">⏸</span> Idle`);
+        runButton.prop('disabled', false);
+        runButton.html('<span class="crypto-icon">⛏️</span> Mine New Listings');
+
+        if (state.last_run) {
+            const duration = state.duration !== undefined ? ` (${state.duration}s)` : '';
+            $('#lastRunTime').text(`Last scan: ${state.last_run}${duration}`);
         }
-    });
+
+        // ✅ Only reload tables if scraper just finished
+        if (wasScraperRunning) {
+            loadTableData('allListingsTable', 'all');
+            loadTableData('newListingsTable', 'new');
+            wasScraperRunning = false;
+        }
+    }
 }
 
 // Function to update scraper status
@@ -138,32 +220,7 @@ function updateScraperStatus() {
         method: 'GET',
         dataType: 'json',
         success: function(response) {
-            const statusContainer = $('#scraperStatus');
-            const runButton = $('#runScraperBtn');
-
-            if (response.is_running) {
-                statusContainer.removeClass('status-idle').addClass('status-running');
-                statusContainer.html(`<div class="spinner"></div> Mining in progress...`);
-                runButton.prop('disabled', true);
-                runButton.html('<div class="spinner"></div> Mining...');
-                wasScraperRunning = true;
-            } else {
-                statusContainer.removeClass('status-running').addClass('status-idle');
-                statusContainer.html(`<span id="statusIcon">⏸</span> Idle`);
-                runButton.prop('disabled', false);
-                runButton.html('<span class="crypto-icon">⛏️</span> Mine New Listings');
-
-                if (response.last_run) {
-                    $('#lastRunTime').text(`Last scan: ${response.last_run}`);
-                }
-
-                // ✅ Only reload tables if scraper just finished
-                if (wasScraperRunning) {
-                    loadTableData('allListingsTable', 'all');
-                    loadTableData('newListingsTable', 'new');
-                    wasScraperRunning = false;
-                }
-            }
+            renderScraperStatus(Object.assign({}, response.progress, response));
         }
     });
 }
@@ -174,11 +231,47 @@ function setupStatusPolling() {
     setInterval(updateScraperStatus, 3000);
 }
 
+// Receive scraper progress pushed by the server, fall back to polling without EventSource support
+function setupStatusStream() {
+    if (!window.EventSource) {
+        setupStatusPolling();
+        return;
+    }
+
+    let scraperState = {is_running: false};
+    const source = new EventSource('/scraper-events');
+
+    source.addEventListener('status', function(e) {
+        scraperState = JSON.parse(e.data);
+        renderScraperStatus(scraperState);
+    });
+
+    ['run_started', 'pages_fetched', 'listings_parsed', 'descriptions', 'db_saved'].forEach(function(eventName) {
+        source.addEventListener(eventName, function(e) {
+            const data = JSON.parse(e.data);
+            if (eventName === 'run_started') {
+                scraperState = {last_run: scraperState.last_run};
+            }
+            scraperState = Object.assign(scraperState, data, {is_running: true, stage: eventName});
+            renderScraperStatus(scraperState);
+        });
+    });
+
+    source.addEventListener('run_finished', function(e) {
+        const data = JSON.parse(e.data);
+        scraperState = Object.assign(data, {is_running: false, last_run: data.finished_at});
+        renderScraperStatus(scraperState);
+        if (data.status === 'error') {
+            console.error('Scraper run failed:', data.error);
+        }
+    });
+}
+
 // Document ready
 $(document).ready(function() {
     loadTableData('allListingsTable', 'all');
     loadTableData('newListingsTable', 'new');
-    setupStatusPolling();
+    setupStatusStream();
 
     $('#runScraperBtn').click(function(e) {
         e.preventDefault();
@@ -188,7 +281,7 @@ $(document).ready(function() {
                 method: 'POST',
                 success: function(response) {
                     if (response.status === 'started') {
-                        updateScraperStatus();
+                        renderScraperStatus({is_running: true});
                     } else {
                         alert("Scraper is already running.");
                     }
@@ -201,7 +294,7 @@ $(document).ready(function() {
     });
 
     // Reload tables when filters change
-    $('.filter-dropdown').change(function() {
+    $('.filter-dropdown, .range-filter').change(function() {
         loadTableData('allListingsTable', 'all');
         loadTableData('newListingsTable', 'new');
     });
@@ -230,27 +323,29 @@ $(document).ready(function() {
 function exportTablesToExcel() {
     const wb = XLSX.utils.book_new();
 
-    // Helper to extract table data
-    function getTableData(tableInstance, name) {
-        const data = [];
+    // Helper to fetch every filtered row of a table from the server
+    function fetchTableData(tableInstance, tableType, name) {
         const headers = tableInstance.columns().header().toArray().map(h => $(h).text().trim());
-        data.push(headers);
+        const queryParams = buildFilterParams(tableType);
+        queryParams.append('length', -1);
 
-        tableInstance.rows({ search: 'applied' }).every(function () {
-            const rowData = this.data();
-            const row = headers.map(header => rowData[header] ?? '');
-            data.push(row);
-        });
+        return $.getJSON(`/listings?${queryParams.toString()}`).then(function(response) {
+            const data = [headers];
+            response.data.forEach(rowData => {
+                data.push(headers.map(header => rowData[header] ?? ''));
+            });
 
-        const ws = XLSX.utils.aoa_to_sheet(data);
-        XLSX.utils.book_append_sheet(wb, ws, name);
+            const ws = XLSX.utils.aoa_to_sheet(data);
+            XLSX.utils.book_append_sheet(wb, ws, name);
+        });
     }
 
     if (allListingsTable && newListingsTable) {
-        getTableData(allListingsTable, "All Listings");
-        getTableData(newListingsTable, "New Listings");
-
-        XLSX.writeFile(wb, "ListingsExport.xlsx");
+        // Sheets are appended in request order, so fetch them one after another
+        fetchTableData(allListingsTable, 'all', "All Listings")
+            .then(() => fetchTableData(newListingsTable, 'new', "New Listings"))
+            .then(() => XLSX.writeFile(wb, "ListingsExport.xlsx"))
+            .fail(() => alert("Failed to export listings."));
     } else {
         alert("Tables are not loaded yet.");
     }
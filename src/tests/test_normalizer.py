@@ -0,0 +1,77 @@
+"""
+FieldNormalizer against the per-row conversion it replaced (legacy_normalize in the normalizer benchmark)
+and properties over generated floors.
+Run from the src directory: python -m unittest discover -s tests
+"""
+import random
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_normalizer import NEW_FLOORS, build_ads, legacy_normalize
+from benchmarks.fixtures import FLOORS
+from core.normalizer import FieldNormalizer
+from core.roman_converter import RomanConverter
+
+
+def to_roman(number):
+    numerals = [(10, "X"), (9, "IX"), (5, "V"), (4, "IV"), (1, "I")]
+    result = ""
+    for value, numeral in numerals:
+        while number >= value:
+            result += numeral
+            number -= value
+    return result
+
+
+class FieldNormalizerTest(unittest.TestCase):
+
+    def assertSameColumn(self, left, right, msg=None):
+        """Equal values, with None and NaN treated as the same missing value."""
+        for num, (a, b) in enumerate(zip(left.astype(object), right.astype(object))):
+            if pd.isna(a) and pd.isna(b):
+                continue
+            self.assertEqual(a, b, f"{msg}, row {num}")
+        self.assertEqual(len(left), len(right), msg)
+
+    def test_matches_legacy_conversion(self):
+        """Both conversions agree on every column for the floors the old one handled correctly."""
+        legacy = legacy_normalize(build_ads(5000, FLOORS))
+        new = FieldNormalizer.normalize(pd.DataFrame(build_ads(5000, FLOORS)))
+        for column in legacy.columns:
+            self.assertSameColumn(legacy[column], new[column], f"{column} differs from the old conversion")
+
+    def test_normalizing_twice_changes_nothing(self):
+        new = FieldNormalizer.normalize(pd.DataFrame(build_ads(2000, FLOORS + NEW_FLOORS)))
+        renormalized = FieldNormalizer.normalize(new.copy())
+        for column in new.columns:
+            self.assertSameColumn(new[column], renormalized[column], f"normalizing twice changed {column}")
+
+    def test_roman_floors(self):
+        """Every generated Roman floor converts to its number, as text and as floor_value."""
+        rng = random.Random(2)
+        raws, expected = [], []
+        for _ in range(2000):
+            floor = rng.randint(1, 40)
+            max_floor = rng.randint(floor, 45)
+            raw = f"{to_roman(floor)}/{max_floor}"
+            self.assertEqual(RomanConverter.convert_mixed_numerals(raw), f"{floor}/{max_floor}")
+            raws.append(raw)
+            expected.append((float(floor), float(max_floor)))
+
+        df = FieldNormalizer.normalize(pd.DataFrame({"floor": raws}))
+        actual = list(zip(df["floor_value"], df["max_floor_value"]))
+        self.assertEqual(actual, expected)
+
+    def test_named_floors(self):
+        """Named floors map to their level, with and without the building's floor count."""
+        for label, level in (("PR", 0.0), ("VPR", 0.0), ("SUT", -1.0), ("PSUT", -0.5)):
+            df = FieldNormalizer.normalize(pd.DataFrame({"floor": [label, f"{label}/6"]}))
+            self.assertEqual(list(df["floor_value"]), [level, level], label)
+            self.assertTrue(np.isnan(df["max_floor_value"].iloc[0]), label)
+            self.assertEqual(df["max_floor_value"].iloc[1], 6.0, label)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,24 +1,14 @@
+import json
 import pandas as pd
-import sqlite3
 import datetime as dt
+from itertools import islice
+from core.data_processor import NUMERIC_COLUMNS
+from core.diff_engine import TRACKED_COLUMNS
+from core.normalizer import FieldNormalizer
+from utils.db_connection import ConnectionManager
 
-
-class DatabaseManager:
-    """Handles database operations for apartment listings."""
-
-    def __init__(self, config):
-        """Initialize with database path."""
-        self.db_path = config.DB_PATH
-        self.create_tables_if_not_exist()
-
-    def create_tables_if_not_exist(self):
-        """Create tables if they don't already exist."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        # Create the main listings table
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS listings (
+LISTINGS_TABLE_DDL = '''
+        CREATE TABLE IF NOT EXISTS {table} (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             url TEXT UNIQUE,
             Price TEXT,
@@ -27,151 +17,641 @@ class DatabaseManager:
             Floor TEXT,
             "Max Floor" TEXT,
             AdText TEXT,
+            AISays TEXT,
             GoToLink TEXT,
             ReportDate TEXT,
             is_active INTEGER DEFAULT 1,
             removed_date TEXT,
-            add_date TEXT
+            add_date TEXT,
+            price_value REAL,
+            area_value REAL,
+            rooms_value REAL,
+            floor_value REAL,
+            max_floor_value REAL
         )
-        ''')
+        '''
 
-        # Create the new_listings table with the same structure
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS new_listings (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            url TEXT UNIQUE,
-            Price TEXT,
-            Area TEXT,
-            Rooms TEXT,
-            Floor TEXT,
-            "Max Floor" TEXT,
-            AdText TEXT,
-            GoToLink TEXT,
-            ReportDate TEXT,
-            is_active INTEGER DEFAULT 1,
-            removed_date TEXT,
-            add_date TEXT
+# Indexes for the dashboard's active-listing filters and numeric ranges
+LISTINGS_INDEXES_SQL = (
+    "CREATE INDEX IF NOT EXISTS idx_listings_is_active ON listings (is_active)",
+    "CREATE INDEX IF NOT EXISTS idx_listings_add_date ON listings (add_date)",
+    "CREATE INDEX IF NOT EXISTS idx_listings_active_price ON listings (is_active, price_value)",
+    "CREATE INDEX IF NOT EXISTS idx_listings_active_area ON listings (is_active, area_value)",
+    "CREATE INDEX IF NOT EXISTS idx_listings_active_rooms ON listings (is_active, rooms_value)",
+    "CREATE INDEX IF NOT EXISTS idx_listings_active_floor ON listings (is_active, floor_value)",
+)
+
+# Columns the upsert sets itself instead of taking them from the DataFrame
+UPSERT_MANAGED_COLUMNS = ("id", "add_date", "is_active", "removed_date")
+# Columns that change on every run and don't make a row count as changed on their own
+UPSERT_UNTRACKED_COLUMNS = ("GoToLink", "ReportDate")
+UPSERT_BATCH_SIZE = 500
+
+
+class DatabaseManager:
+    """Handles database operations for apartment listings."""
+
+    def __init__(self, config):
+        """Initialize with database path and the shared connection pool."""
+        self.db_path = config.DB_PATH
+        self.connections = ConnectionManager(
+            self.db_path,
+            pool_size=config.DB_POOL_SIZE,
+            busy_timeout=config.DB_BUSY_TIMEOUT,
+            cache_size_kib=config.DB_CACHE_SIZE_KIB,
+            mmap_size=config.DB_MMAP_SIZE
         )
-        ''')
+        self.create_tables_if_not_exist()
+
+    def create_tables_if_not_exist(self):
+        """Create tables if they don't already exist."""
+        with self.connections.transaction() as conn:
+            cursor = conn.cursor()
 
-        conn.commit()
-        conn.close()
+            # Create the main listings table
+            cursor.execute(LISTINGS_TABLE_DDL.format(table="listings"))
 
-    def clear_new_listings_table(self):
-        """Delete all records from the new_listings table."""
-        conn = sqlite3.connect(self.db_path)
+            # Create the new_listings table with the same structure
+            cursor.execute(LISTINGS_TABLE_DDL.format(table="new_listings"))
+
+        self.repair_listings_schema()
+        self.migrate()
+
+        with self.connections.transaction() as conn:
+            for sql in LISTINGS_INDEXES_SQL:
+                conn.execute(sql)
+
+    def migrate(self):
+        """Apply the schema migrations newer than the database's user_version."""
+        migrations = [
+            self._migrate_numeric_columns,
+            self._migrate_app_meta,
+            self._migrate_runs,
+            self._migrate_jobs,
+            self._migrate_listing_events,
+            self._migrate_ai_analysis,
+            self._migrate_snapshots,
+            self._migrate_crawl_checkpoints,
+            self._migrate_searches,
+        ]
+
+        with self.connections.transaction() as conn:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            for number, migration in enumerate(migrations, start=1):
+                if number <= version:
+                    continue
+                migration(conn)
+                conn.execute(f"PRAGMA user_version = {number}")
+                print(f"Applied database migration {number}: {migration.__name__.lstrip('_')}")
+
+    def _migrate_numeric_columns(self, conn):
+        """Add typed numeric columns next to the raw text columns and backfill them."""
         cursor = conn.cursor()
 
-        cursor.execute("DELETE FROM new_listings")
+        for table in ("listings", "new_listings"):
+            existing = self._table_columns(cursor, table)
+            for numeric_column in NUMERIC_COLUMNS.values():
+                if numeric_column not in existing:
+                    cursor.execute(f"ALTER TABLE {table} ADD COLUMN {numeric_column} REAL")
+
+            df = pd.read_sql_query(f'SELECT id, Price, Area, Rooms, Floor, "Max Floor" FROM {table}', conn)
+            if df.empty:
+                continue
+
+            df = FieldNormalizer.add_numeric_columns(df)
+            numeric_columns = list(NUMERIC_COLUMNS.values())
+            assignments = ", ".join(f"{column} = ?" for column in numeric_columns)
+            cursor.executemany(
+                f"UPDATE {table} SET {assignments} WHERE id = ?",
+                ([self._to_sql_value(value) for value in row]
+                 for row in df[numeric_columns + ["id"]].itertuples(index=False, name=None))
+            )
+
+    def repair_listings_schema(self):
+        """
+        Rebuild the listings table if it lost its UNIQUE(url) constraint and id column,
+        which happened when earlier versions replaced the table from a DataFrame.
+        Extra columns and all rows are kept, the last row for a duplicated url wins.
+        """
+        with self.connections.transaction() as conn:
+            cursor = conn.cursor()
+
+            if self._has_unique_url(cursor, "listings"):
+                return
+
+            old_columns = self._table_columns(cursor, "listings")
+            cursor.execute("ALTER TABLE listings RENAME TO listings_old")
+            cursor.execute(LISTINGS_TABLE_DDL.format(table="listings"))
+
+            new_columns = self._table_columns(cursor, "listings")
+            for column in old_columns:
+                if column not in new_columns:
+                    cursor.execute(f'ALTER TABLE listings ADD COLUMN "{column}" TEXT')
+
+            copy_columns = ", ".join(f'"{column}"' for column in old_columns if column != "id")
+            cursor.execute(f"INSERT OR REPLACE INTO listings ({copy_columns}) "
+                           f"SELECT {copy_columns} FROM listings_old ORDER BY rowid")
+            cursor.execute("DROP TABLE listings_old")
+
+        print("Rebuilt listings table with its UNIQUE(url) constraint")
+
+    @staticmethod
+    def _table_columns(cursor, table):
+        """Return the column names of a table."""
+        cursor.execute(f"PRAGMA table_info({table})")
+        return [row[1] for row in cursor.fetchall()]
+
+    @staticmethod
+    def _has_unique_url(cursor, table):
+        """Check whether a table has a unique index on url alone."""
+        cursor.execute(f"PRAGMA index_list({table})")
+        for index in cursor.fetchall():
+            name, unique = index[1], index[2]
+            if not unique:
+                continue
+            cursor.execute(f'PRAGMA index_info("{name}")')
+            if [row[2] for row in cursor.fetchall()] == ["url"]:
+                return True
+        return False
+
+    def _migrate_app_meta(self, conn):
+        """Add the key/value table holding the data version counter."""
+        conn.execute("CREATE TABLE IF NOT EXISTS app_meta (key TEXT PRIMARY KEY, value INTEGER)")
+        conn.execute("INSERT OR IGNORE INTO app_meta (key, value) VALUES ('data_version', 0)")
+
+    def get_data_version(self):
+        """Return the data version, which goes up every time a run commits its results."""
+        with self.connections.connection() as conn:
+            row = conn.execute("SELECT value FROM app_meta WHERE key = 'data_version'").fetchone()
+        return row[0] if row else 0
+
+    def bump_data_version(self):
+        """Increase the data version so caches built on the listings tables get rebuilt."""
+        with self.connections.transaction() as conn:
+            conn.execute("UPDATE app_meta SET value = value + 1 WHERE key = 'data_version'")
+            version = conn.execute("SELECT value FROM app_meta WHERE key = 'data_version'").fetchone()[0]
+        print(f"Data version is now {version}")
+        return version
+
+    def _migrate_runs(self, conn):
+        """Add the run history table used to track how long runs and their stages take."""
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS runs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                search TEXT,
+                trigger TEXT,
+                status TEXT,
+                started_at TEXT,
+                finished_at TEXT,
+                duration REAL,
+                stage_durations TEXT,
+                listing_count INTEGER,
+                new_count INTEGER,
+                removed_count INTEGER,
+                error TEXT
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_runs_started_at ON runs (started_at)")
+
+    def _migrate_jobs(self, conn):
+        """Add the queue of requested runs shared by every process using the database."""
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                search TEXT,
+                trigger TEXT,
+                status TEXT,
+                requests INTEGER DEFAULT 1,
+                requested_at TEXT,
+                started_at TEXT,
+                finished_at TEXT,
+                worker TEXT,
+                heartbeat_at REAL,
+                progress TEXT,
+                error TEXT
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status)")
+
+    def _migrate_listing_events(self, conn):
+        """Add the append-only listing history and the staging table today's scrape is compared from."""
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS listing_events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                url TEXT NOT NULL,
+                event TEXT NOT NULL,
+                field TEXT,
+                old_value TEXT,
+                new_value TEXT,
+                old_number REAL,
+                new_number REAL,
+                run_id INTEGER,
+                event_date TEXT
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_listing_events_url ON listing_events (url, id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_listing_events_event ON listing_events (event, event_date)")
+
+        numeric_columns = ", ".join(f"{column} REAL" for column in NUMERIC_COLUMNS.values())
+        tracked_columns = ", ".join(f'"{column}" TEXT' for column in TRACKED_COLUMNS)
+        conn.execute(f"CREATE TABLE IF NOT EXISTS scrape_staging (url TEXT PRIMARY KEY, {tracked_columns}, "
+                     f"{numeric_columns})")
+
+    def _migrate_ai_analysis(self, conn):
+        """Add the AISays column to the listings tables and the cache of AI analyses."""
+        cursor = conn.cursor()
+        for table in ("listings", "new_listings"):
+            if "AISays" not in self._table_columns(cursor, table):
+                cursor.execute(f"ALTER TABLE {table} ADD COLUMN AISays TEXT")
+
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS ai_cache (
+                key TEXT PRIMARY KEY,
+                model TEXT,
+                analysis TEXT,
+                size INTEGER,
+                created_at REAL,
+                used_at REAL,
+                hits INTEGER DEFAULT 0
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_ai_cache_used_at ON ai_cache (used_at)")
+
+    def _migrate_snapshots(self, conn):
+        """Add the catalog of daily listing snapshot files."""
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS snapshots (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                run_id INTEGER,
+                taken_on TEXT,
+                taken_at TEXT,
+                path TEXT,
+                rows INTEGER,
+                bytes INTEGER
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_snapshots_taken_on ON snapshots (taken_on)")
+
+    def _migrate_crawl_checkpoints(self, conn):
+        """Add the staging tables an interrupted crawl resumes from."""
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS crawl_checkpoints (
+                search TEXT PRIMARY KEY,
+                run_id INTEGER,
+                stage TEXT,
+                started_at TEXT,
+                updated_at TEXT
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS crawl_pages (
+                search TEXT,
+                page INTEGER,
+                listing_count INTEGER,
+                page_count INTEGER,
+                PRIMARY KEY (search, page)
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS crawl_listings (
+                search TEXT,
+                page INTEGER,
+                position INTEGER,
+                url TEXT,
+                Price TEXT,
+                Area TEXT,
+                Rooms TEXT,
+                floor TEXT,
+                PRIMARY KEY (search, page, position)
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS crawl_descriptions (
+                search TEXT,
+                url TEXT,
+                ad_text TEXT,
+                PRIMARY KEY (search, url)
+            )
+        """)
+
+    def _migrate_searches(self, conn):
+        """
+        Add saved searches and the listings each one matched.
+        A run now crawls every saved search, so staged descriptions are keyed by ad alone.
+        """
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS searches (
+                name TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                enabled INTEGER DEFAULT 1,
+                created_at TEXT
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS search_matches (
+                search TEXT,
+                url TEXT,
+                first_seen TEXT,
+                last_seen TEXT,
+                run_id INTEGER,
+                PRIMARY KEY (search, url)
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_search_matches_url ON search_matches (url)")
+
+        # Staging tables only hold an unfinished crawl, an interrupted run can't resume across this upgrade
+        conn.execute("DROP TABLE IF EXISTS crawl_descriptions")
+        conn.execute("CREATE TABLE crawl_descriptions (url TEXT PRIMARY KEY, ad_text TEXT)")
+
+    def record_listing_events(self, df, run_id=None):
+        """
+        Stage today's scrape and append added, removed, price_changed and field_changed events
+        by comparing it with the listings table in SQL. Must run before the run updates listings.
+        Returns the number of events per type.
+        """
+        columns = ["url"] + [column for column in TRACKED_COLUMNS + list(NUMERIC_COLUMNS.values())
+                             if column in df.columns]
+        quoted = ", ".join(f'"{column}"' for column in columns)
+        today = dt.date.today().isoformat()
+        counts = {}
+
+        with self.connections.transaction() as conn:
+            conn.execute("DELETE FROM scrape_staging")
+            rows = ([self._to_sql_value(value) for value in row]
+                    for row in df[columns].itertuples(index=False, name=None))
+            conn.executemany(f"INSERT OR REPLACE INTO scrape_staging ({quoted}) VALUES "
+                             f"({', '.join('?' * len(columns))})", rows)
+
+            for event, sql in self._listing_event_queries():
+                cursor = conn.execute(sql, (run_id, today))
+                counts[event] = counts.get(event, 0) + cursor.rowcount
+
+        print("Listing events: " + ", ".join(f"{count} {event}" for event, count in counts.items()))
+        return counts
+
+    @staticmethod
+    def _listing_event_queries():
+        """Yield (event, INSERT ... SELECT) pairs comparing scrape_staging s with listings l."""
+        insert = ("INSERT INTO listing_events (url, event, field, old_value, new_value, old_number, "
+                  "new_number, run_id, event_date) ")
+
+        # New listings and ones that came back after being removed
+        yield "added", (insert + "SELECT s.url, 'added', NULL, NULL, s.Price, NULL, s.price_value, ?, ? "
+                                 "FROM scrape_staging s LEFT JOIN listings l ON l.url = s.url "
+                                 "WHERE l.url IS NULL OR l.is_active = 0")
+
+        yield "removed", (insert + "SELECT l.url, 'removed', NULL, l.Price, NULL, l.price_value, NULL, ?, ? "
+                                   "FROM listings l WHERE l.is_active = 1 "
+                                   "AND NOT EXISTS (SELECT 1 FROM scrape_staging s WHERE s.url = l.url)")
+
+        for field in TRACKED_COLUMNS:
+            event = "price_changed" if field == "Price" else "field_changed"
+            column = f'"{field}"'
+            numeric = NUMERIC_COLUMNS.get(field)
+            numbers = f"l.{numeric}, s.{numeric}" if numeric else "NULL, NULL"
+            yield event, (insert + f"SELECT s.url, '{event}', '{field}', l.{column}, s.{column}, {numbers}, ?, ? "
+                                   f"FROM scrape_staging s JOIN listings l ON l.url = s.url "
+                                   f"WHERE l.is_active = 1 AND s.{column} IS NOT l.{column}")
+
+    def get_run_changes(self, run_id):
+        """
+        Return the urls added by a run and the stored rows of the listings it removed,
+        read from the listing history instead of comparing exports.
+        """
+        with self.connections.connection() as conn:
+            added = [row[0] for row in conn.execute(
+                "SELECT url FROM listing_events WHERE run_id = ? AND event = 'added'", (run_id,)
+            )]
+            removed = pd.read_sql_query(
+                "SELECT l.* FROM listings l JOIN listing_events e ON e.url = l.url "
+                "WHERE e.run_id = ? AND e.event = 'removed' ORDER BY e.id", conn, params=(run_id,)
+            )
+        return added, removed
+
+    def get_listing_timeline(self, url):
+        """Return the events of one listing, oldest first."""
+        with self.connections.connection() as conn:
+            return pd.read_sql_query(
+                "SELECT event, field, old_value, new_value, old_number, new_number, run_id, event_date "
+                "FROM listing_events WHERE url = ? ORDER BY id", conn, params=(url,)
+            )
+
+    def get_recent_price_drops(self, days=7, limit=100):
+        """Return the price drops of active listings in the last days, biggest relative drop first."""
+        since = (dt.date.today() - dt.timedelta(days=days)).isoformat()
+        with self.connections.connection() as conn:
+            return pd.read_sql_query(
+                """SELECT e.url, e.old_value AS old_price, e.new_value AS new_price,
+                          e.old_number - e.new_number AS drop_amount,
+                          ROUND(100.0 * (e.old_number - e.new_number) / e.old_number, 1) AS drop_percent,
+                          e.event_date, l.Area, l.Rooms, l.Floor, l."Max Floor"
+                   FROM listing_events e JOIN listings l ON l.url = e.url
+                   WHERE e.event = 'price_changed' AND e.event_date >= ? AND l.is_active = 1
+                     AND e.new_number < e.old_number AND e.old_number > 0
+                   ORDER BY drop_percent DESC, e.id DESC
+                   LIMIT ?""",
+                conn, params=(since, limit)
+            )
+
+    def start_run(self, search, trigger):
+        """Insert a run in the running state and return its id."""
+        with self.connections.transaction() as conn:
+            cursor = conn.execute(
+                "INSERT INTO runs (search, trigger, status, started_at) VALUES (?, ?, 'running', ?)",
+                (search, trigger, dt.datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+            )
+        return cursor.lastrowid
+
+    def finish_run(self, run_id, status, duration, stage_durations, listing_count=None, new_count=None,
+                   removed_count=None, error=None):
+        """Record the outcome, per-stage durations (seconds) and listing counts of a run."""
+        with self.connections.transaction() as conn:
+            conn.execute(
+                """UPDATE runs SET status = ?, finished_at = ?, duration = ?, stage_durations = ?,
+                       listing_count = ?, new_count = ?, removed_count = ?, error = ?
+                   WHERE id = ?""",
+                (status, dt.datetime.now().strftime("%Y-%m-%d %H:%M:%S"), round(duration, 3),
+                 json.dumps(stage_durations), listing_count, new_count, removed_count, error, run_id)
+            )
+
+    def record_skipped_run(self, search, trigger, reason):
+        """Record a scheduled run that was skipped, e.g. because the previous one overran."""
+        now = dt.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        with self.connections.transaction() as conn:
+            conn.execute(
+                """INSERT INTO runs (search, trigger, status, started_at, finished_at, duration, error)
+                   VALUES (?, ?, 'skipped', ?, ?, 0, ?)""",
+                (search, trigger, now, now, reason)
+            )
+
+    def get_runs(self, limit=50):
+        """Return the most recent runs, newest first, with stage durations decoded."""
+        with self.connections.connection() as conn:
+            df = pd.read_sql_query("SELECT * FROM runs ORDER BY id DESC LIMIT ?", conn, params=(limit,))
+        df["stage_durations"] = [json.loads(value) if isinstance(value, str) else {} for value in df["stage_durations"]]
+        return df
+
+    def clear_new_listings_table(self):
+        """Delete all records from the new_listings table."""
+        with self.connections.transaction() as conn:
+            conn.execute("DELETE FROM new_listings")
 
-        conn.commit()
-        conn.close()
         print("Cleared all records from new_listings table")
 
     def get_all_active_listings(self):
-        """Retrieve all active listings from the database."""
-        try:
-            conn = sqlite3.connect(self.db_path)
+        """
+        Retrieve all active listings from the database.
+        Errors propagate, an unreadable table must not look like an empty one to the diff.
+        """
+        with self.connections.connection() as conn:
             query = "SELECT * FROM listings WHERE is_active = 1"
-            df = pd.read_sql_query(query, conn)
-            conn.close()
-            return df
-        except Exception as e:
-            print(f"Error retrieving listings from database: {str(e)}")
-            return None
+            return pd.read_sql_query(query, conn)
 
     def save_new_listings(self, df_new):
         """
         Save new listings to the new_listings table.
+        Inserts on the shared transaction, DataFrame.to_sql would commit the caller's transaction.
         """
         if df_new.empty:
             print("No new listings to save.")
             return
 
-        try:
-            conn = sqlite3.connect(self.db_path)
-
-            # Add add_date column with current date if it doesn't exist
-            if "add_date" not in df_new.columns:
-                df_new["add_date"] = dt.date.today().isoformat()
+        # Add add_date column with current date if it doesn't exist
+        if "add_date" not in df_new.columns:
+            df_new["add_date"] = dt.date.today().isoformat()
 
-            # Add is_active column if it doesn't exist
-            if "is_active" not in df_new.columns:
-                df_new["is_active"] = 1
+        # Add is_active column if it doesn't exist
+        if "is_active" not in df_new.columns:
+            df_new["is_active"] = 1
 
-            # Save to database, replace if the URL already exists
-            df_new.to_sql("new_listings", conn, if_exists="append", index=False)
+        columns = list(df_new.columns)
+        quoted = ", ".join(f'"{column}"' for column in columns)
+        rows = ([self._to_sql_value(value) for value in row] for row in df_new.itertuples(index=False, name=None))
+        with self.connections.transaction() as conn:
+            conn.executemany(f"INSERT INTO new_listings ({quoted}) VALUES ({', '.join('?' * len(columns))})", rows)
 
-            conn.close()
-            print(f"Successfully saved {len(df_new)} new listings to new_listings table")
-        except Exception as e:
-            print(f"Error saving new listings to database: {str(e)}")
+        print(f"Successfully saved {len(df_new)} new listings to new_listings table")
 
     def copy_new_listings_to_main(self):
         """
         Copy all records from new_listings to the main listings table.
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        try:
+        with self.connections.transaction() as conn:
             # Insert records from new_listings into listings, ignoring duplicates by URL
-            cursor.execute('''
+            cursor = conn.execute('''
             INSERT OR IGNORE INTO listings 
-            (url, Price, Area, Rooms, Floor, "Max Floor", AdText, GoToLink, ReportDate, is_active, removed_date, add_date)
-            SELECT url, Price, Area, Rooms, Floor, "Max Floor", AdText, GoToLink, ReportDate, is_active, removed_date, add_date
+            (url, Price, Area, Rooms, Floor, "Max Floor", AdText, GoToLink, ReportDate, is_active, removed_date, add_date,
+             price_value, area_value, rooms_value, floor_value, max_floor_value)
+            SELECT url, Price, Area, Rooms, Floor, "Max Floor", AdText, GoToLink, ReportDate, is_active, removed_date, add_date,
+             price_value, area_value, rooms_value, floor_value, max_floor_value
             FROM new_listings
             ''')
-
             copied_count = cursor.rowcount
-            conn.commit()
-            print(f"Successfully copied {copied_count} new listings to main listings table")
 
-        except Exception as e:
-            print(f"Error copying new listings to main table: {str(e)}")
-        finally:
-            conn.close()
+        print(f"Successfully copied {copied_count} new listings to main listings table")
 
-    def save_listings(self, df):
-        """Save all listings to the database."""
+    @staticmethod
+    def _to_sql_value(value):
+        """Convert a pandas/numpy cell into a value sqlite3 can bind."""
+        if value is None:
+            return None
+        if hasattr(value, "isoformat"):
+            return value.isoformat()
+        if hasattr(value, "item"):
+            value = value.item()
         try:
-            conn = sqlite3.connect(self.db_path)
+            if pd.isna(value):
+                return None
+        except (TypeError, ValueError):
+            pass
+        return value
+
+    def save_listings(self, df):
+        """
+        Upsert the scraped listings into the listings table by url.
+        Only rows that are new, changed or reactivated are written, in batches inside one transaction.
+        add_date of existing rows is kept and an empty AdText never overwrites a stored one.
+        """
+        if df.empty:
+            print("No listings to save.")
+            return
+
+        with self.connections.transaction() as conn:
+            written = self._upsert_listings(conn, df)
+
+        print(f"Saved {len(df)} listings to database, {written} new or changed")
+
+    def _upsert_listings(self, conn, df):
+        """Run the batched upsert on an open transaction and return the number of rows written."""
+        cursor = conn.cursor()
 
-            # Add add_date column with current date if it doesn't exist
-            if "add_date" not in df.columns:
-                df["add_date"] = dt.date.today().isoformat()
+        # Keep columns added by later steps (e.g. AI analysis) by extending the table
+        table_columns = self._table_columns(cursor, "listings")
+        for column in df.columns:
+            if column not in table_columns:
+                cursor.execute(f'ALTER TABLE listings ADD COLUMN "{column}" TEXT')
+                table_columns.append(column)
 
-            # Add is_active column if it doesn't exist
-            if "is_active" not in df.columns:
-                df["is_active"] = 1
+        columns = [column for column in df.columns if column not in UPSERT_MANAGED_COLUMNS]
+        sql = self._build_upsert_sql(columns)
 
-            # Save to database, replace if the URL already exists
-            df.to_sql("listings", conn, if_exists="replace", index=False)
+        today = dt.date.today().isoformat()
+        rows = ([self._to_sql_value(value) for value in row] + [today]
+                for row in df[columns].itertuples(index=False, name=None))
 
-            conn.close()
-            print(f"Successfully saved {len(df)} listings to database")
-        except Exception as e:
-            print(f"Error saving listings to database: {str(e)}")
+        written = 0
+        while True:
+            batch = list(islice(rows, UPSERT_BATCH_SIZE))
+            if not batch:
+                break
+            cursor.executemany(sql, batch)
+            written += cursor.rowcount
+
+        return written
+
+    @staticmethod
+    def _build_upsert_sql(columns):
+        """Build the INSERT ... ON CONFLICT(url) statement for the given data columns."""
+        quoted = [f'"{column}"' for column in columns]
+        updates = []
+        changes = ["listings.is_active IS NOT 1"]
+
+        for column, name in zip(quoted, columns):
+            if name == "url":
+                continue
+            if name == "AdText":
+                updates.append(f"{column} = COALESCE(NULLIF(excluded.{column}, ''), listings.{column})")
+                changes.append(f"(NULLIF(excluded.{column}, '') IS NOT NULL "
+                               f"AND excluded.{column} IS NOT listings.{column})")
+                continue
+            updates.append(f"{column} = excluded.{column}")
+            if name not in UPSERT_UNTRACKED_COLUMNS:
+                changes.append(f"excluded.{column} IS NOT listings.{column}")
+
+        updates += ["is_active = 1", "removed_date = NULL"]
+
+        return (f"INSERT INTO listings ({', '.join(quoted)}, add_date, is_active) "
+                f"VALUES ({', '.join('?' * len(columns))}, ?, 1) "
+                f"ON CONFLICT(url) DO UPDATE SET {', '.join(updates)} "
+                f"WHERE {' OR '.join(changes)}")
 
     def mark_listings_as_removed(self, url_list):
-        """Mark listings as inactive and set removed date."""
+        """Mark listings as inactive and set removed date with a single UPDATE."""
         if not url_list:
             return
 
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        today = dt.date.today().isoformat()
+        with self.connections.transaction() as conn:
+            # Temp tables live as long as the pooled connection, so clear it before reuse
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS removed_urls (url TEXT PRIMARY KEY)")
+            conn.execute("DELETE FROM removed_urls")
+            conn.executemany("INSERT OR IGNORE INTO removed_urls (url) VALUES (?)",
+                             ((url,) for url in url_list))
+            cursor = conn.execute(
+                "UPDATE listings SET is_active = 0, removed_date = ? "
+                "WHERE is_active = 1 AND url IN (SELECT url FROM removed_urls)",
+                (today,)
+            )
+            removed_count = cursor.rowcount
 
-        try:
-            today = dt.date.today().isoformat()
-            for url in url_list:
-                cursor.execute(
-                    "UPDATE listings SET is_active = 0, removed_date = ? WHERE url = ?",
-                    (today, url)
-                )
-
-            conn.commit()
-            print(f"Marked {len(url_list)} listings as removed")
-        except Exception as e:
-            print(f"Error marking listings as removed: {str(e)}")
-        finally:
-            conn.close()
\ No newline at end of file
+        print(f"Marked {removed_count} listings as removed")
@@ -0,0 +1,96 @@
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+
+class ConnectionManager:
+    """
+    Pool of tuned SQLite connections shared by DatabaseManager and the web app.
+    Connections run in WAL mode so the scraper's writes don't block dashboard reads.
+    """
+
+    def __init__(self, db_path, pool_size=8, busy_timeout=10.0, cache_size_kib=20000,
+                 mmap_size=256 * 1024 * 1024):
+        """Initialize with the database path, pool size and pragma settings."""
+        self.db_path = db_path
+        self.pool_size = pool_size
+        self.busy_timeout = busy_timeout
+        self.cache_size_kib = cache_size_kib
+        self.mmap_size = mmap_size
+        self._idle = queue.LifoQueue()
+        self._local = threading.local()
+
+    def _connect(self):
+        """Open a new connection and apply the pragmas."""
+        # timeout installs SQLite's busy handler, so a locked database is retried instead of failing
+        conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute(f"PRAGMA cache_size = -{int(self.cache_size_kib)}")
+        conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout * 1000)}")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """
+        Lend a pooled connection to the current thread for the duration of the block.
+        Nested calls on the same thread get the same connection.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            self._local.depth += 1
+            try:
+                yield conn
+            finally:
+                self._local.depth -= 1
+            return
+
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+
+        self._local.conn = conn
+        self._local.depth = 0
+        try:
+            yield conn
+        finally:
+            self._local.conn = None
+            if conn.in_transaction:
+                conn.rollback()
+            if self._idle.qsize() < self.pool_size:
+                self._idle.put(conn)
+            else:
+                conn.close()
+
+    @contextmanager
+    def transaction(self):
+        """
+        Run the block in a write transaction that commits on success and rolls back on error.
+        BEGIN IMMEDIATE takes the write lock up front, so concurrent writers wait on the
+        busy timeout instead of failing halfway through.
+        """
+        with self.connection() as conn:
+            if conn.in_transaction:
+                yield conn
+                return
+
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+            else:
+                conn.commit()
+
+    def close(self):
+        """Close all idle connections."""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
@@ -0,0 +1,44 @@
+import threading
+
+
+class FacetCache:
+    """
+    In-memory cache of the dashboard filter options.
+    Rebuilt only when the database's data version changes, so a page load costs a version lookup.
+    """
+
+    def __init__(self, database_manager, columns):
+        """Initialize with the database manager and the columns worth filtering on."""
+        self.database_manager = database_manager
+        self.columns = columns
+        self._version = None
+        self._facets = ([], {})
+        self._lock = threading.Lock()
+
+    def get(self):
+        """Return (columns, {column: sorted distinct values}) for the active listings."""
+        version = self.database_manager.get_data_version()
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    self._facets = self._compute()
+                    self._version = version
+        return self._facets
+
+    def _compute(self):
+        """Query the distinct values of each facet column."""
+        filters = {}
+        with self.database_manager.connections.connection() as conn:
+            table_columns = {row[1] for row in conn.execute("PRAGMA table_info(listings)")}
+            columns = [column for column in self.columns if column in table_columns]
+
+            for column in columns:
+                quoted = f'"{column}"'
+                rows = conn.execute(f"SELECT DISTINCT {quoted} FROM listings "
+                                    f"WHERE is_active = 1 AND {quoted} IS NOT NULL ORDER BY {quoted}")
+                values = [row[0] for row in rows]
+                if values:
+                    filters[column] = values
+
+        print(f"Rebuilt filter facets for {len(columns)} columns")
+        return columns, filters
@@ -1,5 +1,12 @@
 import os
+import time
 import pandas as pd
+from openpyxl import Workbook
+
+# Sheets of an export, written as separate files for CSV and Parquet
+EXPORT_SHEETS = ["src", "new_listings", "removed_listings"]
+EXPORT_EXTENSIONS = {"xlsx": ".xlsx", "csv": ".csv", "parquet": ".parquet"}
+EXPORT_CHUNK_ROWS = 10000
 
 
 class FileManager:
@@ -35,57 +42,119 @@ pause
 
         print(f"\nCreated the .bat file at {self.config.BAT_FILE_PATH}")
 
-    def handle_excel_files(self):
+    def export_paths(self, base_path):
         """
-        Handle the daily Excel file management:
-        1. Delete existing YTD file if it exists
-        2. Rename TDY file to YTD if it exists
-        Returns True if YTD file exists after operations
+        Return {sheet name: file path} of an export in the configured format.
+        An xlsx export is one workbook, CSV and Parquet exports get one file per sheet.
         """
-        # Handle Existing apts_ytd.xlsx
-        if os.path.exists(self.config.YTD_PATH):
-            os.remove(self.config.YTD_PATH)
-            print("\nExisting apts_ytd.xlsx deleted.")
-        else:
-            print("\napts_ytd.xlsx does not exist. Skipping deletion.")
+        if self.config.EXPORT_FORMAT == "xlsx":
+            return {sheet: base_path for sheet in EXPORT_SHEETS}
 
-        # Rename apts_tdy.xlsx to apts_ytd.xlsx if it exists
-        if os.path.exists(self.config.TDY_PATH):
-            os.rename(self.config.TDY_PATH, self.config.YTD_PATH)
-            print("apts_tdy.xlsx renamed to apts_ytd.xlsx.\n")
-            return True
-        else:
-            print("apts_tdy.xlsx does not exist. Skipping rename.\n")
-            return False
+        stem = os.path.splitext(base_path)[0]
+        extension = EXPORT_EXTENSIONS[self.config.EXPORT_FORMAT]
+        return {sheet: f"{stem}{'' if sheet == 'src' else '_' + sheet}{extension}" for sheet in EXPORT_SHEETS}
 
-    def load_ytd_data(self):
+    def handle_excel_files(self):
         """
-        Load data from the YTD file if it exists.
-        Returns DataFrame if file exists, None otherwise.
+        Handle the daily export file management:
+        1. Delete the existing YTD export if it exists
+        2. Rename the TDY export to YTD if it exists
+        Returns True if a YTD export exists after operations
         """
-        if os.path.exists(self.config.YTD_PATH):
-            return pd.read_excel(self.config.YTD_PATH, sheet_name="src")
-        return None
-
-    def load_tdy_data(self):
+        tdy_paths = self.export_paths(self.config.TDY_PATH)
+        ytd_paths = self.export_paths(self.config.YTD_PATH)
+        pairs = sorted({(tdy_paths[sheet], ytd_paths[sheet]) for sheet in EXPORT_SHEETS})
+
+        # Handle the existing ytd export
+        existing = [ytd_path for _, ytd_path in pairs if os.path.exists(ytd_path)]
+        for path in existing:
+            os.remove(path)
+        if existing:
+            print(f"\nExisting {', '.join(os.path.basename(path) for path in existing)} deleted.")
+        else:
+            print("\nNo ytd export exists. Skipping deletion.")
+
+        # Rename the tdy export to ytd if it exists
+        renamed = False
+        for tdy_path, ytd_path in pairs:
+            if os.path.exists(tdy_path):
+                os.rename(tdy_path, ytd_path)
+                print(f"{os.path.basename(tdy_path)} renamed to {os.path.basename(ytd_path)}.")
+                renamed = True
+
+        if not renamed:
+            print("No tdy export exists. Skipping rename.\n")
+        return renamed
+
+    def export_listings(self, df_today, new_ads, removed_ads):
+        """Export all, new and removed listings in the configured format (xlsx, csv or parquet)."""
+        sheets = dict(zip(EXPORT_SHEETS, (df_today, new_ads, removed_ads)))
+        paths = self.export_paths(self.config.TDY_PATH)
+        start = time.perf_counter()
+
+        if self.config.EXPORT_FORMAT == "xlsx":
+            self._write_xlsx(paths["src"], sheets)
+        elif self.config.EXPORT_FORMAT == "csv":
+            for sheet, df in sheets.items():
+                self._write_csv(paths[sheet], df)
+        elif self.config.EXPORT_FORMAT == "parquet":
+            for sheet, df in sheets.items():
+                self._write_parquet(paths[sheet], df)
+        else:
+            raise ValueError(f"Unknown export format: {self.config.EXPORT_FORMAT}")
+
+        names = ", ".join(sorted({os.path.basename(path) for path in paths.values()}))
+        print(f"Data saved to {names} in {time.perf_counter() - start:.1f}s.")
+
+    @staticmethod
+    def _replace_atomic(path, write):
+        """Write to a temporary file next to path and move it in place once complete."""
+        tmp_path = path + ".tmp"
+        try:
+            write(tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    @staticmethod
+    def _cell_value(value):
+        """Convert a DataFrame value to something openpyxl can write."""
+        if value is None or (not isinstance(value, str) and pd.api.types.is_scalar(value) and pd.isna(value)):
+            return None
+        if hasattr(value, "item"):
+            return value.item()
+        return value
+
+    def _write_xlsx(self, path, sheets):
         """
-        Load data from the TDY file if it exists.
-        Returns DataFrame if file exists, None otherwise.
+        Write a workbook with openpyxl's write-only mode, which streams rows to disk
+        instead of building every cell in memory.
         """
-        if os.path.exists(self.config.TDY_PATH):
-            df = pd.read_excel(self.config.TDY_PATH)
-            df = df.dropna(axis=1, how="all")
-            return df
-        return None
-
-    def save_data_to_excel(self, df_today, new_ads, removed_ads):
-        """Save all data to Excel file with multiple sheets."""
-        with pd.ExcelWriter(self.config.TDY_PATH, engine="openpyxl") as writer:
-            # Write full data in "src" sheet
-            df_today.to_excel(writer, sheet_name="src", index=False)
-
-            # Write new and removed listings to new sheets
-            new_ads.to_excel(writer, sheet_name="new_listings", index=False)
-            removed_ads.to_excel(writer, sheet_name="removed_listings", index=False)
-
-        print("Data saved to apts_tdy.xlsx.")
\ No newline at end of file
+        def write(tmp_path):
+            workbook = Workbook(write_only=True)
+            for sheet, df in sheets.items():
+                worksheet = workbook.create_sheet(sheet)
+                worksheet.append([str(column) for column in df.columns])
+                for row in df.itertuples(index=False, name=None):
+                    worksheet.append([self._cell_value(value) for value in row])
+            workbook.save(tmp_path)
+
+        self._replace_atomic(path, write)
+
+    def _write_csv(self, path, df):
+        self._replace_atomic(path, lambda tmp_path: df.to_csv(tmp_path, index=False, chunksize=EXPORT_CHUNK_ROWS))
+
+    def _write_parquet(self, path, df):
+        """Write a Parquet file one row group at a time."""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        def write(tmp_path):
+            schema = pa.Schema.from_pandas(df, preserve_index=False)
+            with pq.ParquetWriter(tmp_path, schema, compression="zstd") as writer:
+                for start in range(0, max(len(df), 1), EXPORT_CHUNK_ROWS):
+                    chunk = df.iloc[start:start + EXPORT_CHUNK_ROWS]
+                    writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+        self._replace_atomic(path, write)
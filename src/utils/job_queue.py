@@ -0,0 +1,133 @@
+import datetime as dt
+import json
+import time
+
+
+class JobQueue:
+    """
+    Queue of requested scraper runs in the jobs table, shared by every process using the database.
+    Claiming a job happens inside a BEGIN IMMEDIATE transaction and only succeeds while no other job
+    is running, so the jobs table doubles as a cross-process run lock.
+    """
+
+    def __init__(self, database_manager, stale_seconds=120):
+        """Initialize with the database manager and the heartbeat age after which a running job is lost."""
+        self.connections = database_manager.connections
+        self.stale_seconds = stale_seconds
+
+    @staticmethod
+    def _now():
+        return dt.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    def _fail_stale_jobs(self, conn):
+        """Fail running jobs whose worker stopped sending heartbeats."""
+        conn.execute(
+            "UPDATE jobs SET status = 'failed', finished_at = ?, error = 'worker stopped responding' "
+            "WHERE status = 'running' AND heartbeat_at < ?",
+            (self._now(), time.time() - self.stale_seconds)
+        )
+
+    def enqueue(self, search, trigger):
+        """
+        Request a run, search labels the job. Every run crawls all enabled saved searches, so a request
+        made while any job is queued or running is coalesced into that job, whatever its search.
+        Returns (job id, True if a new job was queued).
+        """
+        with self.connections.transaction() as conn:
+            self._fail_stale_jobs(conn)
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE status IN ('queued', 'running') ORDER BY id LIMIT 1"
+            ).fetchone()
+
+            if row is not None:
+                conn.execute("UPDATE jobs SET requests = requests + 1 WHERE id = ?", (row[0],))
+                return row[0], False
+
+            cursor = conn.execute(
+                "INSERT INTO jobs (search, trigger, status, requested_at) VALUES (?, ?, 'queued', ?)",
+                (search, trigger, self._now())
+            )
+            return cursor.lastrowid, True
+
+    def claim(self, worker):
+        """
+        Take the oldest queued job for this worker.
+        Returns the job as a dictionary, or None if nothing is queued or another job is running.
+        """
+        with self.connections.transaction() as conn:
+            self._fail_stale_jobs(conn)
+            if conn.execute("SELECT 1 FROM jobs WHERE status = 'running'").fetchone():
+                return None
+
+            row = conn.execute(
+                "SELECT id, search, trigger FROM jobs WHERE status = 'queued' ORDER BY id LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+
+            conn.execute(
+                "UPDATE jobs SET status = 'running', worker = ?, started_at = ?, heartbeat_at = ? WHERE id = ?",
+                (worker, self._now(), time.time(), row[0])
+            )
+        return {"id": row[0], "search": row[1], "trigger": row[2]}
+
+    def heartbeat(self, job_id, worker, progress=None):
+        """
+        Mark a job the worker is running as alive and store its latest progress.
+        Returns False when the job is no longer running on this worker, e.g. failed as stale.
+        """
+        with self.connections.transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET heartbeat_at = ?, progress = ? WHERE id = ? AND status = 'running' AND worker = ?",
+                (time.time(), json.dumps(progress) if progress is not None else None, job_id, worker)
+            )
+        return cursor.rowcount > 0
+
+    def holds(self, job_id, worker):
+        """Return whether the job is still running on the worker, inside a transaction it's read under its lock."""
+        with self.connections.connection() as conn:
+            row = conn.execute(
+                "SELECT 1 FROM jobs WHERE id = ? AND status = 'running' AND worker = ?", (job_id, worker)
+            ).fetchone()
+        return row is not None
+
+    def finish(self, job_id, worker, status, error=None):
+        """
+        Mark a job the worker is running as done or failed.
+        Returns False when the job is no longer running on this worker, its recorded outcome is kept.
+        """
+        with self.connections.transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, error = ? "
+                "WHERE id = ? AND status = 'running' AND worker = ?",
+                (status, self._now(), error, job_id, worker)
+            )
+        return cursor.rowcount > 0
+
+    def status(self):
+        """
+        Return the scraper status as every process sees it: whether a job is running,
+        its worker and progress, the number of queued jobs and when the last run finished.
+        """
+        with self.connections.connection() as conn:
+            running = conn.execute(
+                "SELECT id, search, worker, started_at, heartbeat_at, progress FROM jobs "
+                "WHERE status = 'running' AND heartbeat_at >= ? ORDER BY id LIMIT 1",
+                (time.time() - self.stale_seconds,)
+            ).fetchone()
+            queued = conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+            last_run = conn.execute(
+                "SELECT MAX(finished_at) FROM jobs WHERE status = 'done'"
+            ).fetchone()[0]
+
+        status = {"is_running": running is not None, "queued": queued, "last_run": last_run}
+        if running is not None:
+            status.update({
+                "job_id": running[0],
+                "search": running[1],
+                "worker": running[2],
+                "started_at": running[3],
+                "heartbeat_at": running[4],
+                "progress": json.loads(running[5]) if running[5] else {},
+            })
+        return status
@@ -0,0 +1,90 @@
+import json
+import threading
+import time
+from collections import deque
+
+
+class ProgressBroker:
+    """
+    Fans out scrape progress events to Server-Sent Events clients.
+    Events go into one shared ring buffer and every client only keeps the id of the last
+    event it has sent, so the cost per client doesn't grow with the number of events.
+    """
+
+    def __init__(self, history=200, heartbeat=15.0):
+        """Initialize with the ring buffer size and the keep-alive interval in seconds."""
+        self.heartbeat = heartbeat
+        self._events = deque(maxlen=history)
+        self._last_id = 0
+        self._condition = threading.Condition()
+        self.state = {"is_running": False, "last_run": None}
+
+    def publish(self, event, **data):
+        """Record an event, fold it into the current state and wake up the waiting clients."""
+        with self._condition:
+            self._last_id += 1
+            self._events.append((self._last_id, event, data))
+            self._apply(event, data)
+            self._condition.notify_all()
+
+    def _apply(self, event, data):
+        """Keep a snapshot of the run state for clients that connect mid-run."""
+        if event == "status":
+            # Full snapshot, e.g. mirrored from a run in another process
+            self.state = dict(data)
+            return
+
+        if event == "run_started":
+            self.state = {"is_running": True, "last_run": self.state.get("last_run")}
+        elif event == "run_finished":
+            self.state = {"is_running": False, "last_run": data.get("finished_at"), **data}
+        else:
+            self.state.update(data)
+        self.state["stage"] = event
+
+    def _events_after(self, last_id):
+        """Return buffered events newer than last_id, or None if some were already dropped."""
+        if self._events and last_id < self._events[0][0] - 1:
+            return None
+        return [event for event in self._events if event[0] > last_id]
+
+    @staticmethod
+    def _format(event_id, event, data):
+        return f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data)}\n\n"
+
+    def stream(self, last_event_id=None):
+        """
+        Generate the SSE stream for one client.
+        New clients and clients that fell behind the buffer start with a status snapshot.
+        """
+        with self._condition:
+            last_id = self._last_id
+            resume = None
+            if last_event_id is not None and last_event_id.isdigit():
+                resume = self._events_after(int(last_event_id))
+            snapshot = dict(self.state)
+
+        if resume is None:
+            yield self._format(last_id, "status", snapshot)
+        else:
+            for event_id, event, data in resume:
+                yield self._format(event_id, event, data)
+                last_id = event_id
+
+        while True:
+            deadline = time.monotonic() + self.heartbeat
+            with self._condition:
+                self._condition.wait_for(lambda: self._last_id > last_id,
+                                         timeout=max(deadline - time.monotonic(), 0))
+                events = self._events_after(last_id)
+                if events is None:
+                    events = [(self._last_id, "status", dict(self.state))]
+
+            if not events:
+                # Comment line keeps proxies from closing an idle connection
+                yield ": keep-alive\n\n"
+                continue
+
+            for event_id, event, data in events:
+                yield self._format(event_id, event, data)
+                last_id = event_id
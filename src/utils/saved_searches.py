@@ -0,0 +1,65 @@
+import datetime as dt
+import pandas as pd
+
+
+class SavedSearches:
+    """
+    Saved searches in the searches table and the active listings each one matched in search_matches.
+    Every run crawls all enabled searches together, so an ad found by several searches is only
+    described once and tagged with each of them.
+    """
+
+    def __init__(self, database_manager):
+        """Initialize with the database manager."""
+        self.connections = database_manager.connections
+
+    def seed(self, searches):
+        """Add or update the {name: url} searches defined in the configuration."""
+        now = dt.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        with self.connections.transaction() as conn:
+            conn.executemany(
+                "INSERT INTO searches (name, url, enabled, created_at) VALUES (?, ?, 1, ?) "
+                "ON CONFLICT (name) DO UPDATE SET url = excluded.url",
+                ((name, url, now) for name, url in searches.items())
+            )
+
+    def save(self, name, url, enabled=True):
+        """Add a search or change its URL and enabled flag."""
+        now = dt.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        with self.connections.transaction() as conn:
+            conn.execute(
+                "INSERT INTO searches (name, url, enabled, created_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (name) DO UPDATE SET url = excluded.url, enabled = excluded.enabled",
+                (name, url, int(enabled), now)
+            )
+
+    def enabled(self):
+        """Return {name: url} of the searches to crawl, in name order."""
+        with self.connections.connection() as conn:
+            return dict(conn.execute("SELECT name, url FROM searches WHERE enabled = 1 ORDER BY name").fetchall())
+
+    def list(self):
+        """Return every search with the number of active listings it currently matches."""
+        with self.connections.connection() as conn:
+            return pd.read_sql_query(
+                "SELECT s.name, s.url, s.enabled, s.created_at, COUNT(l.url) AS active_matches "
+                "FROM searches s "
+                "LEFT JOIN search_matches m ON m.search = s.name "
+                "LEFT JOIN listings l ON l.url = m.url AND l.is_active = 1 "
+                "GROUP BY s.name ORDER BY s.name", conn
+            )
+
+    def record_matches(self, matches, run_id):
+        """
+        Replace the matches of the crawled searches with this run's results.
+        matches maps each search name to the URLs it returned, first_seen survives across runs.
+        """
+        today = dt.date.today().isoformat()
+        with self.connections.transaction() as conn:
+            for name, urls in matches.items():
+                conn.executemany(
+                    "INSERT INTO search_matches (search, url, first_seen, last_seen, run_id) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT (search, url) DO UPDATE SET last_seen = excluded.last_seen, run_id = excluded.run_id",
+                    ((name, url, today, today, run_id) for url in urls)
+                )
+                conn.execute("DELETE FROM search_matches WHERE search = ? AND run_id IS NOT ?", (name, run_id))
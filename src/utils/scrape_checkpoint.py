@@ -0,0 +1,105 @@
+import datetime as dt
+import pandas as pd
+from services.parsers import AD_FIELDS
+
+
+class ScrapeCheckpoint:
+    """
+    Persists a run's crawl as it happens: every results page of every saved search and every scraped
+    description is written to the crawl_* staging tables as soon as it arrives. A run that was
+    interrupted before committing leaves its checkpoint behind, and the next run resumes from it.
+    """
+
+    def __init__(self, database_manager, max_age_hours):
+        """Initialize with the database manager and the age after which a checkpoint is too stale to resume."""
+        self.connections = database_manager.connections
+        self.max_age = dt.timedelta(hours=max_age_hours)
+
+    def open(self, searches, run_id):
+        """
+        Start checkpointing a run crawling the given saved search names.
+        Resumes the unfinished checkpoint when it's recent enough, dropping the pages of searches
+        that aren't crawled anymore, otherwise starts a new one.
+        Returns the number of (pages, descriptions) already fetched, (0, 0) for a fresh start.
+        """
+        now = dt.datetime.now()
+        timestamp = now.strftime("%Y-%m-%d %H:%M:%S")
+
+        with self.connections.connection() as conn:
+            row = conn.execute("SELECT MAX(run_id), MAX(updated_at) FROM crawl_checkpoints").fetchone()
+
+        resume = row[1] is not None and now - dt.datetime.strptime(row[1], "%Y-%m-%d %H:%M:%S") <= self.max_age
+        if row[1] is not None and not resume:
+            print(f"Discarding the stale checkpoint of run {row[0]} from {row[1]}")
+        if not resume:
+            self.clear()
+
+        placeholders = ", ".join("?" * len(searches))
+        with self.connections.transaction() as conn:
+            for table in ("crawl_listings", "crawl_pages", "crawl_checkpoints"):
+                conn.execute(f"DELETE FROM {table} WHERE search NOT IN ({placeholders})", list(searches))
+            conn.executemany(
+                "INSERT INTO crawl_checkpoints (search, run_id, stage, started_at, updated_at) "
+                "VALUES (?, ?, 'pages', ?, ?) ON CONFLICT (search) DO UPDATE SET run_id = excluded.run_id",
+                ((search, run_id, timestamp, timestamp) for search in searches)
+            )
+            pages = conn.execute("SELECT COUNT(*) FROM crawl_pages").fetchone()[0]
+            descriptions = conn.execute("SELECT COUNT(*) FROM crawl_descriptions").fetchone()[0]
+
+        if resume:
+            print(f"Resuming the crawl of run {row[0]}: {pages} pages and {descriptions} descriptions already fetched")
+        return pages, descriptions
+
+    def set_stage(self, stage, search=None):
+        """Record the stage one search, or the whole run, has reached."""
+        now = dt.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        with self.connections.transaction() as conn:
+            if search is None:
+                conn.execute("UPDATE crawl_checkpoints SET stage = ?, updated_at = ?", (stage, now))
+            else:
+                conn.execute("UPDATE crawl_checkpoints SET stage = ?, updated_at = ? WHERE search = ?",
+                             (stage, now, search))
+
+    def pages(self, search):
+        """Return {page: (listing count, page count)} for the pages of a search already fetched."""
+        with self.connections.connection() as conn:
+            rows = conn.execute("SELECT page, listing_count, page_count FROM crawl_pages WHERE search = ?",
+                                (search,)).fetchall()
+        return {page: (listing_count, page_count) for page, listing_count, page_count in rows}
+
+    def save_page(self, search, page, listing_count, page_count, ads):
+        """Store a fetched results page of a search and its ads in one transaction."""
+        now = dt.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        with self.connections.transaction() as conn:
+            conn.execute("DELETE FROM crawl_listings WHERE search = ? AND page = ?", (search, page))
+            conn.executemany(
+                f"INSERT INTO crawl_listings (search, page, position, {', '.join(AD_FIELDS)}) "
+                f"VALUES (?, ?, ?, {', '.join('?' * len(AD_FIELDS))})",
+                ((search, page, position, *(ad[field] for field in AD_FIELDS)) for position, ad in enumerate(ads))
+            )
+            conn.execute("INSERT OR REPLACE INTO crawl_pages (search, page, listing_count, page_count) "
+                         "VALUES (?, ?, ?, ?)", (search, page, listing_count, page_count))
+            conn.execute("UPDATE crawl_checkpoints SET updated_at = ? WHERE search = ?", (now, search))
+
+    def listings(self):
+        """Return the staged ads with the search that found them, in search and page order."""
+        with self.connections.connection() as conn:
+            return pd.read_sql_query(
+                f"SELECT search, {', '.join(AD_FIELDS)} FROM crawl_listings ORDER BY search, page, position", conn
+            )
+
+    def descriptions(self):
+        """Return {url: description} for the descriptions already scraped."""
+        with self.connections.connection() as conn:
+            return dict(conn.execute("SELECT url, ad_text FROM crawl_descriptions").fetchall())
+
+    def save_description(self, url, ad_text):
+        """Store a scraped description."""
+        with self.connections.transaction() as conn:
+            conn.execute("INSERT OR REPLACE INTO crawl_descriptions (url, ad_text) VALUES (?, ?)", (url, ad_text))
+
+    def clear(self):
+        """Drop the checkpoint and all staged data, called once the run is committed."""
+        with self.connections.transaction() as conn:
+            for table in ("crawl_listings", "crawl_pages", "crawl_descriptions", "crawl_checkpoints"):
+                conn.execute(f"DELETE FROM {table}")
@@ -0,0 +1,173 @@
+import datetime as dt
+import os
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from core.data_processor import NUMERIC_COLUMNS
+from core.diff_engine import TRACKED_COLUMNS, DiffEngine
+
+# Fixed snapshot schema, so any two snapshots can be compared column by column
+SNAPSHOT_TEXT_COLUMNS = ["url"] + TRACKED_COLUMNS + ["add_date", "AdText", "AISays"]
+SNAPSHOT_NUMERIC_COLUMNS = list(NUMERIC_COLUMNS.values())
+SNAPSHOT_SCHEMA = pa.schema([(column, pa.string()) for column in SNAPSHOT_TEXT_COLUMNS] +
+                            [(column, pa.float64()) for column in SNAPSHOT_NUMERIC_COLUMNS])
+SNAPSHOT_ROW_GROUP = 50000
+
+
+class SnapshotStore:
+    """
+    One zstd-compressed Parquet snapshot of the active listings per run, cataloged in the snapshots table.
+    Reads are memory-mapped and decode only the requested columns, so a diff or trend never loads
+    whole snapshots.
+    """
+
+    def __init__(self, database_manager, snapshot_dir, daily_days, weekly_days):
+        """
+        Initialize with the database manager holding the catalog, the snapshot directory and the
+        retention policy: every day is kept for daily_days, then one snapshot per week until
+        weekly_days, then one per month.
+        """
+        self.connections = database_manager.connections
+        self.snapshot_dir = snapshot_dir
+        self.daily_days = daily_days
+        self.weekly_days = weekly_days
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+
+    @staticmethod
+    def _to_table(df):
+        """Convert listings to an Arrow table with the snapshot schema, missing columns become nulls."""
+        arrays = []
+        for field in SNAPSHOT_SCHEMA:
+            if field.name not in df.columns:
+                arrays.append(pa.nulls(len(df), field.type))
+            elif field.type == pa.string():
+                arrays.append(pa.array(df[field.name].astype("string"), type=pa.string(), from_pandas=True))
+            else:
+                values = pd.to_numeric(df[field.name], errors="coerce").astype("float64")
+                arrays.append(pa.array(values, type=pa.float64(), from_pandas=True))
+        return pa.Table.from_arrays(arrays, schema=SNAPSHOT_SCHEMA)
+
+    def write(self, df, run_id=None):
+        """Write a snapshot of the listings and add it to the catalog. Returns the file path."""
+        taken_at = dt.datetime.now()
+        path = os.path.join(self.snapshot_dir, f"listings_{taken_at:%Y-%m-%d_%H%M%S}_{run_id or 0}.parquet")
+
+        tmp_path = path + ".tmp"
+        pq.write_table(self._to_table(df), tmp_path, compression="zstd", row_group_size=SNAPSHOT_ROW_GROUP)
+        os.replace(tmp_path, path)
+
+        with self.connections.transaction() as conn:
+            conn.execute(
+                "INSERT INTO snapshots (run_id, taken_on, taken_at, path, rows, bytes) VALUES (?, ?, ?, ?, ?, ?)",
+                (run_id, taken_at.date().isoformat(), taken_at.strftime("%Y-%m-%d %H:%M:%S"), path, len(df),
+                 os.path.getsize(path))
+            )
+
+        print(f"Saved snapshot of {len(df)} listings to {os.path.basename(path)}")
+        return path
+
+    def catalog(self):
+        """Return the catalog, oldest snapshot first."""
+        with self.connections.connection() as conn:
+            return pd.read_sql_query("SELECT * FROM snapshots ORDER BY taken_at, id", conn)
+
+    def snapshot_on(self, date):
+        """Return the path of the last snapshot taken on or before a date (YYYY-MM-DD)."""
+        with self.connections.connection() as conn:
+            row = conn.execute(
+                "SELECT path FROM snapshots WHERE taken_on <= ? ORDER BY taken_at DESC, id DESC LIMIT 1", (date,)
+            ).fetchone()
+        if row is None:
+            raise ValueError(f"No snapshot on or before {date}")
+        return row[0]
+
+    @staticmethod
+    def read(path, columns):
+        """Read only the given columns of a snapshot through a memory map."""
+        return pq.read_table(path, columns=columns, memory_map=True)
+
+    def diff(self, from_date, to_date):
+        """
+        Compare the snapshots of two dates.
+        Returns a dictionary with the added, removed and changed listings as DataFrames,
+        changed listings carry their old Price as old_Price.
+        """
+        columns = ["url"] + TRACKED_COLUMNS + ["price_value"]
+        old = self.read(self.snapshot_on(from_date), columns).to_pandas()
+        new = self.read(self.snapshot_on(to_date), columns).to_pandas()
+
+        in_old = DiffEngine.contains(old["url"], new["url"])
+        existing = new[in_old]
+        changed = existing[DiffEngine.changed_mask(existing, old)]
+        changed = changed.merge(old[["url", "Price"]].drop_duplicates("url").rename(columns={"Price": "old_Price"}),
+                                on="url", how="left")
+
+        return {
+            "added": new[~in_old],
+            "removed": old[~DiffEngine.contains(new["url"], old["url"])],
+            "changed": changed,
+        }
+
+    def trend(self, days=90, column="price_value"):
+        """
+        Daily statistics of a numeric column over the last days, one snapshot per day.
+        Only that column of each snapshot is read.
+        """
+        since = (dt.date.today() - dt.timedelta(days=days)).isoformat()
+        with self.connections.connection() as conn:
+            snapshots = conn.execute(
+                "SELECT taken_on, path FROM snapshots s WHERE taken_on >= ? AND id = "
+                "(SELECT id FROM snapshots WHERE taken_on = s.taken_on ORDER BY taken_at DESC, id DESC LIMIT 1) "
+                "ORDER BY taken_on", (since,)
+            ).fetchall()
+
+        rows = []
+        for taken_on, path in snapshots:
+            values = self.read(path, [column]).column(0)
+            rows.append({
+                "date": taken_on,
+                "listings": len(values),
+                "count": pc.count(values).as_py(),
+                "mean": pc.mean(values).as_py(),
+                "median": pc.quantile(values, q=0.5)[0].as_py() if pc.count(values).as_py() else None,
+                "min": pc.min(values).as_py(),
+                "max": pc.max(values).as_py(),
+            })
+        return pd.DataFrame(rows, columns=["date", "listings", "count", "mean", "median", "min", "max"])
+
+    def _retention_key(self, taken_on, today):
+        """Group a snapshot by day, ISO week or month depending on its age."""
+        age = (today - taken_on).days
+        if age <= self.daily_days:
+            return taken_on.isoformat()
+        if age <= self.weekly_days:
+            year, week, _ = taken_on.isocalendar()
+            return f"{year}-W{week:02d}"
+        return f"{taken_on:%Y-%m}"
+
+    def compact(self):
+        """Keep the last snapshot of every retention period and delete the rest."""
+        catalog = self.catalog()
+        if catalog.empty:
+            return
+
+        today = dt.date.today()
+        keys = [self._retention_key(dt.date.fromisoformat(taken_on), today) for taken_on in catalog["taken_on"]]
+        # The catalog is ordered by time, so the last entry per key is the one to keep
+        keep = set(catalog.groupby(keys)["id"].last())
+        dropped = catalog[~catalog["id"].isin(keep)]
+        if dropped.empty:
+            return
+
+        for path in dropped["path"]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+        with self.connections.transaction() as conn:
+            conn.executemany("DELETE FROM snapshots WHERE id = ?", ((int(id_),) for id_ in dropped["id"]))
+
+        print(f"Compacted {len(dropped)} snapshots, {len(keep)} kept "
+              f"({dropped['bytes'].sum() / 1024 / 1024:.1f} MiB freed)")
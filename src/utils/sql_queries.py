@@ -6,4 +6,11 @@ listings_table_sql = ('SELECT  url, Price, Area,'
 new_listings_table_sql = ('SELECT  url, Price, Area,'
                       ' Rooms, Floor, "Max Floor",'
                       ' GoToLink, ReportDate, add_date, is_active'
-                      ' FROM new_listings WHERE is_active = 1')
\ No newline at end of file
+                      ' FROM new_listings WHERE is_active = 1')
+
+# Columns returned by the two queries above, in order
+listings_table_columns = ['url', 'Price', 'Area', 'Rooms', 'Floor', 'Max Floor',
+                          'GoToLink', 'ReportDate', 'add_date', 'is_active']
+
+# Columns matched by the dashboard's global search box
+listings_search_columns = ['url', 'Price', 'Area', 'Rooms', 'Floor', 'Max Floor', 'add_date']